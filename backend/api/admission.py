@@ -0,0 +1,243 @@
+"""
+Admission control for the write-heavy endpoints.
+
+Each endpoint listed in ``ADMISSION_LIMITS`` gets a concurrency cap (requests
+in flight at once) and a token-bucket rate limit (``rate`` requests/second
+with bursts up to ``burst``). With ``REDIS_URL`` configured both limits are
+enforced across all gunicorn workers; otherwise (or if Redis is unreachable)
+each worker enforces them on its own. Rejected requests get 429 with a
+``Retry-After`` header and are counted in ``api_admission_rejections_total``.
+"""
+
+import functools
+import math
+import os
+import socket
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from rest_framework import status
+from rest_framework.response import Response
+
+from .metrics import registry
+
+# KEYS[1] = bucket hash; ARGV = rate, burst, now, cost
+# Returns {allowed (0/1), seconds until enough tokens}
+TOKEN_BUCKET_LUA = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local cost = tonumber(ARGV[4])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or burst
+local ts = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+local allowed = 0
+local wait = 0
+if tokens >= cost then
+    tokens = tokens - cost
+    allowed = 1
+else
+    wait = (cost - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 60)
+return {allowed, tostring(wait)}
+"""
+
+# KEYS[1] = in-flight sorted set; ARGV = limit, now, lease seconds, member
+# Expired leases (crashed workers) are dropped before counting
+ACQUIRE_LUA = """
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', ARGV[2])
+if redis.call('ZCARD', KEYS[1]) >= tonumber(ARGV[1]) then
+    return 0
+end
+redis.call('ZADD', KEYS[1], tonumber(ARGV[2]) + tonumber(ARGV[3]), ARGV[4])
+redis.call('EXPIRE', KEYS[1], math.ceil(tonumber(ARGV[3])) + 60)
+return 1
+"""
+
+
+class Rejected(Exception):
+    def __init__(self, reason, retry_after):
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class LocalLimiter:
+    """Per-process concurrency counter and token bucket"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._in_flight = {}
+        self._buckets = {}
+
+    def take_token(self, name, rate, burst):
+        now = time.monotonic()
+        with self._lock:
+            tokens, ts = self._buckets.get(name, (burst, now))
+            tokens = min(burst, tokens + (now - ts) * rate)
+            if tokens >= 1:
+                self._buckets[name] = (tokens - 1, now)
+                return True, 0.0
+            self._buckets[name] = (tokens, now)
+            return False, (1 - tokens) / rate
+
+    def acquire(self, name, limit, lease):
+        with self._lock:
+            if self._in_flight.get(name, 0) >= limit:
+                return None
+            self._in_flight[name] = self._in_flight.get(name, 0) + 1
+            return name
+
+    def release(self, name, token):
+        with self._lock:
+            self._in_flight[name] = max(self._in_flight.get(name, 0) - 1, 0)
+
+
+class RedisLimiter:
+    """Cluster-wide limits shared by every worker through Redis"""
+
+    def __init__(self, url, prefix='api:admission'):
+        import redis
+
+        self.client = redis.Redis.from_url(url, socket_timeout=0.25, socket_connect_timeout=0.25)
+        self.prefix = prefix
+        self._token_bucket = self.client.register_script(TOKEN_BUCKET_LUA)
+        self._acquire = self.client.register_script(ACQUIRE_LUA)
+        self._owner = f'{socket.gethostname()}:{os.getpid()}'
+
+    def take_token(self, name, rate, burst):
+        allowed, wait = self._token_bucket(
+            keys=[f'{self.prefix}:bucket:{name}'], args=[rate, burst, time.time(), 1]
+        )
+        return bool(allowed), float(wait)
+
+    def acquire(self, name, limit, lease):
+        member = f'{self._owner}:{uuid.uuid4().hex}'
+        ok = self._acquire(keys=[f'{self.prefix}:inflight:{name}'], args=[limit, time.time(), lease, member])
+        return member if ok else None
+
+    def release(self, name, token):
+        self.client.zrem(f'{self.prefix}:inflight:{name}', token)
+
+
+_local = LocalLimiter()
+_redis = None
+_redis_retry_at = 0.0
+REDIS_RETRY_INTERVAL = 30
+
+
+def _limiter():
+    """The Redis limiter when configured and reachable, else the local one"""
+    global _redis
+    if not settings.REDIS_URL or time.monotonic() < _redis_retry_at:
+        return _local
+    if _redis is None:
+        try:
+            _redis = RedisLimiter(settings.REDIS_URL)
+        except ImportError:
+            return _local
+    return _redis
+
+
+def _redis_failed(e):
+    global _redis_retry_at
+    print("Admission control Redis error, using per-process limits:", str(e))
+    _redis_retry_at = time.monotonic() + REDIS_RETRY_INTERVAL
+
+
+def _call(method, *args):
+    limiter = _limiter()
+    try:
+        return limiter, getattr(limiter, method)(*args)
+    except Exception as e:
+        if limiter is _local:
+            raise
+        _redis_failed(e)
+        return _local, getattr(_local, method)(*args)
+
+
+def admit(name):
+    """
+    Reserve a slot for one request to endpoint `name`.
+    Returns a release callable, or raises Rejected.
+    """
+    limits = settings.ADMISSION_LIMITS.get(name)
+    if not settings.ADMISSION_CONTROL_ENABLED or not limits:
+        return lambda: None
+
+    # Concurrency first: a request turned away because too many are in flight
+    # must not spend a rate token it never uses
+    concurrency = limits.get('concurrency')
+    limiter, token = None, None
+    if concurrency:
+        limiter, token = _call('acquire', name, concurrency, limits.get('lease', 120))
+        if token is None:
+            raise Rejected('concurrency', limits.get('retry_after', 1))
+
+    def release():
+        if token is None:
+            return
+        try:
+            limiter.release(name, token)
+        except Exception as e:
+            print("Admission control release failed:", str(e))
+
+    rate = limits.get('rate')
+    if rate:
+        try:
+            _, (allowed, wait) = _call('take_token', name, rate, limits.get('burst', rate))
+        except BaseException:
+            release()
+            raise
+        if not allowed:
+            release()
+            raise Rejected('rate', wait)
+
+    return release
+
+
+def admit_wait(name, timeout=None):
+    """
+    Like admit, but for background work: sleep for the advised retry time
+    instead of raising Rejected, up to `timeout` seconds in total.
+    """
+    deadline = None if timeout is None else time.monotonic() + timeout
+    while True:
+        try:
+            return admit(name)
+        except Rejected as e:
+            wait = min(max(e.retry_after, 0.01), 1.0)
+            if deadline is not None and time.monotonic() + wait > deadline:
+                raise
+            time.sleep(wait)
+
+
+def admission_controlled(name):
+    """
+    View decorator applying the ADMISSION_LIMITS entry `name`. Apply it inside
+    @api_view so DRF still handles the request parsing.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(request, *args, **kwargs):
+            try:
+                release = admit(name)
+            except Rejected as e:
+                retry_after = max(1, math.ceil(e.retry_after))
+                registry.inc('api_admission_rejections_total', {'view': name, 'reason': e.reason})
+                response = Response({
+                    'error': f'Too many requests for {name} ({e.reason} limit). Retry after {retry_after}s.',
+                    'status': 'rejected'
+                }, status=status.HTTP_429_TOO_MANY_REQUESTS)
+                response['Retry-After'] = str(retry_after)
+                return response
+            try:
+                return view(request, *args, **kwargs)
+            finally:
+                release()
+        return wrapper
+    return decorator
@@ -0,0 +1,146 @@
+"""
+Archival of old HiBidItem and WebhookData rows.
+
+Rows older than ``ARCHIVE_AFTER_DAYS`` whose work is finished are moved out
+of the live tables in
+batches, each batch in one transaction, so the hot tables and their
+indexes stay small. They go either to the archive tables, which are
+range-partitioned by month on PostgreSQL and remain queryable through
+get-archived-items/, or to zstd-compressed Parquet files (requires
+pyarrow) for offline analysis.
+
+HiBid items linked to any auction item are never archived: deleting them
+would null ``AuctionItem.hibid_item`` and cut finalized auction items off
+from their source data. Webhook data is kept while an auction item with
+its SKU is still in progress.
+"""
+
+import json
+import uuid
+from datetime import datetime, timezone as dt_timezone
+from pathlib import Path
+
+from django.db import connection, transaction
+
+from .models import AuctionItem, HiBidItem, HiBidItemArchive, WebhookData, WebhookDataArchive
+
+# Auction items in these states still need their webhook data live
+ACTIVE_AUCTION_STATUSES = ['research', 'waiting', 'winning', 'photography', 'research2']
+
+
+class Target:
+    def __init__(self, name, model, archive_model, time_field):
+        self.name = name
+        self.model = model
+        self.archive_model = archive_model
+        self.time_field = time_field
+
+    def candidates(self, cutoff):
+        rows = self.model.objects.filter(**{f'{self.time_field}__lt': cutoff})
+        if self.model is HiBidItem:
+            linked = AuctionItem.objects.filter(hibid_item__isnull=False)
+            return rows.exclude(id__in=linked.values('hibid_item_id'))
+        active = AuctionItem.objects.filter(status__in=ACTIVE_AUCTION_STATUSES)
+        return rows.exclude(sku__in=active.values('sku'))
+
+
+TARGETS = {
+    'hibid': Target('hibid', HiBidItem, HiBidItemArchive, 'processed_at'),
+    'webhook': Target('webhook', WebhookData, WebhookDataArchive, 'received_at'),
+}
+
+
+def _month_start(value):
+    return value.astimezone(dt_timezone.utc).replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def _next_month(month):
+    return month.replace(year=month.year + 1, month=1) if month.month == 12 else month.replace(month=month.month + 1)
+
+
+def ensure_partition(archive_model, month):
+    """Create the monthly partition of an archive table (PostgreSQL only)"""
+    if connection.vendor != 'postgresql':
+        return
+    table = archive_model._meta.db_table
+    partition = f'{table}_y{month.year}m{month.month:02d}'
+    # DDL can't take bind parameters; the bounds are formatted from datetimes
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'CREATE TABLE IF NOT EXISTS {connection.ops.quote_name(partition)} '
+            f'PARTITION OF {connection.ops.quote_name(table)} '
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{_next_month(month).isoformat()}')"
+        )
+
+
+def _row_values(target, row):
+    # Scheduling columns (e.g. next_refresh_at) have no archive counterpart
+    archived = {field.attname for field in target.archive_model._meta.concrete_fields}
+    return {
+        field.attname: getattr(row, field.attname)
+        for field in target.model._meta.concrete_fields
+        if field.attname != 'id' and field.attname in archived
+    }
+
+
+class TableSink:
+    name = 'table'
+
+    def write(self, target, rows):
+        for month in {_month_start(getattr(row, target.time_field)) for row in rows}:
+            ensure_partition(target.archive_model, month)
+        target.archive_model.objects.bulk_create([
+            target.archive_model(original_id=row.id, **_row_values(target, row)) for row in rows
+        ])
+
+
+class ParquetSink:
+    """One zstd-compressed Parquet file per table, month and batch"""
+    name = 'parquet'
+
+    def __init__(self, directory):
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise RuntimeError('Parquet archival requires pyarrow (pip install pyarrow)')
+        self.directory = Path(directory)
+
+    def write(self, target, rows):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        json_fields = {field.attname for field in target.model._meta.concrete_fields
+                       if field.get_internal_type() == 'JSONField'}
+        by_month = {}
+        for row in rows:
+            by_month.setdefault(_month_start(getattr(row, target.time_field)), []).append(row)
+
+        archived_at = datetime.now(dt_timezone.utc)
+        for month, month_rows in by_month.items():
+            columns = {'original_id': [row.id for row in month_rows]}
+            for row in month_rows:
+                for name, value in _row_values(target, row).items():
+                    columns.setdefault(name, []).append(json.dumps(value) if name in json_fields else value)
+            columns['archived_at'] = [archived_at] * len(month_rows)
+
+            path = self.directory / target.model._meta.db_table / f'{month:%Y-%m}'
+            path.mkdir(parents=True, exist_ok=True)
+            pq.write_table(pa.Table.from_pydict(columns), path / f'part-{uuid.uuid4().hex}.parquet',
+                           compression='zstd')
+
+
+def archive_batch(target, cutoff, sink, batch_size=500):
+    """Move up to `batch_size` archivable rows to `sink`. Returns the number moved."""
+    with transaction.atomic():
+        ids = list(
+            target.candidates(cutoff).order_by('id').values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            return 0
+        # Re-checked under the lock, in case an auction item was linked meanwhile
+        rows = list(target.candidates(cutoff).select_for_update().filter(id__in=ids).order_by('id'))
+        if not rows:
+            return 0
+        sink.write(target, rows)
+        target.model.objects.filter(id__in=[row.id for row in rows]).delete()
+    return len(rows)
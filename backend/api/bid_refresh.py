@@ -0,0 +1,300 @@
+"""
+Auction-aware refresh of live bid data.
+
+``current_bid``, ``bid_count`` and ``time_remaining`` are scraped once, so
+they go stale exactly when they matter. On ingest, the auction end time is
+parsed from the payload's ``time_remaining`` (relative to when the data
+arrived) or from ``auction_dates``, stored as ``auction_ends_at``, and
+turned into a ``next_refresh_at`` from ``BID_REFRESH_TIERS``. A payload
+without a countdown keeps the stored end time while the dates are
+unchanged; a countdown stored earlier is never re-read against a later
+time, which would move the end later on every refresh. Items are refreshed
+more often as the close approaches, once more
+``BID_REFRESH_AFTER_CLOSE_SECONDS`` after it to pick up the final bid, and
+then never again.
+
+``manage.py run_bid_refresh_scheduler`` sends due items back through n8n,
+closest to closing first. Items of the same auction that are due soon are
+sent with them, so an auction is refreshed in one pass: as one call per
+auction when ``BID_REFRESH_WEBHOOK_URL`` points at a batch workflow, or else
+one URL processing call per item. Each call takes a token from the
+``bid_refresh`` admission limit, which caps the n8n calls of all
+schedulers together. When the budget runs out, the rest stays due for the
+next pass. If an auction's previous batch call is still queued or in flight,
+the new pass attaches to it and marks only the items that call carries as
+refreshed.
+"""
+
+import re
+from datetime import datetime, time as dt_time, timedelta
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+from . import admission
+from . import n8n
+from . import outbound
+from .metrics import registry
+from .models import HiBidItem
+
+LIMIT = 'bid_refresh'
+SCAN_SIZE = 500
+
+_CLOSED = re.compile(r'\b(closed|ended|sold|passed|expired)\b')
+_DURATION = re.compile(
+    r'(\d+)\s*(weeks?|w|days?|d|hours?|hrs?|h|minutes?|mins?|m|seconds?|secs?|s)\b'
+)
+_CLOCK = re.compile(r'^\s*(?:(\d+):)?(\d{1,2}):(\d{2})\s*(?:left|remaining)?\s*$')
+_UNIT_SECONDS = {'w': 604800, 'd': 86400, 'h': 3600, 'm': 60, 's': 1}
+_MONTHS = ('jan', 'feb', 'mar', 'apr', 'may', 'jun', 'jul', 'aug', 'sep', 'oct', 'nov', 'dec')
+_DATE = re.compile(
+    r'(?P<m>\d{1,2})/(?P<d>\d{1,2})/(?P<y>\d{2,4})'
+    r'|(?P<mon>jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[a-z]*\.?\s+(?P<day>\d{1,2})(?:st|nd|rd|th)?'
+    r'(?:,?\s+(?P<year>\d{4}))?'
+)
+_TIME = re.compile(r'^\s*(?:@|at)?\s*(\d{1,2})(?::(\d{2}))?\s*([ap])\.?m\b')
+
+
+def parse_time_remaining(text):
+    """A countdown like '2d 4h 13m', '3 Days 2 Hours' or '01:22:05' as a timedelta; 0 once closed"""
+    text = (text or '').lower()
+    if not text.strip():
+        return None
+    if _CLOSED.search(text):
+        return timedelta(0)
+    clock = _CLOCK.match(text)
+    if clock:
+        hours, minutes, seconds = (int(value or 0) for value in clock.groups())
+        return timedelta(hours=hours, minutes=minutes, seconds=seconds)
+    seconds = sum(int(amount) * _UNIT_SECONDS[unit[0]] for amount, unit in _DURATION.findall(text))
+    return timedelta(seconds=seconds) if _DURATION.search(text) else None
+
+
+def parse_auction_end(text, reference):
+    """
+    The last date in an auction_dates string ('10/15/2026 - 10/22/2026',
+    'Oct 15 - Oct 22, 2026 7:00 PM'), in the server time zone. Without a
+    time of day the end of that day is used, without a year the year of
+    the date before it, or the one that puts it closest to `reference`.
+    """
+    text = (text or '').lower()
+    day = last = None
+    for match in _DATE.finditer(text):
+        try:
+            if match['m']:
+                year = int(match['y'])
+                parsed = datetime(year + 2000 if year < 100 else year, int(match['m']), int(match['d'])).date()
+            else:
+                year = int(match['year']) if match['year'] else (day.year if day else reference.year)
+                parsed = datetime(year, _MONTHS.index(match['mon']) + 1, int(match['day'])).date()
+                if not match['year'] and parsed < (day or reference.date() - timedelta(days=180)):
+                    # 'Dec 30 - Jan 2' runs into the next year, as does 'Jan 5' seen in December
+                    parsed = parsed.replace(year=year + 1)
+        except ValueError:
+            continue
+        day, last = parsed, match
+    if day is None:
+        return None
+    at = _TIME.match(text[last.end():])
+    if at:
+        hour = int(at.group(1)) % 12 + (12 if at.group(3) == 'p' else 0)
+        end_time = dt_time(hour, int(at.group(2) or 0))
+    else:
+        end_time = dt_time(23, 59)
+    return timezone.make_aware(datetime.combine(day, end_time), timezone.get_current_timezone())
+
+
+def auction_end(time_remaining, auction_dates, reference):
+    """When the auction closes, from the countdown scraped at `reference` or else from the dates"""
+    remaining = parse_time_remaining(time_remaining)
+    if remaining is not None:
+        return reference + remaining
+    return parse_auction_end(auction_dates, reference)
+
+
+def next_refresh(ends_at, now, requested_at=None):
+    """When to refresh an item next, or None for never"""
+    if ends_at is None:
+        unknown = settings.BID_REFRESH_UNKNOWN_SECONDS
+        return now + timedelta(seconds=unknown) if unknown else None
+    final = ends_at + timedelta(seconds=settings.BID_REFRESH_AFTER_CLOSE_SECONDS)
+    if requested_at is not None and requested_at >= final:
+        return None
+    remaining = (ends_at - now).total_seconds()
+    if remaining <= 0:
+        return max(final, now)
+    interval = settings.BID_REFRESH_FAR_SECONDS
+    for before_close, tier_interval in settings.BID_REFRESH_TIERS:
+        if remaining <= before_close:
+            interval = tier_interval
+            break
+    return min(now + timedelta(seconds=interval), final)
+
+
+def schedule_fields(item, time_remaining, auction_dates, now):
+    """
+    The auction_ends_at / next_refresh_at values for freshly scraped data,
+    or {} when the end time moved by less than BID_REFRESH_END_TOLERANCE_SECONDS
+    (a countdown re-parsed at a later time lands on almost the same instant).
+    `time_remaining` must come from the payload itself, not from `item`.
+    """
+    remaining = parse_time_remaining(time_remaining)
+    if remaining is not None:
+        ends_at = now + remaining
+    elif item.auction_ends_at is not None and auction_dates == item.auction_dates:
+        ends_at = item.auction_ends_at
+    else:
+        ends_at = parse_auction_end(auction_dates, now)
+    if ends_at is None or (ends_at <= now and item.auction_ends_at and item.auction_ends_at <= now):
+        # Unparseable, or a 'Closed' countdown for an auction we already know has closed
+        ends_at = item.auction_ends_at
+    tolerance = timedelta(seconds=settings.BID_REFRESH_END_TOLERANCE_SECONDS)
+    if item.pk and ends_at and item.auction_ends_at and abs(ends_at - item.auction_ends_at) < tolerance:
+        return {}
+    if item.pk and ends_at is None and item.next_refresh_at is not None:
+        return {}
+    return {
+        'auction_ends_at': ends_at,
+        'next_refresh_at': next_refresh(ends_at, now, item.refresh_requested_at),
+    }
+
+
+def _auction_key(item):
+    return (item.auction_name, item.auctioneer) if item.auction_name else ('', item.url_main)
+
+
+def due_batches(now):
+    """
+    Yield due items grouped by auction, soonest-closing auction first. Each
+    batch also takes the auction's items due within BID_REFRESH_BATCH_AHEAD_SECONDS.
+    """
+    fields = ['id', 'url_main', 'auction_name', 'auctioneer', 'auction_ends_at', 'next_refresh_at',
+              'refresh_requested_at']
+    due = list(
+        HiBidItem.objects.filter(next_refresh_at__lte=now)
+        .order_by(F('auction_ends_at').asc(nulls_last=True), 'next_refresh_at')
+        .only(*fields)[:SCAN_SIZE]
+    )
+    ahead = now + timedelta(seconds=settings.BID_REFRESH_BATCH_AHEAD_SECONDS)
+    seen = set()
+    for item in due:
+        key = _auction_key(item)
+        if key in seen:
+            continue
+        seen.add(key)
+        if not item.auction_name:
+            yield [item]
+            continue
+        yield list(
+            HiBidItem.objects.filter(auction_name=item.auction_name, auctioneer=item.auctioneer,
+                                     next_refresh_at__lte=ahead)
+            .order_by('next_refresh_at').only(*fields)[:settings.BID_REFRESH_BATCH_SIZE]
+        )
+
+
+def _take_budget():
+    try:
+        release = admission.admit(LIMIT)
+    except admission.Rejected:
+        return False
+    release()
+    return True
+
+
+def _dispatch(batch):
+    """
+    Send one auction's refresh. Returns (items refreshed, whether budget is
+    left); once the budget is spent the remaining items stay due.
+    """
+    webhook_url = settings.BID_REFRESH_WEBHOOK_URL
+    if webhook_url:
+        if not _take_budget():
+            return [], False
+        first = batch[0]
+        payload = {
+            'auction_name': first.auction_name,
+            'auctioneer': first.auctioneer,
+            'urls': [item.url_main for item in batch],
+        }
+        key = outbound.dedupe_key_for('bid_refresh', f'{first.auction_name}\n{first.auctioneer}')
+        call, _, attached = outbound.dispatch_once('bid_refresh', webhook_url, payload, key,
+                                                   timeout=settings.OUTBOUND_TIMEOUT_SECONDS)
+        if attached:
+            # An earlier call for this auction is still queued or in flight. Only
+            # the items it carries are refreshed; the rest stay due for a later call
+            urls = set(call.payload.get('urls', []))
+            return [item for item in batch if item.url_main in urls], True
+        return batch, True
+
+    sent = []
+    for item in batch:
+        if not _take_budget():
+            return sent, False
+        # Same workflow and dedupe key as call_webhook, so a user resubmitting
+        # the URL at the same time attaches to this call
+        key = outbound.dedupe_key_for('url_processing', outbound.normalize_url(item.url_main))
+        outbound.dispatch_once('url_processing', n8n.URL_PROCESSING_WEBHOOK, {'url_main': item.url_main}, key,
+                               timeout=settings.OUTBOUND_TIMEOUT_SECONDS)
+        sent.append(item)
+    return sent, True
+
+
+def _tier(item, now):
+    if item.auction_ends_at is None:
+        return 'unknown'
+    remaining = (item.auction_ends_at - now).total_seconds()
+    if remaining <= 0:
+        return 'closed'
+    for before_close, _ in settings.BID_REFRESH_TIERS:
+        if remaining <= before_close:
+            return f'{before_close}s'
+    return 'far'
+
+
+def run_due(now=None):
+    """
+    Refresh due items until none are left or the n8n budget is spent.
+    Returns (items sent, auctions visited).
+    """
+    now = now or timezone.now()
+    items = auctions = 0
+    for batch in due_batches(now):
+        sent, budget_left = _dispatch(batch)
+        if sent:
+            for item in sent:
+                registry.inc('bid_refresh_requests_total', {'tier': _tier(item, now)})
+                item.refresh_requested_at = now
+                item.next_refresh_at = next_refresh(item.auction_ends_at, now, now)
+            HiBidItem.objects.bulk_update(sent, ['refresh_requested_at', 'next_refresh_at'])
+            items += len(sent)
+            auctions += 1
+        if not budget_left:
+            break
+    return items, auctions
+
+
+def backfill(batch_size=1000):
+    """
+    Derive auction_ends_at / next_refresh_at for items stored before the
+    scheduler existed. Countdowns are taken as of processed_at, when they
+    were scraped. Returns the number of items updated.
+    """
+    now = timezone.now()
+    updated = 0
+    items = HiBidItem.objects.filter(auction_ends_at__isnull=True, next_refresh_at__isnull=True).only(
+        'id', 'time_remaining', 'auction_dates', 'processed_at'
+    )
+    batch = []
+    for item in items.iterator(chunk_size=batch_size):
+        item.auction_ends_at = auction_end(item.time_remaining, item.auction_dates, item.processed_at)
+        item.next_refresh_at = next_refresh(item.auction_ends_at, now)
+        if item.auction_ends_at is None and item.next_refresh_at is None:
+            continue
+        batch.append(item)
+        if len(batch) >= batch_size:
+            updated += HiBidItem.objects.bulk_update(batch, ['auction_ends_at', 'next_refresh_at'])
+            batch = []
+    if batch:
+        updated += HiBidItem.objects.bulk_update(batch, ['auction_ends_at', 'next_refresh_at'])
+    return updated
@@ -0,0 +1,284 @@
+"""
+Bulk import of HiBid URLs.
+
+An upload (CSV or plain text, one or more URLs per line) becomes a pending
+BulkImport row holding the unique URLs in upload order. Imports run in
+``manage.py import_urls``, never in a web worker; the bulk-importer service
+runs ``import_urls --resume-all --interval`` to pick up new ones. Running an
+import skips URLs that already have a HiBidItem, then sends the rest to the
+n8n URL processing workflow from a small thread pool. Each send goes through
+``outbound.dispatch_once``, so a URL already queued or in flight through
+call_webhook, or accepted by n8n within OUTBOUND_SINGLE_FLIGHT_WINDOW_SECONDS,
+attaches to that call instead of being sent again, and
+a call n8n rejects is left to the outbound scheduler. The shared
+``bulk_import_dispatch`` admission limit caps the n8n call rate across all
+workers and imports.
+
+Progress is checkpointed in ``cursor``: every URL before it has been
+handled. A URL whose send raised (database or rate limiter unavailable)
+counts as handled but is kept in ``failed_urls``, and the import ends as
+failed. A rerun (``manage.py import_urls --resume``) first sends the failed
+URLs again, then continues from the cursor.
+
+Sending is at least once. URLs after the cursor may already have been sent
+when the import stopped, and the rerun handles them again. It skips a URL
+only if n8n's result has already been stored (the 'existing' check), or if
+its call is still queued, in flight, or was accepted within
+OUTBOUND_SINGLE_FLIGHT_WINDOW_SECONDS, in which case the rerun attaches to it.
+Any other URL is sent to n8n a second time.
+"""
+
+import csv
+import io
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connections
+from django.db.models import Q
+from django.utils import timezone
+
+from . import admission
+from . import n8n
+from . import outbound
+from .models import BulkImport, HiBidItem
+
+DISPATCH_LIMIT = 'bulk_import_dispatch'
+OUTCOMES = ('existing', 'deduplicated', 'dispatched', 'queued', 'failed')
+EXISTING_CHUNK = 500
+CHECKPOINT_SECONDS = 2.0
+
+
+def parse_urls(text):
+    """
+    Unique http(s) URLs from CSV or plain text, in order, deduplicated by
+    their normalized form. Other values in a row (notes, lot numbers) are
+    ignored. Returns (urls, invalid), where invalid counts the non-empty rows
+    without a URL, not counting a header row.
+    """
+    urls = []
+    seen = set()
+    invalid = 0
+    for line_number, row in enumerate(csv.reader(io.StringIO(text))):
+        values = [value for cell in row for value in cell.split()]
+        found = [value for value in values if value.lower().startswith(('http://', 'https://'))]
+        if values and not found and line_number > 0:
+            invalid += 1
+        for value in found:
+            normalized = outbound.normalize_url(value)
+            if normalized not in seen:
+                seen.add(normalized)
+                urls.append(value)
+    return urls, invalid
+
+
+def create(text, source=''):
+    """Parse an upload into a pending BulkImport. Raises ValueError when it has no URLs or too many."""
+    urls, invalid = parse_urls(text)
+    if not urls:
+        raise ValueError('No http(s) URLs found')
+    if len(urls) > settings.BULK_IMPORT_MAX_URLS:
+        raise ValueError(f'{len(urls)} URLs given, at most {settings.BULK_IMPORT_MAX_URLS} per import')
+    return BulkImport.objects.create(source=source[:255], urls=urls, total=len(urls), invalid_count=invalid)
+
+
+def claim(import_id, stale_after=300):
+    """
+    Atomically mark an import as running. Pending and failed imports can be
+    claimed, and so can a running one whose worker stopped checkpointing
+    `stale_after` seconds ago. False if it's finished or another worker has it.
+    """
+    cutoff = timezone.now() - timedelta(seconds=stale_after)
+    claimable = Q(state__in=['pending', 'failed']) | Q(state='running', updated_at__lt=cutoff)
+    return BulkImport.objects.filter(claimable, id=import_id).update(
+        state='running', last_error='', updated_at=timezone.now()
+    ) == 1
+
+
+def existing_urls(urls):
+    """The URLs (as given or normalized) that already have a HiBidItem"""
+    candidates = {url: outbound.normalize_url(url) for url in urls}
+    found = set(HiBidItem.objects.filter(
+        url_main__in=set(candidates) | set(candidates.values())
+    ).values_list('url_main', flat=True))
+    return {url for url, normalized in candidates.items() if url in found or normalized in found}
+
+
+def send(url, timeout=30):
+    """Dispatch one URL to n8n under the bulk rate limit and return its outcome"""
+    close_old_connections()
+    try:
+        release = admission.admit_wait(DISPATCH_LIMIT)
+        try:
+            call, response, attached = outbound.dispatch_once(
+                'url_processing', n8n.URL_PROCESSING_WEBHOOK, {'url_main': url},
+                outbound.dedupe_key_for('url_processing', outbound.normalize_url(url)), timeout=timeout,
+                succeeded_since=outbound.succeeded_since()
+            )
+        finally:
+            release()
+        if attached:
+            return 'deduplicated'
+        return 'dispatched' if call.state == 'succeeded' else 'queued'
+    except Exception as e:
+        print(f"Bulk import of {url} failed:", str(e))
+        return 'failed'
+    finally:
+        connections.close_all()
+
+
+class Progress:
+    """
+    Checkpoints the contiguous prefix of handled URLs, and the URLs whose
+    send failed, into the BulkImport row
+    """
+
+    def __init__(self, bulk_import, report=None):
+        self.bulk_import = bulk_import
+        self.report = report
+        self.outcomes = {}
+        self.failed = dict.fromkeys(bulk_import.failed_urls)  # ordered set
+        self.unsaved = 0
+        self.started = time.monotonic()
+        self.elapsed_before = bulk_import.elapsed_seconds
+        self.saved_at = self.started
+
+    def done(self, index, outcome):
+        self.outcomes[index] = outcome
+
+    def retried(self, url, outcome):
+        """Count the outcome of sending again a URL that failed in an earlier run"""
+        del self.failed[url]
+        self.bulk_import.failed_count -= 1
+        self._count(url, outcome)
+
+    def _count(self, url, outcome):
+        field = f'{outcome}_count'
+        setattr(self.bulk_import, field, getattr(self.bulk_import, field) + 1)
+        if outcome == 'failed':
+            self.failed[url] = None
+        self.unsaved += 1
+
+    def checkpoint(self, force=False):
+        bulk_import = self.bulk_import
+        while bulk_import.cursor in self.outcomes:
+            self._count(bulk_import.urls[bulk_import.cursor], self.outcomes.pop(bulk_import.cursor))
+            bulk_import.cursor += 1
+        now = time.monotonic()
+        if not force and self.unsaved < settings.BULK_IMPORT_CHECKPOINT_EVERY and now - self.saved_at < CHECKPOINT_SECONDS:
+            return
+        bulk_import.failed_urls = list(self.failed)
+        bulk_import.elapsed_seconds = self.elapsed_before + (now - self.started)
+        bulk_import.save(update_fields=['cursor', 'failed_urls', 'elapsed_seconds', 'updated_at']
+                         + [f'{outcome}_count' for outcome in OUTCOMES])
+        self.unsaved = 0
+        self.saved_at = now
+        if self.report:
+            self.report(bulk_import)
+
+
+def _pending(bulk_import, retry):
+    """
+    (retried, key, url, exists) for every URL left to handle: first the URLs
+    in `retry` (key is the URL), then those from the cursor on (key is the
+    index), checked for an existing HiBidItem a chunk at a time
+    """
+    for start in range(0, len(retry), EXISTING_CHUNK):
+        chunk = retry[start:start + EXISTING_CHUNK]
+        existing = existing_urls(chunk)
+        for url in chunk:
+            yield True, url, url, url in existing
+    urls = bulk_import.urls
+    for start in range(bulk_import.cursor, len(urls), EXISTING_CHUNK):
+        chunk = urls[start:start + EXISTING_CHUNK]
+        existing = existing_urls(chunk)
+        for index, url in enumerate(chunk, start=start):
+            yield False, index, url, url in existing
+
+
+def run(bulk_import, workers=None, timeout=30, report=None):
+    """
+    Send again the URLs that failed in earlier runs, then handle every URL
+    from the import's cursor on. The import must already be claimed. It ends
+    completed, or failed if any URL is left in failed_urls.
+    `report(bulk_import)` is called after every checkpoint.
+    """
+    workers = workers or settings.BULK_IMPORT_WORKERS
+    progress = Progress(bulk_import, report)
+    in_flight = {}
+
+    def record(retried, key, outcome):
+        if retried:
+            progress.retried(key, outcome)
+        else:
+            progress.done(key, outcome)
+
+    try:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='bulk-import') as pool:
+            for retried, key, url, exists in _pending(bulk_import, list(progress.failed)):
+                if exists:
+                    record(retried, key, 'existing')
+                    progress.checkpoint()
+                    continue
+                # Keep a short queue so the cursor stays close to what was actually sent
+                while len(in_flight) >= workers * 2:
+                    finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        record(*in_flight.pop(future), future.result())
+                    progress.checkpoint()
+                in_flight[pool.submit(send, url, timeout)] = (retried, key)
+            for future in list(in_flight):
+                record(*in_flight.pop(future), future.result())
+                progress.checkpoint()
+    except Exception as e:
+        bulk_import.state = 'failed'
+        bulk_import.last_error = str(e)
+        progress.checkpoint(force=True)
+        bulk_import.save(update_fields=['state', 'last_error', 'updated_at'])
+        raise
+    progress.checkpoint(force=True)
+    if bulk_import.failed_urls:
+        bulk_import.state = 'failed'
+        bulk_import.last_error = (f'{len(bulk_import.failed_urls)} URLs could not be sent; '
+                                  f'resume the import to send them again')
+    else:
+        bulk_import.state = 'completed'
+        bulk_import.finished_at = timezone.now()
+    bulk_import.save(update_fields=['state', 'last_error', 'finished_at', 'updated_at'])
+    return bulk_import
+
+
+def resumable(stale_after=300):
+    """Ids of imports that were never started, failed, or whose worker stopped checkpointing"""
+    cutoff = timezone.now() - timedelta(seconds=stale_after)
+    return list(
+        BulkImport.objects.filter(Q(state__in=['pending', 'failed']) | Q(state='running', updated_at__lt=cutoff))
+        .order_by('created_at').values_list('id', flat=True)
+    )
+
+
+def serialize(bulk_import):
+    handled = bulk_import.cursor
+    calls = bulk_import.dispatched_count + bulk_import.queued_count
+    elapsed = bulk_import.elapsed_seconds
+    return {
+        'id': bulk_import.id,
+        'source': bulk_import.source,
+        'state': bulk_import.state,
+        'total': bulk_import.total,
+        'handled': handled,
+        'invalid': bulk_import.invalid_count,
+        'existing': bulk_import.existing_count,
+        'deduplicated': bulk_import.deduplicated_count,
+        'dispatched': bulk_import.dispatched_count,
+        'queued_for_retry': bulk_import.queued_count,
+        'failed': bulk_import.failed_count,
+        'elapsed_seconds': round(elapsed, 1),
+        'urls_per_second': round(handled / elapsed, 2) if elapsed else None,
+        'n8n_calls_per_second': round(calls / elapsed, 2) if elapsed else None,
+        'last_error': bulk_import.last_error,
+        'created_at': bulk_import.created_at.isoformat(),
+        'updated_at': bulk_import.updated_at.isoformat(),
+        'finished_at': bulk_import.finished_at.isoformat() if bulk_import.finished_at else None,
+    }
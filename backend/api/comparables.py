@@ -0,0 +1,386 @@
+"""
+Comparable-lot index over HiBidItem and AuctionItem.
+
+Every item is reduced to the set of words (and adjacent word pairs) in its
+title, category and the start of its description, and that set to a b-bit
+MinHash signature: ``COMPARABLES_SIGNATURE_SIZE`` minimum hash values under
+independent hash functions, keeping the low 8 bits of each. Two signatures
+agree in a position with probability J + (1 - J) / 256, where J is the
+Jaccard similarity of the word sets, so a query is one vectorized NumPy
+comparison of its signature against the whole (N x K uint8) matrix, a few
+milliseconds at hundreds of thousands of items, followed by argpartition.
+
+Each worker holds the index in memory. It is loaded from
+``COMPARABLES_INDEX_PATH`` (written by ``manage.py build_comparables_index``)
+or built from the database on a background thread started by the first
+request, which, like every request until the index is ready, gets None from
+``get_index`` instead of waiting. New HiBid items are added on ingest by the
+worker that stores them. Every worker also picks up rows updated since its
+last refresh (by ``updated_at``) from the database, again on a background
+thread, at most every ``COMPARABLES_REFRESH_SECONDS``, and every
+``COMPARABLES_RECONCILE_SECONDS`` drops items that no longer exist (e.g.
+archived ones). Under gunicorn with preload_app the master
+loads the saved index once (``preload``) and the workers share it.
+"""
+
+import os
+import re
+import statistics
+import threading
+import time
+import zlib
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+from django.db import connections
+
+from .models import AuctionItem, HiBidItem
+
+KINDS = ('hibid', 'auction')
+PRIME = np.uint64(4294967311)  # smallest prime above 2**32
+DESCRIPTION_WORDS = 60
+BUILD_CHUNK = 2000
+
+STOPWORDS = frozenset(
+    'a an and are as at be by for from has in is it its of on or the this to with w lot item items '
+    'new used very good great nice see photos photo pictures condition'.split()
+)
+_word = re.compile(r'[a-z0-9]+(?:[-\'][a-z0-9]+)*')
+_amount = re.compile(r'\$?\s*([0-9][0-9,]*(?:\.[0-9]+)?)')
+
+
+def tokens(title, category='', description=''):
+    """Word and word-pair shingles for an item"""
+    words = [w for w in _word.findall(f'{title} {category}'.lower()) if w not in STOPWORDS and len(w) > 1]
+    body = [w for w in _word.findall((description or '').lower())[:DESCRIPTION_WORDS]
+            if w not in STOPWORDS and len(w) > 1]
+    shingles = set(words) | set(body)
+    shingles.update(f'{a} {b}' for a, b in zip(words, words[1:]))
+    return shingles
+
+
+def _hashes(shingles):
+    return np.fromiter((zlib.crc32(s.encode('utf-8')) for s in shingles), dtype=np.uint64, count=len(shingles))
+
+
+class MinHasher:
+    def __init__(self, size, seed=1):
+        rng = np.random.default_rng(seed)
+        self.size = size
+        self.a = rng.integers(1, 2 ** 32, size=size, dtype=np.uint64)
+        self.b = rng.integers(0, 2 ** 32, size=size, dtype=np.uint64)
+
+    def signatures(self, token_sets):
+        """(len(token_sets), size) uint8 b-bit signatures; empty sets get all-255 rows"""
+        out = np.full((len(token_sets), self.size), 255, dtype=np.uint8)
+        for start in range(0, len(token_sets), BUILD_CHUNK):
+            chunk = token_sets[start:start + BUILD_CHUNK]
+            hashes = [_hashes(t) for t in chunk]
+            lengths = np.array([len(h) for h in hashes])
+            present = np.nonzero(lengths)[0]
+            if not len(present):
+                continue
+            flat = np.concatenate([hashes[i] for i in present])
+            # (a*h + b) mod p for every hash function and every shingle; a, b, h < 2**32
+            # so the products fit in uint64
+            values = (self.a[:, None] * flat[None, :] + self.b[:, None]) % PRIME
+            offsets = np.concatenate(([0], np.cumsum(lengths[present])[:-1]))
+            minima = np.minimum.reduceat(values, offsets, axis=1)
+            out[start + present] = (minima.T & np.uint64(0xFF)).astype(np.uint8)
+        return out
+
+
+def parse_amounts(text):
+    """Dollar amounts in an estimate/bid string, e.g. '$100 - $250' -> [100.0, 250.0]"""
+    amounts = []
+    for match in _amount.findall(text or ''):
+        try:
+            amounts.append(float(match.replace(',', '')))
+        except ValueError:
+            pass
+    return amounts
+
+
+def _hibid_doc(item):
+    title = item['item_title'] or item['item_name']
+    return {
+        'kind': 'hibid', 'id': item['id'], 'title': title, 'category': item['category'],
+        'estimate': item['estimate'], 'current_bid': item['current_bid'],
+        'tokens': tokens(title, item['category'], item['description']),
+    }
+
+
+def _auction_doc(item):
+    estimate = item['researcher_estimate'] or item['ai_estimate'] or item['auction_site_estimate']
+    return {
+        'kind': 'auction', 'id': item['id'], 'title': item['item_name'], 'category': item['category'],
+        'estimate': estimate, 'current_bid': '',
+        'tokens': tokens(item['item_name'], item['category'], item['description']),
+    }
+
+
+HIBID_COLUMNS = ['id', 'item_title', 'item_name', 'category', 'description', 'estimate', 'current_bid',
+                 'updated_at']
+AUCTION_COLUMNS = ['id', 'item_name', 'category', 'description', 'researcher_estimate', 'ai_estimate',
+                   'auction_site_estimate', 'updated_at']
+
+
+class ComparablesIndex:
+    def __init__(self, signature_size):
+        self.hasher = MinHasher(signature_size)
+        self._lock = threading.RLock()
+        self.count = 0
+        self.signatures = np.zeros((0, signature_size), dtype=np.uint8)
+        self.kinds = np.zeros(0, dtype=np.int8)
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.has_estimate = np.zeros(0, dtype=bool)
+        self.meta = []  # (title, category, estimate, current_bid) per row
+        self.positions = {}  # (kind, id) -> row
+        self.hibid_updated_at = None
+        self.auction_updated_at = None
+        self.refreshed_at = 0.0
+        self.reconciled_at = 0.0
+
+    def _reserve(self, extra):
+        needed = self.count + extra
+        if needed <= len(self.ids):
+            return
+        capacity = max(needed, 2 * len(self.ids), 1024)
+        grow = capacity - len(self.ids)
+        self.signatures = np.vstack([self.signatures, np.full((grow, self.hasher.size), 255, dtype=np.uint8)])
+        self.kinds = np.concatenate([self.kinds, np.zeros(grow, dtype=np.int8)])
+        self.ids = np.concatenate([self.ids, np.zeros(grow, dtype=np.int64)])
+        self.has_estimate = np.concatenate([self.has_estimate, np.zeros(grow, dtype=bool)])
+
+    def add(self, docs):
+        """Insert or replace documents (dicts from _hibid_doc / _auction_doc)"""
+        if not docs:
+            return
+        signatures = self.hasher.signatures([doc['tokens'] for doc in docs])
+        with self._lock:
+            self._reserve(len(docs))
+            for doc, signature in zip(docs, signatures):
+                key = (doc['kind'], doc['id'])
+                row = self.positions.get(key)
+                if row is None:
+                    row = self.count
+                    self.count += 1
+                    self.positions[key] = row
+                    self.meta.append(None)
+                self.signatures[row] = signature
+                self.kinds[row] = KINDS.index(doc['kind'])
+                self.ids[row] = doc['id']
+                self.has_estimate[row] = bool(parse_amounts(doc['estimate']))
+                self.meta[row] = (doc['title'], doc['category'], doc['estimate'], doc['current_bid'])
+
+    def remove(self, keys):
+        """Drop (kind, id) rows, moving the last row into each freed slot"""
+        with self._lock:
+            for key in keys:
+                row = self.positions.pop(key, None)
+                if row is None:
+                    continue
+                last = self.count - 1
+                if row != last:
+                    self.signatures[row] = self.signatures[last]
+                    self.kinds[row] = self.kinds[last]
+                    self.ids[row] = self.ids[last]
+                    self.has_estimate[row] = self.has_estimate[last]
+                    self.meta[row] = self.meta[last]
+                    self.positions[(KINDS[self.kinds[row]], int(self.ids[row]))] = row
+                self.meta.pop()
+                self.count = last
+
+    def refresh(self):
+        """
+        Add or replace items updated since the last refresh, and drop deleted
+        ones if the last reconcile is COMPARABLES_RECONCILE_SECONDS old
+        """
+        hibid = HiBidItem.objects.order_by('updated_at').values(*HIBID_COLUMNS)
+        if self.hibid_updated_at is not None:
+            hibid = hibid.filter(updated_at__gt=self.hibid_updated_at)
+        auctions = AuctionItem.objects.order_by('updated_at').values(*AUCTION_COLUMNS)
+        if self.auction_updated_at is not None:
+            auctions = auctions.filter(updated_at__gt=self.auction_updated_at)
+        hibid_rows = list(hibid.iterator(chunk_size=BUILD_CHUNK))
+        auction_rows = list(auctions.iterator(chunk_size=BUILD_CHUNK))
+        docs = [_hibid_doc(item) for item in hibid_rows] + [_auction_doc(item) for item in auction_rows]
+        self.add(docs)
+        # Only advanced here: items added on ingest may be newer than rows
+        # other workers stored but this one hasn't read yet
+        if hibid_rows:
+            self.hibid_updated_at = hibid_rows[-1]['updated_at']
+        if auction_rows:
+            self.auction_updated_at = auction_rows[-1]['updated_at']
+        if time.monotonic() - self.reconciled_at >= settings.COMPARABLES_RECONCILE_SECONDS:
+            self.reconcile()
+        self.refreshed_at = time.monotonic()
+        return len(docs)
+
+    def reconcile(self):
+        """Drop items deleted from the database since they were indexed. Returns how many."""
+        with self._lock:
+            indexed = list(self.positions)
+        existing = {
+            'hibid': set(HiBidItem.objects.values_list('id', flat=True).iterator(chunk_size=BUILD_CHUNK)),
+            'auction': set(AuctionItem.objects.values_list('id', flat=True).iterator(chunk_size=BUILD_CHUNK)),
+        }
+        # Items added after `indexed` was taken aren't checked, so ones
+        # ingested meanwhile are never dropped
+        gone = [(kind, item_id) for kind, item_id in indexed if item_id not in existing[kind]]
+        self.remove(gone)
+        self.reconciled_at = time.monotonic()
+        return len(gone)
+
+    def query(self, query_tokens, k=10, exclude=None, with_estimate=False):
+        """Top-k rows by estimated Jaccard similarity: [(kind, id, similarity, meta), ...]"""
+        signature = self.hasher.signatures([query_tokens])[0]
+        with self._lock:
+            n = self.count
+            matches = np.count_nonzero(self.signatures[:n] == signature, axis=1)
+            # b-bit estimator: unrelated items still agree on 1/256 of the positions
+            similarity = (matches / self.hasher.size - 1 / 256) / (1 - 1 / 256)
+            if with_estimate:
+                similarity = np.where(self.has_estimate[:n], similarity, -1.0)
+            if exclude is not None and exclude in self.positions:
+                similarity[self.positions[exclude]] = -1.0
+            k = min(k, n)
+            if k == 0:
+                return []
+            top = np.argpartition(-similarity, k - 1)[:k]
+            top = top[np.argsort(-similarity[top])]
+            return [
+                (KINDS[self.kinds[row]], int(self.ids[row]), float(similarity[row]), self.meta[row])
+                for row in top if similarity[row] > 0
+            ]
+
+    def save(self, path):
+        """Write the index atomically (np.savez) so workers can load it instead of rebuilding"""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            n = self.count
+            tmp_path = path.with_name(path.name + '.tmp')
+            with open(tmp_path, 'wb') as f:
+                np.savez(
+                    f,
+                    signatures=self.signatures[:n], kinds=self.kinds[:n], ids=self.ids[:n],
+                    has_estimate=self.has_estimate[:n],
+                    meta=np.array(self.meta, dtype=object).reshape(n, 4),
+                    state=np.array([self.hasher.size]),
+                    updated_at=np.array([self.hibid_updated_at, self.auction_updated_at], dtype=object),
+                )
+            os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path, signature_size):
+        with np.load(path, allow_pickle=True) as data:
+            size, = (int(v) for v in data['state'])
+            if size != signature_size:
+                raise ValueError(f'Index at {path} has signature size {size}, expected {signature_size}')
+            index = cls(signature_size)
+            index.count = len(data['ids'])
+            index.signatures = data['signatures']
+            index.kinds = data['kinds']
+            index.ids = data['ids']
+            index.has_estimate = data['has_estimate']
+            index.meta = [tuple(row) for row in data['meta']]
+            index.hibid_updated_at, index.auction_updated_at = data['updated_at']
+        index.positions = {(KINDS[kind], int(item_id)): row
+                           for row, (kind, item_id) in enumerate(zip(index.kinds, index.ids))}
+        return index
+
+
+_index = None
+_index_lock = threading.Lock()
+_updater = None  # background thread loading or refreshing _index
+
+
+def _load():
+    path = settings.COMPARABLES_INDEX_PATH
+    try:
+        return ComparablesIndex.load(path, settings.COMPARABLES_SIGNATURE_SIZE)
+    except (OSError, ValueError, KeyError) as e:
+        if os.path.exists(path):
+            print("Rebuilding comparables index, could not load saved index:", str(e))
+        return ComparablesIndex(settings.COMPARABLES_SIGNATURE_SIZE)
+
+
+def preload():
+    """
+    Load the saved index without touching the database, so a preloading
+    gunicorn master can share it with the workers it forks. They refresh it
+    from the database in the background on first use.
+    """
+    global _index
+    with _index_lock:
+        if _index is None and os.path.exists(settings.COMPARABLES_INDEX_PATH):
+            _index = _load()
+
+
+def load_index():
+    """Load the saved index, or start an empty one, and bring it up to date from the database"""
+    index = _load()
+    index.refresh()
+    return index
+
+
+def _update(index):
+    global _index, _updater
+    try:
+        if index is None:
+            index = _load()
+            if index.count:
+                # A saved index can answer queries while it catches up
+                with _index_lock:
+                    _index = index
+        index.refresh()
+        with _index_lock:
+            _index = index
+    except Exception as e:
+        print("Error updating comparables index:", str(e))
+    finally:
+        connections.close_all()
+        with _index_lock:
+            _updater = None
+
+
+def get_index():
+    """
+    This worker's index, or None until it has been loaded. Loading it and
+    refreshing it when stale happen on a background thread, so no request
+    waits on the database for them.
+    """
+    global _updater
+    with _index_lock:
+        index = _index
+        stale = index is None or time.monotonic() - index.refreshed_at >= settings.COMPARABLES_REFRESH_SECONDS
+        if stale and _updater is None:
+            _updater = threading.Thread(target=_update, args=(index,), name='comparables-index', daemon=True)
+            _updater.start()
+        return index
+
+
+def index_hibid_item(hibid_item):
+    """Add or update one ingested item in this worker's index, if the index is loaded"""
+    if _index is None:
+        return
+    _index.add([_hibid_doc({column: getattr(hibid_item, column) for column in HIBID_COLUMNS})])
+
+
+def summarize_estimates(comparables):
+    """Low / median / high of the dollar estimates of the comparables"""
+    values = []
+    for comparable in comparables:
+        amounts = parse_amounts(comparable['estimate'])
+        if amounts:
+            values.append(sum(amounts) / len(amounts))
+    if not values:
+        return None
+    return {
+        'count': len(values),
+        'low': min(values),
+        'median': statistics.median(values),
+        'high': max(values),
+    }
@@ -0,0 +1,75 @@
+"""
+Database connection metrics.
+
+``db_connections_opened_total`` counts connections opened by Django in this
+process: physical connects without pooling, pool checkouts with it. With
+the psycopg pool enabled (``OPTIONS['pool']``, see settings_prod) the
+collector below also exposes the pool's own statistics for the worker that
+serves the scrape: connections in use, idle and total, physical connects,
+requests waiting for a connection, time spent waiting, and requests that
+had to queue or timed out because the pool was exhausted.
+"""
+
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+from .metrics import registry
+
+POOL_METRICS = {
+    'db_pool_connections_in_use': ('gauge', 'Pooled connections checked out by this worker'),
+    'db_pool_connections_idle': ('gauge', 'Pooled connections idle in this worker'),
+    'db_pool_size': ('gauge', 'Connections currently held by this worker\'s pool'),
+    'db_pool_max_size': ('gauge', 'Maximum connections of this worker\'s pool'),
+    'db_pool_requests_waiting': ('gauge', 'Requests currently waiting for a pooled connection'),
+    'db_pool_requests_total': ('counter', 'Connection requests served by the pool'),
+    'db_pool_requests_queued_total': ('counter', 'Connection requests that had to wait because the pool was exhausted'),
+    'db_pool_requests_errors_total': ('counter', 'Connection requests that timed out or failed'),
+    'db_pool_wait_seconds_total': ('counter', 'Total time requests spent waiting for a pooled connection'),
+    'db_pool_connects_total': ('counter', 'Physical connections opened by the pool'),
+    'db_pool_connect_seconds_total': ('counter', 'Total time the pool spent opening connections'),
+}
+
+
+def _count_connection(sender, connection, **kwargs):
+    registry.inc('db_connections_opened_total', {'alias': connection.alias})
+
+
+connection_created.connect(_count_connection, dispatch_uid='api.db_pool.count_connection')
+
+
+def _open_pools():
+    # Pools are created lazily on first connect; reading the backend's pool
+    # registry directly avoids opening one just to report on it
+    for alias in connections:
+        pools = getattr(type(connections[alias]), '_connection_pools', None)
+        if pools and alias in pools:
+            yield alias, pools[alias]
+
+
+def pool_collector():
+    samples = {}
+    for alias, pool in _open_pools():
+        stats = pool.get_stats()
+        labels = {'alias': alias}
+        size = stats.get('pool_size', 0)
+        available = stats.get('pool_available', 0)
+        values = {
+            'db_pool_connections_in_use': size - available,
+            'db_pool_connections_idle': available,
+            'db_pool_size': size,
+            'db_pool_max_size': stats.get('pool_max', 0),
+            'db_pool_requests_waiting': stats.get('requests_waiting', 0),
+            'db_pool_requests_total': stats.get('requests_num', 0),
+            'db_pool_requests_queued_total': stats.get('requests_queued', 0),
+            'db_pool_requests_errors_total': stats.get('requests_errors', 0),
+            'db_pool_wait_seconds_total': stats.get('requests_wait_ms', 0) / 1000,
+            'db_pool_connects_total': stats.get('connections_num', 0),
+            'db_pool_connect_seconds_total': stats.get('connections_ms', 0) / 1000,
+        }
+        for name, value in values.items():
+            samples.setdefault(name, []).append((labels, value))
+
+    return [(name, POOL_METRICS[name][0], POOL_METRICS[name][1], series) for name, series in samples.items()]
+
+
+registry.register_collector(pool_collector)
@@ -0,0 +1,83 @@
+"""
+Read-replica routing.
+
+Only the list endpoints named in ``DATABASE_REPLICA_VIEWS`` read from a
+replica (any database alias other than ``default``); everything else,
+including every write, uses the primary. Once a request has written, the
+rest of that request reads from the primary as well, and the client gets a
+short-lived pin cookie so its next requests (for ``DATABASE_REPLICA_PIN_SECONDS``)
+also read from the primary and see their own writes despite replication lag.
+Without replica aliases configured the router is a no-op.
+"""
+
+import contextvars
+import random
+import time
+
+from django.conf import settings
+
+PIN_COOKIE = 'db_primary_pin'
+
+# Per request: whether reads may go to a replica, and whether we have written
+_use_replica = contextvars.ContextVar('use_replica', default=False)
+_wrote = contextvars.ContextVar('wrote', default=False)
+
+
+def replica_aliases():
+    return [alias for alias in settings.DATABASES if alias != 'default']
+
+
+class PrimaryReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        if not _use_replica.get() or _wrote.get():
+            return 'default'
+        replicas = replica_aliases()
+        return random.choice(replicas) if replicas else 'default'
+
+    def db_for_write(self, model, **hints):
+        _wrote.set(True)
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas are read-only streaming copies of the primary
+        return db == 'default'
+
+
+def _pinned(request):
+    try:
+        return float(request.COOKIES.get(PIN_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+class ReplicaRoutingMiddleware:
+    """Marks replica-eligible requests and pins clients to the primary after a write"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        wrote_token = _wrote.set(False)
+        replica_token = _use_replica.set(False)
+        try:
+            response = self.get_response(request)
+            pin_seconds = settings.DATABASE_REPLICA_PIN_SECONDS
+            if _wrote.get() and pin_seconds and replica_aliases():
+                response.set_cookie(PIN_COOKIE, str(time.time() + pin_seconds),
+                                    max_age=pin_seconds, httponly=True, samesite='Lax')
+            return response
+        finally:
+            _wrote.reset(wrote_token)
+            _use_replica.reset(replica_token)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        url_name = request.resolver_match.url_name if request.resolver_match else None
+        if (url_name in settings.DATABASE_REPLICA_VIEWS and request.method in ('GET', 'HEAD')
+                and not _pinned(request)):
+            _use_replica.set(True)
+        return None
@@ -0,0 +1,94 @@
+"""
+Sparse fieldsets (``?fields=a,b,c``) for the item list endpoints.
+
+Each output field names the model columns it is built from, so a request
+for a few fields only selects those columns (via ``.values()``) instead of
+loading every row's large JSON and text columns.
+"""
+
+
+class InvalidFields(ValueError):
+    pass
+
+
+def _isoformat(column):
+    return lambda row: row[column].isoformat() if row[column] else None
+
+
+def _length(column):
+    return lambda row: len(row[column] or [])
+
+
+def _column(column):
+    return lambda row: row[column]
+
+
+# Output field -> (columns it needs, how to build it from a .values() row)
+HIBID_ITEM_FIELDS = {
+    'id': (['id'], _column('id')),
+    'url_main': (['url_main'], _column('url_main')),
+    'item_title': (['item_title', 'item_name'], lambda row: row['item_title'] or row['item_name']),
+    'item_name': (['item_name'], _column('item_name')),
+    'lot_number': (['lot_number'], _column('lot_number')),
+    'description': (['description'], _column('description')),
+    'lead': (['lead'], _column('lead')),
+    'category': (['category'], _column('category')),
+    'estimate': (['estimate'], _column('estimate')),
+    'auction_name': (['auction_name'], _column('auction_name')),
+    'auctioneer': (['auctioneer'], _column('auctioneer')),
+    'auction_type': (['auction_type'], _column('auction_type')),
+    'auction_dates': (['auction_dates'], _column('auction_dates')),
+    'location': (['location'], _column('location')),
+    'current_bid': (['current_bid'], _column('current_bid')),
+    'bid_count': (['bid_count'], _column('bid_count')),
+    'time_remaining': (['time_remaining'], _column('time_remaining')),
+    'shipping_available': (['shipping_available'], _column('shipping_available')),
+    'main_image_url': (['main_image_url'], _column('main_image_url')),
+    'image_count': (['all_unique_image_urls'], _length('all_unique_image_urls')),
+    'gallery_count': (['gallery_image_urls'], _length('gallery_image_urls')),
+    'ai_response': (['ai_response'], _column('ai_response')),
+    'status': (['status'], _column('status')),
+    'processed_at': (['processed_at'], _isoformat('processed_at')),
+}
+
+
+def parse(param, available):
+    """
+    The requested output fields, in request order, or all of `available` when
+    `param` is empty. Raises InvalidFields for unknown names.
+    """
+    if not param:
+        return list(available)
+    fields = []
+    for name in param.split(','):
+        name = name.strip()
+        if name and name not in fields:
+            fields.append(name)
+    unknown = [name for name in fields if name not in available]
+    if unknown or not fields:
+        raise InvalidFields(
+            f"Unknown field(s): {', '.join(unknown) or '(none given)'}. Available: {', '.join(available)}"
+        )
+    return fields
+
+
+def columns(fields, available):
+    """Model columns needed to build `fields`"""
+    needed = []
+    for name in fields:
+        for column in available[name][0]:
+            if column not in needed:
+                needed.append(column)
+    return needed
+
+
+def rows(queryset, fields, available, chunk_size=None):
+    """
+    Yield one output dict per row, selecting only the needed columns. With
+    `chunk_size` the rows are fetched through a (server-side, on PostgreSQL)
+    cursor that many at a time instead of all at once.
+    """
+    builders = [(name, available[name][1]) for name in fields]
+    values = queryset.values(*columns(fields, available))
+    for row in values.iterator(chunk_size=chunk_size) if chunk_size else values:
+        yield {name: build(row) for name, build in builders}
@@ -0,0 +1,255 @@
+"""
+Disk cache behind the image proxy endpoint.
+
+Remote images (HiBid lot photos) are downloaded once into
+``IMAGE_CACHE_DIR/originals`` and resized on demand into fixed-size WebP/JPEG
+thumbnails under ``IMAGE_CACHE_DIR/thumbs``. Every hit refreshes the file's
+mtime, and once the cache grows past ``IMAGE_CACHE_MAX_BYTES`` the least
+recently used files are evicted.
+"""
+
+import hashlib
+import os
+import threading
+import time
+import uuid
+from pathlib import Path
+from urllib.parse import urljoin, urlparse
+
+from django.conf import settings
+
+# Longest edge in pixels for each thumbnail size
+THUMBNAIL_SIZES = {
+    'thumb': 200,
+    'card': 480,
+    'large': 1200,
+}
+FORMATS = {
+    'webp': ('WEBP', 'image/webp'),
+    'jpeg': ('JPEG', 'image/jpeg'),
+}
+CHUNK_SIZE = 64 * 1024
+EVICTION_INTERVAL = 60
+MAX_REDIRECTS = 5
+
+_fetch_locks = {}  # url key -> [lock, number of callers using it]
+_fetch_locks_guard = threading.Lock()
+_last_eviction = 0.0
+
+
+class ImageCacheError(Exception):
+    pass
+
+
+class ImageFetchError(ImageCacheError):
+    pass
+
+
+def cache_dir():
+    return Path(settings.IMAGE_CACHE_DIR)
+
+
+def url_key(url):
+    return hashlib.sha256(url.encode('utf-8')).hexdigest()
+
+
+def is_allowed(url):
+    """Only proxy http(s) URLs on the configured hosts (or their subdomains)"""
+    parsed = urlparse(url)
+    if parsed.scheme not in ('http', 'https') or not parsed.hostname:
+        return False
+    host = parsed.hostname.lower()
+    return any(host == allowed or host.endswith('.' + allowed)
+               for allowed in settings.IMAGE_PROXY_ALLOWED_HOSTS)
+
+
+def original_path(url):
+    key = url_key(url)
+    return cache_dir() / 'originals' / key[:2] / key
+
+
+def thumbnail_path(url, size, fmt):
+    key = url_key(url)
+    return cache_dir() / 'thumbs' / size / key[:2] / f'{key}.{fmt}'
+
+
+def _touch(path):
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+
+
+def _acquire_lock(key):
+    with _fetch_locks_guard:
+        entry = _fetch_locks.setdefault(key, [threading.Lock(), 0])
+        entry[1] += 1
+    entry[0].acquire()
+
+
+def _release_lock(key):
+    with _fetch_locks_guard:
+        entry = _fetch_locks[key]
+        entry[0].release()
+        entry[1] -= 1
+        # Only dropped once no caller is waiting on it, so they all share one download
+        if not entry[1]:
+            del _fetch_locks[key]
+
+
+def _write_atomic(path, write):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.parent / f'.{uuid.uuid4().hex}.tmp'
+    try:
+        with open(tmp_path, 'wb') as f:
+            write(f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+
+def fetch_original(url, session=None):
+    """
+    Return (path, downloaded) for the cached original of `url`, downloading it
+    on first use. Concurrent callers in the same process share one download.
+    """
+    path = original_path(url)
+    if path.is_file():
+        _touch(path)
+        return path, False
+
+    key = url_key(url)
+    _acquire_lock(key)
+    try:
+        if path.is_file():
+            return path, False
+        _download(url, path, session)
+    finally:
+        _release_lock(key)
+
+    maybe_evict()
+    return path, True
+
+
+def _get(url, session=None):
+    """GET `url`, following redirects only to allowed hosts"""
+    import requests
+
+    for _ in range(MAX_REDIRECTS + 1):
+        try:
+            response = (session or requests).get(
+                url, stream=True, timeout=settings.IMAGE_PROXY_FETCH_TIMEOUT, allow_redirects=False,
+                headers={'User-Agent': 'bidsquire-image-proxy'}
+            )
+        except requests.RequestException as e:
+            raise ImageFetchError(f'Image fetch failed: {str(e)}')
+        if not response.is_redirect:
+            return response
+        response.close()
+        url = urljoin(url, response.headers['Location'])
+        if not is_allowed(url):
+            raise ImageFetchError(f'Image fetch redirected to a host that is not allowed: {url}')
+    raise ImageFetchError(f'Image fetch exceeded {MAX_REDIRECTS} redirects')
+
+
+def _download(url, path, session=None):
+    import requests
+
+    max_bytes = settings.IMAGE_PROXY_MAX_SOURCE_BYTES
+    response = _get(url, session)
+    with response:
+        if response.status_code != 200:
+            raise ImageFetchError(f'Image fetch returned status {response.status_code}')
+
+        def write(f):
+            received = 0
+            for chunk in response.iter_content(CHUNK_SIZE):
+                received += len(chunk)
+                if received > max_bytes:
+                    raise ImageFetchError(f'Image exceeds {max_bytes} bytes')
+                f.write(chunk)
+
+        try:
+            _write_atomic(path, write)
+        except requests.RequestException as e:
+            raise ImageFetchError(f'Image fetch failed: {str(e)}')
+
+
+def get_thumbnail(url, size, fmt):
+    """Return the path of the `size` thumbnail of `url` in `fmt`, generating it if needed"""
+    if size not in THUMBNAIL_SIZES:
+        raise ImageCacheError(f'Unknown size {size}')
+    if fmt not in FORMATS:
+        raise ImageCacheError(f'Unknown format {fmt}')
+
+    path = thumbnail_path(url, size, fmt)
+    if path.is_file():
+        _touch(path)
+        return path
+
+    source, _ = fetch_original(url)
+
+    from PIL import Image, ImageOps, UnidentifiedImageError
+
+    pil_format, _ = FORMATS[fmt]
+    edge = THUMBNAIL_SIZES[size]
+    try:
+        with Image.open(source) as image:
+            image = ImageOps.exif_transpose(image)
+            image.thumbnail((edge, edge))
+            if pil_format == 'JPEG' and image.mode not in ('RGB', 'L'):
+                image = image.convert('RGB')
+            elif image.mode not in ('RGB', 'RGBA', 'L'):
+                image = image.convert('RGBA')
+            options = {'quality': 80} if pil_format == 'WEBP' else {'quality': 82, 'optimize': True, 'progressive': True}
+            _write_atomic(path, lambda f: image.save(f, pil_format, **options))
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError) as e:
+        raise ImageCacheError(f'Could not decode image: {str(e)}')
+
+    maybe_evict()
+    return path
+
+
+def maybe_evict(force=False):
+    """Run eviction at most once per EVICTION_INTERVAL seconds per process"""
+    global _last_eviction
+    now = time.monotonic()
+    if not force and now - _last_eviction < EVICTION_INTERVAL:
+        return 0
+    _last_eviction = now
+    return evict()
+
+
+def evict(max_bytes=None):
+    """
+    Delete least recently used files until the cache is below 90% of
+    `max_bytes` (default IMAGE_CACHE_MAX_BYTES). Returns the bytes freed.
+    """
+    max_bytes = settings.IMAGE_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+    entries = []
+    total = 0
+    for root, _, files in os.walk(cache_dir()):
+        for name in files:
+            path = os.path.join(root, name)
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+            total += st.st_size
+
+    if total <= max_bytes:
+        return 0
+
+    target = int(max_bytes * 0.9)
+    freed = 0
+    for _, size, path in sorted(entries):
+        if total - freed <= target:
+            break
+        try:
+            os.remove(path)
+            freed += size
+        except FileNotFoundError:
+            pass
+    return freed
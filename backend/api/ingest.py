@@ -0,0 +1,210 @@
+"""
+Apply n8n webhook payloads to the database.
+
+Shared by the synchronous receive_webhook_data path and the write-behind
+ingestion buffer flusher, so both store a payload the same way.
+"""
+
+from django.utils import timezone
+
+from . import bid_refresh
+from . import prefetch
+from .metrics import registry
+from .models import HiBidItem, WebhookData
+
+
+def classify(data):
+    """Return 'hibid', 'sku' or None for an incoming webhook payload"""
+    if not isinstance(data, dict):
+        return None
+    # Check if this is HiBid URL processing data
+    if 'url_main' in data and 'hibid.com' in (data.get('url_main') or ''):
+        return 'hibid'
+    # Check if this is SKU-based data (existing functionality)
+    if 'sku' in data:
+        return 'sku'
+    return None
+
+
+def validate(data):
+    """Return an error message for a payload that can't be stored, or None"""
+    kind = classify(data)
+    if kind is None:
+        return 'Unknown webhook data format. Expected either HiBid URL data or SKU-based data.'
+    if kind == 'hibid' and not data.get('url_main'):
+        return 'url_main is required for HiBid data'
+    if kind == 'sku' and not data.get('sku'):
+        return 'sku is required in webhook data'
+    return None
+
+
+def apply_hibid_data(data):
+    """Create or update the HiBidItem for `data['url_main']`. Returns (item, created)."""
+    url_main = data.get('url_main')
+
+    # Extract data from the webhook response (matching n8n JSON structure)
+    item_title = data.get('item_name', '')  # Use item_name as item_title
+    lot_number = data.get('lot_number', '')
+    description = data.get('description', '')
+    lead = data.get('lead', '')
+    item_name = data.get('item_name', '')
+    category = data.get('category', '')
+    estimate = data.get('estimate', '')
+    auction_name = data.get('auction_name', '')
+    auctioneer = data.get('auctioneer', '')
+    auction_type = data.get('auction_type', '')
+    auction_dates = data.get('auction_dates', '')
+    location = data.get('location', '')
+    current_bid = data.get('current_bid', '')
+    bid_count = data.get('bid_count', 0)
+    time_remaining = data.get('time_remaining', '')
+    shipping_available = data.get('shipping_available', False)
+
+    # Extract image URLs from n8n processing
+    all_unique_image_urls = data.get('all_unique_image_urls', [])
+    main_image_url = data.get('main_image_url', '')
+    gallery_image_urls = data.get('gallery_image_urls', [])
+    broad_search_images = data.get('broad_search_images', [])
+    tumbnail_images = data.get('tumbnail_images', [])
+
+    # Extract AI response
+    ai_response = data.get('ai_response', '')
+
+    print(f"Processing HiBid data for: {item_name} (Lot: {lot_number})")
+    print(f"Images found: {len(all_unique_image_urls)} unique, {len(gallery_image_urls)} gallery")
+
+    # Create or update HiBid item
+    now = timezone.now()
+    hibid_item, created = HiBidItem.objects.get_or_create(
+        url_main=url_main,
+        defaults={
+            'item_title': item_title,
+            'lot_number': lot_number,
+            'description': description,
+            'lead': lead,
+            'item_name': item_name,
+            'category': category,
+            'estimate': estimate,
+            'auction_name': auction_name,
+            'auctioneer': auctioneer,
+            'auction_type': auction_type,
+            'auction_dates': auction_dates,
+            'location': location,
+            'current_bid': current_bid,
+            'bid_count': bid_count,
+            'time_remaining': time_remaining,
+            'shipping_available': shipping_available,
+            'all_unique_image_urls': all_unique_image_urls,
+            'main_image_url': main_image_url,
+            'gallery_image_urls': gallery_image_urls,
+            'broad_search_images': broad_search_images,
+            'tumbnail_images': tumbnail_images,
+            'ai_response': ai_response,
+            'raw_data': data,
+            'status': 'processed',
+            **bid_refresh.schedule_fields(HiBidItem(), time_remaining, auction_dates, now)
+        }
+    )
+
+    if not created:
+        # Update existing record
+        updates = {
+            'item_title': item_title or hibid_item.item_title,
+            'lot_number': lot_number or hibid_item.lot_number,
+            'description': description or hibid_item.description,
+            'lead': lead or hibid_item.lead,
+            'item_name': item_name or hibid_item.item_name,
+            'category': category or hibid_item.category,
+            'estimate': estimate or hibid_item.estimate,
+            'auction_name': auction_name or hibid_item.auction_name,
+            'auctioneer': auctioneer or hibid_item.auctioneer,
+            'auction_type': auction_type or hibid_item.auction_type,
+            'auction_dates': auction_dates or hibid_item.auction_dates,
+            'location': location or hibid_item.location,
+            'current_bid': current_bid or hibid_item.current_bid,
+            'bid_count': bid_count or hibid_item.bid_count,
+            'shipping_available': shipping_available,
+            'all_unique_image_urls': all_unique_image_urls or hibid_item.all_unique_image_urls,
+            'main_image_url': main_image_url or hibid_item.main_image_url,
+            'gallery_image_urls': gallery_image_urls or hibid_item.gallery_image_urls,
+            'broad_search_images': broad_search_images or hibid_item.broad_search_images,
+            'tumbnail_images': tumbnail_images or hibid_item.tumbnail_images,
+            'ai_response': ai_response or hibid_item.ai_response,
+            'status': 'processed',
+        }
+        updates.update(bid_refresh.schedule_fields(hibid_item, time_remaining, updates['auction_dates'], now))
+        # Live bid refreshes mostly bring back the same data. The countdown text
+        # always differs, so it (and raw_data) is only written along with a real
+        # change; an end time that moved is a change (see bid_refresh.schedule_fields)
+        changed = [
+            field for field, value in updates.items()
+            if getattr(hibid_item, field) != HiBidItem._meta.get_field(field).to_python(value)
+        ]
+        if not changed:
+            print(f"HiBid item {hibid_item.id} unchanged, not saving")
+            registry.inc('hibid_ingest_writes_total', {'result': 'unchanged'})
+            return hibid_item, created
+        for field, value in updates.items():
+            setattr(hibid_item, field, value)
+        hibid_item.time_remaining = time_remaining or hibid_item.time_remaining
+        hibid_item.raw_data = data
+        hibid_item.save(update_fields=changed + ['time_remaining', 'raw_data', 'updated_at'])
+
+    registry.inc('hibid_ingest_writes_total', {'result': 'created' if created else 'updated'})
+
+    # Download the item's images in the background so the first viewer doesn't pay for it
+    try:
+        prefetch.enqueue_item(hibid_item)
+    except Exception as e:
+        print("Failed to schedule image prefetch:", str(e))
+
+    # Make the item available as a comparable right away in this worker
+    try:
+        from . import comparables
+        comparables.index_hibid_item(hibid_item)
+    except Exception as e:
+        print("Failed to update comparables index:", str(e))
+
+    return hibid_item, created
+
+
+def apply_sku_data(data):
+    """Create or update the WebhookData for `data['sku']`. Returns (webhook_data, created)."""
+    sku = data.get('sku')
+
+    # Check if webhook data already exists for this SKU
+    webhook_data, created = WebhookData.objects.get_or_create(
+        sku=sku,
+        defaults={
+            'ebay_title': data.get('ebay_title', ''),
+            'ebay_description': data.get('ebay_description', ''),
+            'condition': data.get('condition', ''),
+            'ai_improved_estimate': data.get('ai_improved_estimate', ''),
+            'ai_improved_description': data.get('ai_improved_description', ''),
+            'quantity': data.get('quantity', 1),
+            'raw_data': data
+        }
+    )
+
+    if not created:
+        # Update existing record
+        webhook_data.ebay_title = data.get('ebay_title', webhook_data.ebay_title)
+        webhook_data.ebay_description = data.get('ebay_description', webhook_data.ebay_description)
+        webhook_data.condition = data.get('condition', webhook_data.condition)
+        webhook_data.ai_improved_estimate = data.get('ai_improved_estimate', webhook_data.ai_improved_estimate)
+        webhook_data.ai_improved_description = data.get('ai_improved_description', webhook_data.ai_improved_description)
+        webhook_data.quantity = data.get('quantity', webhook_data.quantity)
+        webhook_data.raw_data = data
+        webhook_data.save()
+
+    return webhook_data, created
+
+
+def apply(data):
+    """Store one validated payload. Returns (kind, instance, created)."""
+    kind = classify(data)
+    if kind == 'hibid':
+        return (kind,) + apply_hibid_data(data)
+    if kind == 'sku':
+        return (kind,) + apply_sku_data(data)
+    raise ValueError(validate(data))
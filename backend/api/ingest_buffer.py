@@ -0,0 +1,316 @@
+"""
+Write-behind buffer for receive_webhook_data.
+
+With ``WEBHOOK_INGEST_MODE = 'buffered'`` the view only validates a payload,
+appends it to a durable buffer and acks with 202. ``manage.py
+flush_ingest_buffer`` then applies buffered payloads in batches, one
+transaction per batch, so a burst of n8n callbacks costs a few commits instead
+of hundreds. Results become readable within roughly one flush interval.
+
+A payload is only removed from the buffer once it is stored, or once it is
+known it never can be: payloads that fail validation, can't be decoded or
+are rejected by the database as bad data go to the ``IngestDeadLetter``
+table, in the same transaction as the rest of the batch. A transient
+database error (locked database, deadlock, lock timeout, lost connection)
+ends the batch at that payload; the ones before it are committed and it
+stays buffered for the next pass.
+
+Two buffers are available:
+
+* ``redis`` - a Redis stream read through a consumer group; entries are
+  acknowledged and deleted after the batch commits. A flusher first re-reads
+  the entries delivered to its consumer name (``WEBHOOK_INGEST_CONSUMER``,
+  stable across restarts) but never acknowledged, and periodically claims
+  entries left idle for ``WEBHOOK_INGEST_CLAIM_IDLE_SECONDS`` by any other
+  consumer. Redis must persist the stream (appendonly, see docker-compose.yml),
+  or payloads already acked with 202 are lost when it restarts.
+* ``file`` - an fsync'd append-only JSON-lines log under
+  ``WEBHOOK_INGEST_LOG_DIR`` with a committed byte offset kept beside it.
+  The log is truncated once fully consumed.
+"""
+
+import fcntl
+import json
+import os
+import time
+import uuid
+from pathlib import Path
+
+from django.conf import settings
+from django.db import InterfaceError, OperationalError, transaction
+
+from . import ingest
+from .metrics import registry
+from .models import IngestDeadLetter
+
+# Database errors worth retrying the payload for, rather than dead-lettering it
+TRANSIENT_ERRORS = (OperationalError, InterfaceError)
+
+
+class FileBuffer:
+    name = 'file'
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.log_path = self.directory / 'ingest.log'
+        self.offset_path = self.directory / 'ingest.offset'
+        self.lock_path = self.directory / 'ingest.lock'
+
+    def _locked(self):
+        lock = open(self.lock_path, 'a')
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        return lock
+
+    def append(self, data):
+        record_id = uuid.uuid4().hex
+        line = json.dumps({'id': record_id, 'data': data}, separators=(',', ':')) + '\n'
+        with self._locked():
+            with open(self.log_path, 'a', encoding='utf-8') as log:
+                log.write(line)
+                log.flush()
+                os.fsync(log.fileno())
+        return record_id
+
+    def _read_offset(self):
+        try:
+            return int(self.offset_path.read_text() or 0)
+        except (FileNotFoundError, ValueError):
+            return 0
+
+    def _write_offset(self, offset):
+        tmp_path = self.offset_path.with_suffix('.tmp')
+        tmp_path.write_text(str(offset))
+        os.replace(tmp_path, self.offset_path)
+
+    def read(self, batch_size, block_ms=0):
+        """Up to batch_size complete records after the committed offset, each with the offset just past it"""
+        offset = self._read_offset()
+        records = []
+        try:
+            with open(self.log_path, 'rb') as log:
+                log.seek(offset)
+                while len(records) < batch_size:
+                    line = log.readline()
+                    if not line.endswith(b'\n'):
+                        break  # end of log, or a record still being written
+                    start, offset = offset, offset + len(line)
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError as e:
+                        record = {'id': f'offset-{start}', 'raw': line.decode('utf-8', 'replace'),
+                                  'error': f'Undecodable ingest buffer line: {e}'}
+                    record['offset'] = offset
+                    records.append(record)
+        except FileNotFoundError:
+            pass
+        if not records and block_ms:
+            time.sleep(block_ms / 1000)
+        return records
+
+    def commit(self, records):
+        """Move the committed offset past `records`, which must start at the committed offset"""
+        if not records:
+            return
+        offset = records[-1]['offset']
+        with self._locked():
+            self._write_offset(offset)
+            # Compact once everything written so far has been applied
+            if self.log_path.exists() and self.log_path.stat().st_size == offset:
+                with open(self.log_path, 'w'):
+                    pass
+                self._write_offset(0)
+
+    def rewind(self):
+        """Nothing to do: records after the committed offset are read again"""
+
+    def pending(self):
+        try:
+            size = self.log_path.stat().st_size
+        except FileNotFoundError:
+            return 0
+        return max(size - self._read_offset(), 0)
+
+
+class RedisStreamBuffer:
+    name = 'redis'
+    group = 'flushers'
+
+    def __init__(self, url, consumer, claim_idle_seconds, stream='api:ingest'):
+        import redis
+
+        self._redis = redis
+        self.client = redis.Redis.from_url(url)
+        self.stream = stream
+        self.consumer = consumer
+        self.claim_idle_ms = int(claim_idle_seconds * 1000)
+        self._group_ready = False
+        self._recovered = False
+        self._claimed_at = 0.0
+
+    def _ensure_group(self):
+        if self._group_ready:
+            return
+        try:
+            self.client.xgroup_create(self.stream, self.group, id='0', mkstream=True)
+        except self._redis.ResponseError as e:
+            if 'BUSYGROUP' not in str(e):
+                raise
+        self._group_ready = True
+
+    def append(self, data):
+        return self.client.xadd(self.stream, {'data': json.dumps(data, separators=(',', ':'))}).decode()
+
+    def _claim(self, batch_size):
+        """Take over entries another consumer (e.g. a renamed or removed flusher) left unacknowledged"""
+        now = time.monotonic()
+        if now - self._claimed_at < self.claim_idle_ms / 1000 / 2:
+            return []
+        _, entries, *_ = self.client.xautoclaim(
+            self.stream, self.group, self.consumer, self.claim_idle_ms, start_id='0-0', count=batch_size
+        )
+        if len(entries) < batch_size:
+            self._claimed_at = now
+        return entries
+
+    def read(self, batch_size, block_ms=0):
+        self._ensure_group()
+        entries = []
+        if not self._recovered:
+            # Entries delivered to this consumer but never acknowledged come first
+            response = self.client.xreadgroup(self.group, self.consumer, {self.stream: '0'}, count=batch_size)
+            entries = response[0][1] if response else []
+            self._recovered = not entries
+        if not entries:
+            entries = self._claim(batch_size)
+        if not entries:
+            response = self.client.xreadgroup(
+                self.group, self.consumer, {self.stream: '>'}, count=batch_size, block=block_ms
+            )
+            entries = response[0][1] if response else []
+        records = []
+        deleted = []
+        for entry_id, fields in entries:
+            if not fields:
+                # Deleted meanwhile (already applied); only its pending entry is left
+                deleted.append(entry_id)
+                continue
+            try:
+                records.append({'id': entry_id.decode(), 'data': json.loads(fields[b'data'])})
+            except (KeyError, ValueError) as e:
+                records.append({'id': entry_id.decode(), 'raw': repr(fields)[:10000],
+                                'error': f'Undecodable ingest stream entry: {e}'})
+        if deleted:
+            self.client.xack(self.stream, self.group, *deleted)
+        return records
+
+    def rewind(self):
+        """Re-read this consumer's unacknowledged entries before new ones"""
+        self._recovered = False
+
+    def commit(self, records):
+        """Acknowledge and delete the entries of `records`"""
+        if records:
+            ids = [record['id'] for record in records]
+            pipe = self.client.pipeline()
+            pipe.xack(self.stream, self.group, *ids)
+            pipe.xdel(self.stream, *ids)
+            pipe.execute()
+
+    def pending(self):
+        return self.client.xlen(self.stream)
+
+
+_buffer = None
+
+
+def get_buffer():
+    global _buffer
+    if _buffer is None:
+        backend = settings.WEBHOOK_INGEST_BACKEND or ('redis' if settings.REDIS_URL else 'file')
+        if backend == 'redis':
+            _buffer = RedisStreamBuffer(settings.REDIS_URL, settings.WEBHOOK_INGEST_CONSUMER,
+                                        settings.WEBHOOK_INGEST_CLAIM_IDLE_SECONDS)
+        else:
+            _buffer = FileBuffer(settings.WEBHOOK_INGEST_LOG_DIR)
+    return _buffer
+
+
+def is_enabled():
+    return settings.WEBHOOK_INGEST_MODE == 'buffered'
+
+
+def _apply(record):
+    if 'error' in record:
+        raise ValueError(record['error'])
+    error = ingest.validate(record['data'])
+    if error:
+        raise ValueError(error)
+    ingest.apply(record['data'])
+
+
+def dead_letter(buffer, record, error):
+    """Keep a payload that can never be applied in the IngestDeadLetter table"""
+    IngestDeadLetter.objects.create(
+        record_id=record['id'], backend=buffer.name, data=record.get('data'),
+        raw=record.get('raw', ''), error=str(error),
+    )
+    registry.inc('webhook_ingest_dead_letters_total', {'backend': buffer.name})
+    print(f"Moved buffered webhook record {record['id']} to the dead-letter table:", str(error))
+
+
+def flush(buffer=None, batch_size=None, block_ms=0):
+    """
+    Apply one batch of buffered payloads in a single transaction. A payload
+    that can never be applied is dead-lettered without aborting the batch.
+    A transient database error ends the batch: the payloads before it are
+    committed, it and the rest are read again next time, and the error is
+    raised. Returns (applied, failed).
+    """
+    buffer = buffer or get_buffer()
+    records = buffer.read(batch_size or settings.WEBHOOK_INGEST_BATCH_SIZE, block_ms=block_ms)
+    if not records:
+        return 0, 0
+
+    applied = failed = 0
+    handled = []
+    retry = None
+    try:
+        with transaction.atomic():
+            for record in records:
+                try:
+                    with transaction.atomic():
+                        _apply(record)
+                    applied += 1
+                except TRANSIENT_ERRORS as e:
+                    retry = e
+                    break
+                except Exception as e:
+                    dead_letter(buffer, record, e)
+                    failed += 1
+                handled.append(record)
+    except Exception:
+        # The batch rolled back (e.g. the database went away); read it again next time
+        buffer.rewind()
+        raise
+    buffer.commit(handled)
+    if retry is not None:
+        buffer.rewind()
+        raise retry
+    return applied, failed
+
+
+def pending_collector():
+    if not is_enabled():
+        return []
+    try:
+        pending = get_buffer().pending()
+    except Exception:
+        return []
+    unit = 'bytes' if get_buffer().name == 'file' else 'records'
+    return [('webhook_ingest_buffer_pending', 'gauge',
+             f'Buffered webhook payloads not yet applied ({unit})',
+             [({'backend': get_buffer().name}, pending)])]
+
+
+registry.register_collector(pending_collector)
@@ -0,0 +1,48 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from api import archive
+
+
+class Command(BaseCommand):
+    help = ('Move HiBid items no auction item links to, and webhook data not tied to an auction '
+            'item still in progress, older than ARCHIVE_AFTER_DAYS to the archive tables or to Parquet files')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=None, help='Archive rows older than this (default ARCHIVE_AFTER_DAYS)')
+        parser.add_argument('--table', choices=sorted(archive.TARGETS), action='append',
+                            help='Table to archive (repeatable, default: all)')
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--parquet-dir', default=None,
+                            help='Write Parquet files here instead of the archive tables (requires pyarrow)')
+        parser.add_argument('--dry-run', action='store_true', help='Only count the rows that would be archived')
+
+    def handle(self, *args, **options):
+        days = options['days'] if options['days'] is not None else settings.ARCHIVE_AFTER_DAYS
+        cutoff = timezone.now() - timedelta(days=days)
+
+        sink = archive.TableSink()
+        if options['parquet_dir']:
+            try:
+                sink = archive.ParquetSink(options['parquet_dir'])
+            except RuntimeError as e:
+                raise CommandError(str(e))
+
+        for name in options['table'] or archive.TARGETS:
+            target = archive.TARGETS[name]
+            if options['dry_run']:
+                count = target.candidates(cutoff).count()
+                self.stdout.write(f'{name}: {count} rows older than {cutoff:%Y-%m-%d} would be archived')
+                continue
+
+            moved = 0
+            while True:
+                batch = archive.archive_batch(target, cutoff, sink, batch_size=options['batch_size'])
+                if not batch:
+                    break
+                moved += batch
+                self.stdout.write(f'{name}: archived {moved} rows so far')
+            self.stdout.write(self.style.SUCCESS(f'{name}: moved {moved} rows to {sink.name} archive'))
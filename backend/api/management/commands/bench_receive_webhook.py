@@ -0,0 +1,110 @@
+import io
+import statistics
+import time
+import uuid
+from contextlib import redirect_stdout
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections, connections
+from django.db.backends.signals import connection_created
+from django.test import Client, override_settings
+
+MODES = ('per-request', 'persistent', 'configured')
+
+
+class Command(BaseCommand):
+    help = ('Measure receive_webhook_data latency and database connect cost with per-request '
+            'connections, persistent connections and the configured setup (e.g. the psycopg pool). '
+            'Writes SKU payloads to the configured database.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500)
+        parser.add_argument('--mode', choices=MODES, action='append',
+                            help='Connection mode to run (repeatable, default: all)')
+        parser.add_argument('--host', default='localhost', help='Host header, must be in ALLOWED_HOSTS')
+        parser.add_argument('--keep', action='store_true', help='Keep the benchmark rows')
+
+    def handle(self, *args, **options):
+        from api.models import WebhookData
+
+        connection = connections['default']
+        original = dict(connection.settings_dict)
+        original_options = dict(original.get('OPTIONS', {}))
+        prefix = f'bench-{uuid.uuid4().hex[:8]}'
+
+        opened = []
+        connect_seconds = []
+        real_connect = connection.get_new_connection
+
+        def timed_connect(conn_params):
+            start = time.perf_counter()
+            try:
+                return real_connect(conn_params)
+            finally:
+                connect_seconds.append(time.perf_counter() - start)
+
+        def count(sender, connection, **kwargs):
+            if connection.alias == 'default':
+                opened.append(1)
+
+        if connection.vendor != 'postgresql':
+            self.stderr.write(f'Running on {connection.vendor}: connect costs are not representative, '
+                              f'and there is no connection pool to measure in "configured" mode')
+
+        connection.get_new_connection = timed_connect
+        connection_created.connect(count)
+        client = Client(HTTP_HOST=options['host'])
+        # Measure the write path itself, not the 429s admission control would return
+        no_admission = override_settings(ADMISSION_CONTROL_ENABLED=False)
+        no_admission.enable()
+        try:
+            for mode in options['mode'] or MODES:
+                connection.close()
+                connection.settings_dict.update(original)
+                connection.settings_dict['OPTIONS'] = dict(original_options)
+                if mode != 'configured':
+                    # Plain connections: no pool, closed after every request or kept for the run
+                    connection.settings_dict['OPTIONS'].pop('pool', None)
+                    connection.settings_dict['CONN_MAX_AGE'] = 0 if mode == 'per-request' else 600
+                    connection.settings_dict['CONN_HEALTH_CHECKS'] = mode == 'persistent'
+
+                opened.clear()
+                connect_seconds.clear()
+                pool = getattr(connection, 'pool', None) if mode == 'configured' else None
+                pool_connects = pool.get_stats().get('connections_num', 0) if pool else 0
+                latencies = []
+                started = time.perf_counter()
+                for i in range(options['requests']):
+                    payload = {'sku': f'{prefix}-{mode}-{i}', 'ebay_title': 'Benchmark item', 'quantity': 1}
+                    start = time.perf_counter()
+                    with redirect_stdout(io.StringIO()):
+                        response = client.post('/api/receive-webhook-data/', payload, content_type='application/json')
+                    # The test client skips the end-of-request connection handling the
+                    # WSGI handler does, so apply it here
+                    close_old_connections()
+                    latencies.append(time.perf_counter() - start)
+                    if response.status_code not in (200, 201, 202):
+                        raise CommandError(f'{mode}: request {i} returned {response.status_code}, '
+                                           f'not measuring: {response.content[:300]!r}')
+                elapsed = time.perf_counter() - started
+
+                latencies.sort()
+                self.stdout.write(
+                    f'{mode:>12}: {len(latencies) / elapsed:7.1f} req/s  '
+                    f'p50 {statistics.median(latencies) * 1000:6.2f} ms  '
+                    f'p95 {latencies[int(len(latencies) * 0.95) - 1] * 1000:6.2f} ms  '
+                    f'connects {len(opened):5d}  '
+                    f'connect time {sum(connect_seconds) * 1000:8.1f} ms'
+                )
+                if pool:
+                    physical = pool.get_stats().get('connections_num', 0) - pool_connects
+                    self.stdout.write(f'{"":>12}  (pool checkouts above; {physical} physical connects)')
+        finally:
+            no_admission.disable()
+            connection_created.disconnect(count)
+            del connection.get_new_connection
+            connection.close()
+            connection.settings_dict.update(original)
+            connection.settings_dict['OPTIONS'] = original_options
+            if not options['keep']:
+                WebhookData.objects.filter(sku__startswith=prefix).delete()
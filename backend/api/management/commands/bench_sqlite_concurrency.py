@@ -0,0 +1,102 @@
+import statistics
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connections, transaction
+
+PROFILES = {
+    'default': {},
+    'concurrent': settings.SQLITE_CONCURRENT_OPTIONS,
+}
+
+
+class Command(BaseCommand):
+    help = ('Compare SQLite write throughput and read latency under concurrent webhook-style '
+            'writers and dashboard-style readers, with the default options and SQLITE_PROFILE=concurrent. '
+            'Runs against throwaway database files.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--writers', type=int, default=4)
+        parser.add_argument('--readers', type=int, default=4)
+        parser.add_argument('--seconds', type=float, default=10)
+        parser.add_argument('--profile', choices=sorted(PROFILES), action='append',
+                            help='Profile to run (repeatable, default: all)')
+
+    def handle(self, *args, **options):
+        with tempfile.TemporaryDirectory(prefix='sqlite-bench-') as directory:
+            for name in options['profile'] or PROFILES:
+                self.run_profile(name, Path(directory) / f'{name}.sqlite3', options)
+
+    def run_profile(self, name, path, options):
+        from api.models import WebhookData
+
+        alias = f'bench_{name}'
+        connections.settings[alias] = connections.configure_settings({
+            'default': connections.settings['default'],
+            alias: {'ENGINE': 'django.db.backends.sqlite3', 'NAME': str(path), 'OPTIONS': dict(PROFILES[name])}
+        })[alias]
+        with connections[alias].schema_editor() as editor:
+            editor.create_model(WebhookData)
+        for i in range(500):
+            WebhookData.objects.using(alias).create(sku=f'seed-{i}', ebay_title='Seed item')
+
+        stop = threading.Event()
+        lock = threading.Lock()
+        results = {'writes': 0, 'write_errors': 0, 'read_errors': 0, 'read_latencies': []}
+
+        def writer(number):
+            # Same shape as ingest.apply_sku_data: read the row, then insert or update it
+            i = 0
+            while not stop.is_set():
+                sku = f'bench-{number}-{i % 200}'
+                try:
+                    with transaction.atomic(using=alias):
+                        item, created = WebhookData.objects.using(alias).get_or_create(
+                            sku=sku, defaults={'ebay_title': 'Benchmark item'}
+                        )
+                        if not created:
+                            item.quantity += 1
+                            item.save(using=alias)
+                    with lock:
+                        results['writes'] += 1
+                except OperationalError:
+                    with lock:
+                        results['write_errors'] += 1
+                i += 1
+            connections[alias].close()
+
+        def reader():
+            while not stop.is_set():
+                start = time.perf_counter()
+                try:
+                    list(WebhookData.objects.using(alias).order_by('-received_at')[:50])
+                    elapsed = time.perf_counter() - start
+                    with lock:
+                        results['read_latencies'].append(elapsed)
+                except OperationalError:
+                    with lock:
+                        results['read_errors'] += 1
+            connections[alias].close()
+
+        threads = [threading.Thread(target=writer, args=(n,)) for n in range(options['writers'])]
+        threads += [threading.Thread(target=reader) for _ in range(options['readers'])]
+        for thread in threads:
+            thread.start()
+        time.sleep(options['seconds'])
+        stop.set()
+        for thread in threads:
+            thread.join()
+        connections[alias].close()
+
+        latencies = sorted(results['read_latencies']) or [0.0]
+        self.stdout.write(
+            f'{name:>10}: {results["writes"] / options["seconds"]:8.1f} writes/s  '
+            f'{results["write_errors"]:5d} locked writes  '
+            f'reads p50 {statistics.median(latencies) * 1000:7.2f} ms  '
+            f'p95 {latencies[max(int(len(latencies) * 0.95) - 1, 0)] * 1000:7.2f} ms  '
+            f'{results["read_errors"]:5d} failed reads'
+        )
@@ -0,0 +1,139 @@
+import io
+import json
+import resource
+import tempfile
+import threading
+import time
+from contextlib import redirect_stdout
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+from django.test import Client, override_settings
+
+
+def current_rss():
+    """Resident set size of this process in bytes (Linux)"""
+    with open('/proc/self/statm') as statm:
+        pages = int(statm.read().split()[1])
+    return pages * resource.getpagesize()
+
+
+class RSSSampler(threading.Thread):
+    def __init__(self, interval=0.05):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.peak = current_rss()
+        self._done = threading.Event()
+
+    def run(self):
+        while not self._done.is_set():
+            self.peak = max(self.peak, current_rss())
+            time.sleep(self.interval)
+
+    def stop(self):
+        self._done.set()
+        self.join()
+        self.peak = max(self.peak, current_rss())
+
+
+class Command(BaseCommand):
+    help = ('Show that get-hibid-items/?stream=true keeps memory flat: seeds a throwaway SQLite '
+            'database with N HiBid items and reports RSS while consuming the response')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1_000_000)
+        parser.add_argument('--buffered', action='store_true',
+                            help='Also measure the non-streaming response (needs several GB at 1M rows)')
+        parser.add_argument('--host', default='localhost', help='Host header, must be in ALLOWED_HOSTS')
+
+    def handle(self, *args, **options):
+        from api.models import HiBidItem
+
+        connection = connections['default']
+        original = dict(connection.settings_dict)
+        with tempfile.TemporaryDirectory(prefix='stream-bench-') as directory:
+            connection.close()
+            connection.settings_dict.update({
+                'ENGINE': 'django.db.backends.sqlite3',
+                'NAME': str(Path(directory) / 'bench.sqlite3'),
+                'OPTIONS': {},
+            })
+            try:
+                with connection.schema_editor() as editor:
+                    editor.create_model(HiBidItem)
+                self.seed(HiBidItem, options['rows'])
+                # Keep the metrics store and image prefetching out of the measurement
+                with override_settings(METRICS_ENABLED=False, PREFETCH_ENABLED=False):
+                    client = Client(HTTP_HOST=options['host'])
+                    self.measure(client, 'stream', '/api/get-hibid-items/?stream=true', options['rows'])
+                    if options['buffered']:
+                        self.measure(client, 'buffered', '/api/get-hibid-items/', options['rows'])
+            finally:
+                connection.close()
+                connection.settings_dict.clear()
+                connection.settings_dict.update(original)
+
+    def seed(self, model, count, batch=10000):
+        started = time.perf_counter()
+        description = 'Vintage oak dresser with brass pulls, light wear consistent with age. ' * 6
+        for start in range(0, count, batch):
+            with transaction.atomic():
+                model.objects.bulk_create([
+                    model(
+                        url_main=f'https://hibid.com/lot/{i}', item_title=f'Lot {i} oak dresser', lot_number=str(i),
+                        description=description, category='Furniture', estimate='$100-$200',
+                        auction_name='Estate auction', current_bid='$45', bid_count=3,
+                        all_unique_image_urls=[f'https://hibid.com/img/{i}-{j}.jpg' for j in range(4)],
+                        status='processed',
+                    )
+                    for i in range(start, min(start + batch, count))
+                ])
+        self.stdout.write(f'Seeded {count} rows in {time.perf_counter() - started:.1f}s')
+
+    def measure(self, client, label, url, rows):
+        baseline = current_rss()
+        sampler = RSSSampler()
+        sampler.start()
+        started = time.perf_counter()
+        with redirect_stdout(io.StringIO()):
+            response = client.get(url)
+        if response.status_code != 200:
+            sampler.stop()
+            body = b''.join(response.streaming_content) if response.streaming else response.content
+            raise CommandError(f'{label}: {url} returned {response.status_code}, not measuring: {body[:300]!r}')
+        size = 0
+        checkpoints = []
+        if response.streaming:
+            # The first chunk opens the array and the last one closes it and carries
+            # total_count; every chunk in between is a run of comma-separated rows
+            chunks = iter(response.streaming_content)
+            head = next(chunks)
+            size = len(head)
+            streamed = 0
+            previous = None
+            for i, chunk in enumerate(chunks, start=1):
+                size += len(chunk)
+                if previous is not None:
+                    streamed += len(json.loads(b'[' + previous.lstrip(b',') + b']'))
+                previous = chunk
+                if i % 50 == 0:
+                    checkpoints.append(current_rss() - baseline)
+            total = json.loads(b'{' + previous[len(b'],'):])['total_count']
+        else:
+            size = len(response.content)
+            streamed = total = len(response.json()['hibid_items'])
+        elapsed = time.perf_counter() - started
+        sampler.stop()
+        del response
+        if streamed != rows or total != rows:
+            raise CommandError(f'{label}: expected {rows} rows, got {streamed} (total_count {total})')
+
+        mib = 1024 * 1024
+        self.stdout.write(
+            f'{label:>8}: {rows} rows, {size / mib:8.1f} MiB body in {elapsed:6.1f}s, '
+            f'peak RSS +{(sampler.peak - baseline) / mib:7.1f} MiB over {baseline / mib:.0f} MiB'
+        )
+        if checkpoints:
+            self.stdout.write('          RSS growth while streaming (MiB): ' +
+                              ' '.join(f'{c / mib:.0f}' for c in checkpoints[::max(len(checkpoints) // 10, 1)]))
@@ -0,0 +1,26 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api.comparables import ComparablesIndex
+
+
+class Command(BaseCommand):
+    help = ('Build the comparables index from every HiBid and auction item and save it to '
+            'COMPARABLES_INDEX_PATH, where workers load it on first use')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', default=None, help='Write here instead of COMPARABLES_INDEX_PATH')
+
+    def handle(self, *args, **options):
+        path = options['output'] or settings.COMPARABLES_INDEX_PATH
+        started = time.perf_counter()
+        index = ComparablesIndex(settings.COMPARABLES_SIGNATURE_SIZE)
+        count = index.refresh()
+        built = time.perf_counter() - started
+        index.save(path)
+        self.stdout.write(self.style.SUCCESS(
+            f'Indexed {count} items in {built:.1f}s, saved to {path} '
+            f'({index.signatures[:index.count].nbytes / 1024 / 1024:.1f} MiB of signatures)'
+        ))
@@ -0,0 +1,42 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from api import ingest_buffer
+
+
+class Command(BaseCommand):
+    help = 'Apply buffered receive_webhook_data payloads in batched transactions'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Drain the buffer once and exit')
+        parser.add_argument('--batch-size', type=int, default=None)
+        parser.add_argument('--interval', type=float, default=None,
+                            help='Maximum seconds to wait for new payloads (bounds read-after-ack delay)')
+
+    def handle(self, *args, **options):
+        buffer = ingest_buffer.get_buffer()
+        batch_size = options['batch_size'] or settings.WEBHOOK_INGEST_BATCH_SIZE
+        interval = options['interval'] if options['interval'] is not None else settings.WEBHOOK_INGEST_FLUSH_INTERVAL
+        self.stdout.write(f'Flushing {buffer.name} ingest buffer (batch {batch_size}, interval {interval}s)')
+
+        while True:
+            close_old_connections()
+            try:
+                applied, failed = ingest_buffer.flush(
+                    buffer, batch_size, block_ms=0 if options['once'] else int(interval * 1000)
+                )
+            except Exception as e:
+                # Database or Redis unavailable, or a transient database error: the
+                # payloads not yet applied stay buffered, retry after a pause
+                self.stderr.write(f'Flush failed, retrying: {e}')
+                if options['once']:
+                    raise
+                time.sleep(max(interval, 1.0))
+                continue
+            if applied or failed:
+                self.stdout.write(f'Applied {applied}, dead-lettered {failed}')
+            elif options['once']:
+                break
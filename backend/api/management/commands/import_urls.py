@@ -0,0 +1,110 @@
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+
+from api import bulk_import
+from api.models import BulkImport
+
+
+class Command(BaseCommand):
+    help = ('Send a CSV or text list of HiBid URLs to n8n: skips URLs that already have an item, '
+            'dispatches the rest concurrently under the bulk_import_dispatch rate limit and '
+            'checkpoints progress so an interrupted import can be resumed')
+
+    def add_arguments(self, parser):
+        parser.add_argument('files', nargs='*', help="CSV or text files of URLs ('-' for stdin)")
+        parser.add_argument('--resume', type=int, action='append', default=[],
+                            help='Resume the bulk import with this id (repeatable)')
+        parser.add_argument('--resume-all', action='store_true',
+                            help='Resume every pending, failed or abandoned bulk import')
+        parser.add_argument('--interval', type=float, default=None,
+                            help='With --resume-all, keep running and look for imports to resume every N seconds')
+        parser.add_argument('--workers', type=int, default=None,
+                            help='Dispatch threads (default BULK_IMPORT_WORKERS)')
+        parser.add_argument('--stale-after', type=int, default=300,
+                            help='Seconds without a checkpoint after which a running import counts as abandoned')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Only parse the files and count the URLs that already have an item')
+
+    def handle(self, *args, **options):
+        if options['interval'] is not None and not options['resume_all']:
+            raise CommandError('--interval needs --resume-all')
+        ids = list(options['resume'])
+        if options['resume_all']:
+            ids += [i for i in bulk_import.resumable(options['stale_after']) if i not in ids]
+        for path in options['files']:
+            text = self.read(path)
+            if options['dry_run']:
+                urls, invalid = bulk_import.parse_urls(text)
+                existing = sum(len(bulk_import.existing_urls(urls[i:i + bulk_import.EXISTING_CHUNK]))
+                               for i in range(0, len(urls), bulk_import.EXISTING_CHUNK))
+                self.stdout.write(f'{path}: {len(urls)} unique URLs, {existing} already have an item, '
+                                  f'{invalid} rows without a URL')
+                continue
+            try:
+                job = bulk_import.create(text, source=path)
+            except ValueError as e:
+                raise CommandError(f'{path}: {e}')
+            self.stdout.write(f'{path}: created bulk import {job.id} with {job.total} URLs')
+            ids.append(job.id)
+        if not ids and not options['resume_all']:
+            if not options['dry_run']:
+                raise CommandError('Give files to import, --resume <id> or --resume-all')
+            return
+        if options['interval'] is None:
+            self.run_imports(ids, options)
+            return
+
+        while True:
+            try:
+                self.run_imports(ids, options)
+            except Exception as e:
+                # The import is left failed or running and is picked up again next time
+                self.stderr.write(f'Bulk import stopped, retrying later: {e}')
+            time.sleep(options['interval'])
+            close_old_connections()
+            ids = None
+
+    def run_imports(self, ids, options):
+        if ids is None:
+            ids = bulk_import.resumable(options['stale_after'])
+        for import_id in ids:
+            if not bulk_import.claim(import_id, options['stale_after']):
+                self.stdout.write(self.style.WARNING(
+                    f'Bulk import {import_id} is finished, missing or running elsewhere; skipping'))
+                continue
+            job = BulkImport.objects.get(id=import_id)
+            if job.failed_urls:
+                self.stdout.write(f'Sending {len(job.failed_urls)} failed URLs of bulk import {job.id} again')
+            if job.cursor:
+                self.stdout.write(f'Resuming bulk import {job.id} at URL {job.cursor + 1} of {job.total}')
+            job = bulk_import.run(job, workers=options['workers'], timeout=settings.OUTBOUND_TIMEOUT_SECONDS,
+                                  report=self.report)
+            summary = bulk_import.serialize(job)
+            style = self.style.SUCCESS if job.state == 'completed' else self.style.WARNING
+            self.stdout.write(style(
+                f"Bulk import {job.id} {job.state}: {summary['total']} URLs in {summary['elapsed_seconds']}s "
+                f"({summary['urls_per_second']} URLs/s, {summary['n8n_calls_per_second']} n8n calls/s); "
+                f"{summary['dispatched']} dispatched, {summary['queued_for_retry']} queued for retry, "
+                f"{summary['existing']} already imported, {summary['deduplicated']} already in flight, "
+                f"{summary['failed']} failed"
+            ))
+
+    def read(self, path):
+        if path == '-':
+            return sys.stdin.read()
+        try:
+            with open(path, encoding='utf-8-sig', errors='replace') as f:
+                return f.read()
+        except OSError as e:
+            raise CommandError(str(e))
+
+    def report(self, job):
+        summary = bulk_import.serialize(job)
+        self.stdout.write(
+            f"  {summary['handled']}/{summary['total']} handled, {summary['urls_per_second']} URLs/s, "
+            f"{summary['n8n_calls_per_second']} n8n calls/s"
+        )
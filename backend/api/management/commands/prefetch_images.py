@@ -0,0 +1,35 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from api import prefetch
+from api.models import ImagePrefetch
+
+
+class Command(BaseCommand):
+    help = 'Download HiBid item images whose prefetch is still pending (e.g. after a restart)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--retry-errors', action='store_true', help='Also retry failed downloads')
+        parser.add_argument('--reset-stuck', action='store_true',
+                            help='Treat rows left in "downloading" by a crashed worker as pending')
+        parser.add_argument('--workers', type=int, default=8)
+
+    def handle(self, *args, **options):
+        if options['reset_stuck']:
+            reset = ImagePrefetch.objects.filter(status='downloading').update(status='pending')
+            self.stdout.write(f'Reset {reset} stuck downloads')
+
+        statuses = ['pending', 'error'] if options['retry_errors'] else ['pending']
+        ids = list(ImagePrefetch.objects.filter(status__in=statuses).values_list('id', flat=True))
+        self.stdout.write(f'Prefetching {len(ids)} images with {options["workers"]} workers')
+
+        counts = {}
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            for result in pool.map(prefetch._run, ids):
+                key = result.status if result else 'skipped'
+                counts[key] = counts.get(key, 0) + 1
+
+        self.stdout.write(self.style.SUCCESS(
+            ', '.join(f'{key}: {value}' for key, value in sorted(counts.items())) or 'Nothing to do'
+        ))
@@ -0,0 +1,144 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand, CommandError
+
+# Runs in a fresh interpreter: load the WSGI app the way a gunicorn worker
+# does and serve requests straight through it, reporting timestamps as JSON
+PROBE = r'''
+import json, os, sys, time
+from wsgiref.util import setup_testing_defaults
+
+marks = {'start': time.time()}
+from django.core.wsgi import get_wsgi_application
+application = get_wsgi_application()
+marks['app'] = time.time()
+if os.environ.get('PROFILE_STARTUP_FORK'):
+    from api import warmup
+    warmup.warm()
+    warmup.release_connections()
+    marks['warm'] = time.time()
+    read_fd, write_fd = os.pipe()
+    marks['fork'] = time.time()
+    if os.fork():
+        os.close(write_fd)
+        with os.fdopen(read_fd) as reader:
+            marks.update(json.loads(reader.read()))
+        os.wait()
+        print(json.dumps(marks))
+        sys.exit(0)
+    os.close(read_fd)
+    warmup.release_connections()
+
+def serve():
+    path, _, query = os.environ['PROFILE_STARTUP_PATH'].partition('?')
+    environ = {'PATH_INFO': path, 'QUERY_STRING': query, 'HTTP_HOST': os.environ['PROFILE_STARTUP_HOST']}
+    setup_testing_defaults(environ)
+    result = {}
+    body = application(environ, lambda status, headers, exc_info=None: result.setdefault('status', status))
+    b''.join(body)
+    if hasattr(body, 'close'):
+        body.close()
+    return result['status']
+
+child = {}
+child['status'] = serve()
+child['first'] = time.time()
+serve()
+child['second'] = time.time()
+child['modules'] = len(sys.modules)
+if os.environ.get('PROFILE_STARTUP_FORK'):
+    with os.fdopen(write_fd, 'w') as writer:
+        writer.write(json.dumps(child))
+    os._exit(0)
+marks.update(child)
+print(json.dumps(marks))
+'''
+
+
+def parse_importtime(stderr):
+    """{module: (self_us, cumulative_us)} from `python -X importtime` output"""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        modules[name.strip()] = (int(self_us), int(cumulative_us))
+    return modules
+
+
+class Command(BaseCommand):
+    help = ('Profile worker startup in fresh interpreters: import time by package and the time to '
+            'load the WSGI app and serve the first request, cold or forked from a warmed parent '
+            'the way gunicorn preload_app does')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=5, help='Fresh interpreters to start (medians are reported)')
+        parser.add_argument('--path', default='/api/hello/', help='Request to serve first')
+        parser.add_argument('--host', default='localhost', help='Host header, must be in ALLOWED_HOSTS')
+        parser.add_argument('--top', type=int, default=15, help='Packages and modules to list')
+        parser.add_argument('--fork', action='store_true',
+                            help='Load and warm the app, then time the first request in a forked child')
+
+    def handle(self, *args, **options):
+        env = {
+            **os.environ,
+            'PYTHONPATH': os.pathsep.join(filter(None, [os.getcwd(), os.environ.get('PYTHONPATH')])),
+            'PROFILE_STARTUP_PATH': options['path'],
+            'PROFILE_STARTUP_HOST': options['host'],
+        }
+        if options['fork']:
+            env['PROFILE_STARTUP_FORK'] = '1'
+        else:
+            env.pop('PROFILE_STARTUP_FORK', None)
+
+        runs = []
+        imports = defaultdict(list)
+        for _ in range(options['runs']):
+            spawned = time.time()
+            result = subprocess.run([sys.executable, '-X', 'importtime', '-c', PROBE],
+                                    env=env, capture_output=True, text=True)
+            if result.returncode:
+                raise CommandError(f'Startup probe failed:\n{result.stderr[-2000:]}')
+            marks = json.loads(result.stdout.strip().splitlines()[-1])
+            marks['spawned'] = spawned
+            runs.append(marks)
+            for name, timings in parse_importtime(result.stderr).items():
+                imports[name].append(timings)
+
+        self.report(runs, imports, options)
+
+    def report(self, runs, imports, options):
+        def median_ms(start, end):
+            return statistics.median((run[end] - run[start]) * 1000 for run in runs)
+
+        self.stdout.write(f"{len(runs)} runs, first request {options['path']} -> {runs[0]['status']}, "
+                          f"{runs[0]['modules']} modules loaded")
+        self.stdout.write(f"  interpreter start       {median_ms('spawned', 'start'):8.1f} ms")
+        self.stdout.write(f"  load WSGI app           {median_ms('start', 'app'):8.1f} ms")
+        if options['fork']:
+            self.stdout.write(f"  warm (master only)      {median_ms('app', 'warm'):8.1f} ms")
+            self.stdout.write(f"  fork -> first response  {median_ms('fork', 'first'):8.1f} ms")
+        else:
+            self.stdout.write(f"  first request           {median_ms('app', 'first'):8.1f} ms")
+            self.stdout.write(f"  spawn -> first response {median_ms('spawned', 'first'):8.1f} ms")
+        self.stdout.write(f"  second request          {median_ms('first', 'second'):8.1f} ms")
+
+        # Median self time per module; with --fork everything was imported before forking
+        self_ms = {name: statistics.median(t[0] for t in timings) / 1000 for name, timings in imports.items()}
+        by_package = defaultdict(float)
+        for name, ms in self_ms.items():
+            by_package[name.split('.')[0]] += ms
+        self.stdout.write(f'\nImport time by package (self, total {sum(self_ms.values()):.1f} ms):')
+        for package, ms in sorted(by_package.items(), key=lambda item: -item[1])[:options['top']]:
+            self.stdout.write(f'  {ms:8.1f} ms  {package}')
+
+        cumulative_ms = {name: statistics.median(t[1] for t in timings) / 1000 for name, timings in imports.items()}
+        self.stdout.write('\nSlowest imports (cumulative, including what they import):')
+        for name, ms in sorted(cumulative_ms.items(), key=lambda item: -item[1])[:options['top']]:
+            self.stdout.write(f'  {ms:8.1f} ms  {name}')
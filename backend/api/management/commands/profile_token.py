@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+
+from api.profiling import PROFILE_HEADER, make_token
+
+
+class Command(BaseCommand):
+    help = 'Print a signed header value that enables profiling for a request'
+
+    def handle(self, *args, **options):
+        self.stdout.write(f'{PROFILE_HEADER}: {make_token()}')
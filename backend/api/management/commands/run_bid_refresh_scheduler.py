@@ -0,0 +1,37 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from api import bid_refresh
+
+
+class Command(BaseCommand):
+    help = ('Re-dispatch HiBid items to n8n for fresh bids, most often close to the auction end, '
+            'batched per auction and within the bid_refresh n8n budget')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Refresh due items once and exit')
+        parser.add_argument('--interval', type=float, default=15.0, help='Seconds between passes')
+        parser.add_argument('--backfill', action='store_true',
+                            help='First derive auction end times for items stored before the scheduler existed')
+
+    def handle(self, *args, **options):
+        if options['backfill']:
+            self.stdout.write(f'Scheduled {bid_refresh.backfill()} existing items')
+        self.stdout.write('Bid refresh scheduler started')
+        while True:
+            close_old_connections()
+            try:
+                items, auctions = bid_refresh.run_due()
+            except Exception as e:
+                # Database or n8n unavailable: the items stay due, retry next pass
+                self.stderr.write(f'Bid refresh pass failed, retrying: {e}')
+                if options['once']:
+                    raise
+            else:
+                if items:
+                    self.stdout.write(f'Sent {items} items from {auctions} auctions for refresh')
+            if options['once']:
+                break
+            time.sleep(options['interval'])
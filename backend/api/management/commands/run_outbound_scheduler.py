@@ -0,0 +1,37 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from api import outbound
+
+
+class Command(BaseCommand):
+    help = 'Retry failed outbound n8n calls with exponential backoff'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Process due calls once and exit')
+        parser.add_argument('--interval', type=float, default=5.0, help='Seconds between polls')
+        parser.add_argument('--batch-size', type=int, default=50)
+        parser.add_argument('--stuck-after', type=int, default=settings.OUTBOUND_STUCK_AFTER_SECONDS,
+                            help='Seconds after which an in_flight call is considered abandoned '
+                                 '(keep it above every outbound timeout)')
+
+    def handle(self, *args, **options):
+        self.stdout.write('Outbound scheduler started')
+        while True:
+            close_old_connections()
+            released = outbound.release_stuck(options['stuck_after'])
+            if released:
+                self.stdout.write(f'Released {released} abandoned in-flight calls')
+
+            results = outbound.run_due(options['batch_size'])
+            if results:
+                self.stdout.write(', '.join(f'{state}: {count}' for state, count in sorted(results.items())))
+
+            if options['once']:
+                break
+            # A full batch means there is a backlog; keep draining without sleeping
+            if sum(results.values()) < options['batch_size']:
+                time.sleep(options['interval'])
@@ -0,0 +1,197 @@
+"""
+Request metrics shared by the API middleware and the /api/metrics/ endpoint.
+
+Every sample is stored as a monotonically increasing counter keyed by its
+Prometheus series name (``name{label="value"}``), so histograms are just a set
+of ``_bucket``/``_sum``/``_count`` counters. When ``REDIS_URL`` is configured the
+counters live in a Redis hash and are shared by every gunicorn worker;
+otherwise each worker keeps its own copy in memory.
+"""
+
+import threading
+
+from django.conf import settings
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+
+HELP = {
+    'api_requests_total': ('counter', 'API requests by view, method and status code'),
+    'api_request_duration_seconds': ('histogram', 'API request latency by view'),
+    'api_request_db_queries': ('histogram', 'Database queries executed per request by view'),
+    'api_request_db_seconds': ('histogram', 'Time spent in the database per request by view'),
+    'api_request_size_bytes': ('histogram', 'Request body size by view'),
+    'api_response_size_bytes': ('histogram', 'Response body size by view'),
+    'n8n_requests_total': ('counter', 'Outbound n8n webhook calls by webhook and status code'),
+    'n8n_request_duration_seconds': ('histogram', 'Outbound n8n webhook latency by webhook'),
+    'api_admission_rejections_total': ('counter', 'Requests rejected with 429 by admission control, by view and limit'),
+    'db_connections_opened_total': ('counter', 'Database connections opened by Django (pool checkouts when pooled), by alias'),
+    'bid_refresh_requests_total': ('counter', 'HiBid items sent for a live bid refresh, by time-to-close tier'),
+    'hibid_ingest_writes_total': ('counter', 'Stored HiBid payloads by result (created, updated, unchanged)'),
+    'webhook_ingest_dead_letters_total': ('counter', 'Buffered webhook payloads that could not be applied, by backend'),
+}
+
+
+def _series(name, labels):
+    if not labels:
+        return name
+    body = ','.join(f'{key}="{value}"' for key, value in labels.items())
+    return f'{name}{{{body}}}'
+
+
+def _sort_key(item):
+    # Group series by labels and keep histogram buckets in ascending order
+    series = item[0]
+    head, sep, le = series.partition(',le="')
+    if not sep:
+        return (series, 0.0)
+    le = le.split('"', 1)[0]
+    return (head, float('inf') if le == '+Inf' else float(le))
+
+
+def _format_value(value):
+    value = float(value)
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+def _format_le(bound):
+    return '+Inf' if bound == float('inf') else repr(float(bound))
+
+
+class LocalStore:
+    """Per-process counter store"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def add_many(self, increments):
+        with self._lock:
+            for key, value in increments:
+                self._values[key] = self._values.get(key, 0.0) + value
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self._values)
+
+
+class RedisStore:
+    """Counter store shared across workers through a single Redis hash"""
+
+    def __init__(self, url, key='api:metrics'):
+        import redis
+
+        self._client = redis.Redis.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5)
+        self._key = key
+
+    def add_many(self, increments):
+        pipe = self._client.pipeline(transaction=False)
+        for field, value in increments:
+            pipe.hincrbyfloat(self._key, field, value)
+        pipe.execute()
+
+    def snapshot(self):
+        raw = self._client.hgetall(self._key)
+        return {field.decode(): float(value) for field, value in raw.items()}
+
+
+class Registry:
+    def __init__(self):
+        self._store = None
+        self._fallback = LocalStore()
+        self._collectors = []
+
+    @property
+    def store(self):
+        if self._store is None:
+            redis_url = getattr(settings, 'REDIS_URL', '')
+            if redis_url and getattr(settings, 'METRICS_BACKEND', 'redis') == 'redis':
+                try:
+                    self._store = RedisStore(redis_url)
+                except ImportError:
+                    self._store = self._fallback
+            else:
+                self._store = self._fallback
+        return self._store
+
+    def _add_many(self, increments):
+        try:
+            self.store.add_many(increments)
+        except Exception as e:
+            # Never fail a request because the metrics backend is unavailable
+            print("Metrics backend error, using local store:", str(e))
+            self._store = self._fallback
+            self._fallback.add_many(increments)
+
+    def record(self, counters=(), histograms=()):
+        """
+        Record several samples in one round trip.
+
+        counters: iterable of (name, labels, value)
+        histograms: iterable of (name, labels, value, buckets)
+        """
+        increments = []
+        for name, labels, value in counters:
+            increments.append((_series(name, labels), value))
+        for name, labels, value, buckets in histograms:
+            for bound in tuple(buckets) + (float('inf'),):
+                if value <= bound:
+                    increments.append((_series(f'{name}_bucket', {**labels, 'le': _format_le(bound)}), 1))
+            increments.append((_series(f'{name}_sum', labels), value))
+            increments.append((_series(f'{name}_count', labels), 1))
+        if increments:
+            self._add_many(increments)
+
+    def inc(self, name, labels=None, value=1):
+        self.record(counters=[(name, labels or {}, value)])
+
+    def observe(self, name, labels, value, buckets=LATENCY_BUCKETS):
+        self.record(histograms=[(name, labels, value, buckets)])
+
+    def register_collector(self, collector):
+        """
+        Register a callable returning (name, type, help, [(labels, value), ...])
+        tuples that are evaluated at scrape time, e.g. for gauges.
+        """
+        if collector not in self._collectors:
+            self._collectors.append(collector)
+
+    def render(self):
+        """Render all series in the Prometheus text exposition format"""
+        try:
+            values = self.store.snapshot()
+        except Exception as e:
+            print("Metrics backend error, rendering local store:", str(e))
+            values = self._fallback.snapshot()
+
+        families = {}
+        for series, value in values.items():
+            family = series.split('{', 1)[0]
+            for suffix in ('_bucket', '_sum', '_count'):
+                base = family[:-len(suffix)]
+                if family.endswith(suffix) and HELP.get(base, ('',))[0] == 'histogram':
+                    family = base
+                    break
+            families.setdefault(family, []).append((series, value))
+
+        lines = []
+        for family in sorted(families):
+            kind, help_text = HELP.get(family, ('untyped', family))
+            lines.append(f'# HELP {family} {help_text}')
+            lines.append(f'# TYPE {family} {kind}')
+            for series, value in sorted(families[family], key=_sort_key):
+                lines.append(f'{series} {_format_value(value)}')
+
+        for collector in self._collectors:
+            for name, kind, help_text, samples in collector():
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} {kind}')
+                for labels, value in samples:
+                    lines.append(f'{_series(name, labels)} {_format_value(value)}')
+
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
@@ -0,0 +1,76 @@
+"""
+API middleware
+"""
+
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from . import db_pool  # noqa: F401 - registers the connection metrics
+from .metrics import LATENCY_BUCKETS, QUERY_COUNT_BUCKETS, SIZE_BUCKETS, registry
+
+
+class QueryStats:
+    """execute_wrapper that counts queries and time spent in the database"""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.seconds += time.perf_counter() - start
+
+
+class MetricsMiddleware:
+    """
+    Record latency, DB query count/time and payload sizes for every request,
+    labelled by the resolved URL name so the series stay low-cardinality.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = getattr(settings, 'METRICS_ENABLED', True)
+
+    def __call__(self, request):
+        if not self.enabled:
+            return self.get_response(request)
+
+        queries = QueryStats()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(queries))
+            response = self.get_response(request)
+        elapsed = time.perf_counter() - start
+
+        match = getattr(request, 'resolver_match', None)
+        view = match.url_name if match and match.url_name else 'unmatched'
+        if view == 'metrics':
+            return response
+
+        labels = {'view': view}
+        try:
+            request_size = int(request.META.get('CONTENT_LENGTH') or 0)
+        except ValueError:
+            request_size = 0
+        histograms = [
+            ('api_request_duration_seconds', labels, elapsed, LATENCY_BUCKETS),
+            ('api_request_db_queries', labels, queries.count, QUERY_COUNT_BUCKETS),
+            ('api_request_db_seconds', labels, queries.seconds, LATENCY_BUCKETS),
+            ('api_request_size_bytes', labels, request_size, SIZE_BUCKETS),
+        ]
+        if not response.streaming:
+            histograms.append(('api_response_size_bytes', labels, len(response.content), SIZE_BUCKETS))
+
+        registry.record(
+            counters=[('api_requests_total', {**labels, 'method': request.method, 'status': response.status_code}, 1)],
+            histograms=histograms,
+        )
+        return response
@@ -0,0 +1,56 @@
+# Generated by Django 5.2.4 on 2026-10-19 14:37
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HiBidItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('url_main', models.URLField(db_index=True, max_length=500, unique=True)),
+                ('item_title', models.CharField(blank=True, max_length=200)),
+                ('source', models.CharField(default='HiBid', max_length=100)),
+                ('lot_number', models.CharField(blank=True, max_length=50)),
+                ('description', models.TextField(blank=True)),
+                ('lead', models.CharField(blank=True, max_length=200)),
+                ('item_name', models.CharField(blank=True, max_length=200)),
+                ('category', models.CharField(blank=True, max_length=100)),
+                ('estimate', models.CharField(blank=True, max_length=100)),
+                ('auction_name', models.CharField(blank=True, max_length=200)),
+                ('auctioneer', models.CharField(blank=True, max_length=200)),
+                ('auction_type', models.CharField(blank=True, max_length=100)),
+                ('auction_dates', models.CharField(blank=True, max_length=200)),
+                ('location', models.CharField(blank=True, max_length=200)),
+                ('current_bid', models.CharField(blank=True, max_length=100)),
+                ('bid_count', models.IntegerField(default=0)),
+                ('time_remaining', models.CharField(blank=True, max_length=100)),
+                ('shipping_available', models.BooleanField(default=False)),
+                ('all_unique_image_urls', models.JSONField(blank=True, default=list)),
+                ('main_image_url', models.URLField(blank=True, max_length=500)),
+                ('gallery_image_urls', models.JSONField(blank=True, default=list)),
+                ('broad_search_images', models.JSONField(blank=True, default=list)),
+                ('tumbnail_images', models.JSONField(blank=True, default=list)),
+                ('ai_response', models.TextField(blank=True)),
+                ('raw_data', models.JSONField(default=dict)),
+                ('processed_at', models.DateTimeField(auto_now_add=True)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('processed', 'Processed'), ('error', 'Error')], default='pending', max_length=20)),
+            ],
+            options={
+                'db_table': 'hibid_items',
+                'ordering': ['-processed_at'],
+            },
+        ),
+        migrations.AddField(
+            model_name='auctionitem',
+            name='hibid_item',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='auction_items', to='api.hibiditem'),
+        ),
+    ]
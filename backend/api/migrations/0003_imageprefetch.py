@@ -0,0 +1,33 @@
+# Generated by Django 5.2.4 on 2026-10-19 14:37
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_hibiditem'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImagePrefetch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('url', models.URLField(max_length=1000)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('downloading', 'Downloading'), ('done', 'Done'), ('skipped', 'Skipped'), ('error', 'Error')], db_index=True, default='pending', max_length=20)),
+                ('size', models.BigIntegerField(blank=True, null=True)),
+                ('sha256', models.CharField(blank=True, max_length=64)),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('fetched_at', models.DateTimeField(blank=True, null=True)),
+                ('hibid_item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='image_prefetches', to='api.hibiditem')),
+            ],
+            options={
+                'db_table': 'image_prefetches',
+                'ordering': ['id'],
+                'constraints': [models.UniqueConstraint(fields=('hibid_item', 'url'), name='unique_image_prefetch_per_item')],
+            },
+        ),
+    ]
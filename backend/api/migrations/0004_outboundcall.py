@@ -0,0 +1,36 @@
+# Generated by Django 5.2.4 on 2026-10-19 14:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_imageprefetch'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutboundCall',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('webhook', models.CharField(max_length=50)),
+                ('webhook_url', models.URLField(max_length=500)),
+                ('payload', models.JSONField(default=dict)),
+                ('state', models.CharField(choices=[('pending', 'Pending'), ('in_flight', 'In Flight'), ('succeeded', 'Succeeded'), ('dead', 'Dead')], default='pending', max_length=20)),
+                ('attempts', models.IntegerField(default=0)),
+                ('max_attempts', models.IntegerField(default=8)),
+                ('next_run_at', models.DateTimeField(blank=True, null=True)),
+                ('last_status_code', models.IntegerField(blank=True, null=True)),
+                ('last_error', models.TextField(blank=True)),
+                ('response_body', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'outbound_calls',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['state', 'next_run_at'], name='outbound_state_next_run_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.4 on 2026-10-19 14:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_outboundcall'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='outboundcall',
+            name='dedupe_key',
+            field=models.CharField(blank=True, db_index=True, max_length=64),
+        ),
+        migrations.AddConstraint(
+            model_name='outboundcall',
+            constraint=models.UniqueConstraint(condition=models.Q(('state__in', ['pending', 'in_flight']), models.Q(('dedupe_key', ''), _negated=True)), fields=('dedupe_key',), name='unique_active_outbound_dedupe_key'),
+        ),
+    ]
@@ -0,0 +1,117 @@
+# Generated by Django 5.2.4 on 2026-10-19 14:47
+
+from django.db import migrations, models
+
+# Archive table -> column it is range-partitioned on (PostgreSQL only)
+PARTITION_KEYS = {
+    'HiBidItemArchive': 'processed_at',
+    'WebhookDataArchive': 'received_at',
+}
+
+
+def create_archive_tables(apps, schema_editor):
+    """
+    Plain tables on SQLite; on PostgreSQL, tables partitioned by month of the
+    original timestamp (partitions are created by archive_old_rows as needed).
+    The partition key has to be part of the primary key there.
+    """
+    for model_name, partition_key in PARTITION_KEYS.items():
+        model = apps.get_model('api', model_name)
+        if schema_editor.connection.vendor != 'postgresql':
+            schema_editor.create_model(model)
+            continue
+        quote = schema_editor.quote_name
+        sql, params = schema_editor.table_sql(model)
+        sql = sql.replace(' PRIMARY KEY', '', 1)
+        sql = (sql[:-1] + f', PRIMARY KEY ({quote("id")}, {quote(partition_key)}))'
+               f' PARTITION BY RANGE ({quote(partition_key)})')
+        schema_editor.execute(sql, params or None)
+        for index in model._meta.indexes:
+            schema_editor.add_index(model, index)
+
+
+def drop_archive_tables(apps, schema_editor):
+    for model_name in PARTITION_KEYS:
+        schema_editor.execute(
+            f'DROP TABLE IF EXISTS {schema_editor.quote_name(apps.get_model("api", model_name)._meta.db_table)}'
+            + (' CASCADE' if schema_editor.connection.vendor == 'postgresql' else '')
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_outboundcall_dedupe_key'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.CreateModel(
+                    name='HiBidItemArchive',
+                    fields=[
+                        ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                        ('original_id', models.BigIntegerField()),
+                        ('url_main', models.URLField(max_length=500)),
+                        ('item_title', models.CharField(blank=True, max_length=200)),
+                        ('source', models.CharField(default='HiBid', max_length=100)),
+                        ('lot_number', models.CharField(blank=True, max_length=50)),
+                        ('description', models.TextField(blank=True)),
+                        ('lead', models.CharField(blank=True, max_length=200)),
+                        ('item_name', models.CharField(blank=True, max_length=200)),
+                        ('category', models.CharField(blank=True, max_length=100)),
+                        ('estimate', models.CharField(blank=True, max_length=100)),
+                        ('auction_name', models.CharField(blank=True, max_length=200)),
+                        ('auctioneer', models.CharField(blank=True, max_length=200)),
+                        ('auction_type', models.CharField(blank=True, max_length=100)),
+                        ('auction_dates', models.CharField(blank=True, max_length=200)),
+                        ('location', models.CharField(blank=True, max_length=200)),
+                        ('current_bid', models.CharField(blank=True, max_length=100)),
+                        ('bid_count', models.IntegerField(default=0)),
+                        ('time_remaining', models.CharField(blank=True, max_length=100)),
+                        ('shipping_available', models.BooleanField(default=False)),
+                        ('all_unique_image_urls', models.JSONField(blank=True, default=list)),
+                        ('main_image_url', models.URLField(blank=True, max_length=500)),
+                        ('gallery_image_urls', models.JSONField(blank=True, default=list)),
+                        ('broad_search_images', models.JSONField(blank=True, default=list)),
+                        ('tumbnail_images', models.JSONField(blank=True, default=list)),
+                        ('ai_response', models.TextField(blank=True)),
+                        ('raw_data', models.JSONField(default=dict)),
+                        ('processed_at', models.DateTimeField()),
+                        ('status', models.CharField(default='processed', max_length=20)),
+                        ('archived_at', models.DateTimeField(auto_now_add=True)),
+                    ],
+                    options={
+                        'db_table': 'hibid_items_archive',
+                        'ordering': ['-processed_at'],
+                        'indexes': [models.Index(fields=['url_main'], name='hibid_archive_url_main_idx'), models.Index(fields=['processed_at'], name='hibid_archive_processed_idx')],
+                    },
+                ),
+                migrations.CreateModel(
+                    name='WebhookDataArchive',
+                    fields=[
+                        ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                        ('original_id', models.BigIntegerField()),
+                        ('sku', models.CharField(max_length=100)),
+                        ('ebay_title', models.TextField(blank=True)),
+                        ('ebay_description', models.TextField(blank=True)),
+                        ('condition', models.CharField(blank=True, max_length=100)),
+                        ('ai_improved_estimate', models.TextField(blank=True)),
+                        ('ai_improved_description', models.TextField(blank=True)),
+                        ('quantity', models.IntegerField(default=1)),
+                        ('raw_data', models.JSONField(default=dict)),
+                        ('received_at', models.DateTimeField()),
+                        ('processed', models.BooleanField(default=False)),
+                        ('archived_at', models.DateTimeField(auto_now_add=True)),
+                    ],
+                    options={
+                        'db_table': 'webhook_data_archive',
+                        'ordering': ['-received_at'],
+                        'indexes': [models.Index(fields=['sku'], name='webhook_archive_sku_idx'), models.Index(fields=['received_at'], name='webhook_archive_received_idx')],
+                    },
+                ),
+            ],
+        ),
+        # Runs against the state above, so the archive models are available
+        migrations.RunPython(create_archive_tables, drop_archive_tables),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.4 on 2026-10-19 15:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_archive_tables'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BulkImport',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(blank=True, max_length=255)),
+                ('urls', models.JSONField(default=list)),
+                ('total', models.IntegerField(default=0)),
+                ('state', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('completed', 'Completed'), ('failed', 'Failed')], db_index=True, default='pending', max_length=20)),
+                ('cursor', models.IntegerField(default=0)),
+                ('invalid_count', models.IntegerField(default=0)),
+                ('existing_count', models.IntegerField(default=0)),
+                ('deduplicated_count', models.IntegerField(default=0)),
+                ('dispatched_count', models.IntegerField(default=0)),
+                ('queued_count', models.IntegerField(default=0)),
+                ('failed_count', models.IntegerField(default=0)),
+                ('failed_urls', models.JSONField(default=list)),
+                ('elapsed_seconds', models.FloatField(default=0)),
+                ('last_error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'db_table': 'bulk_imports',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
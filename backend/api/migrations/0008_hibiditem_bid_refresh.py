@@ -0,0 +1,28 @@
+# Generated by Django 5.2.4 on 2026-10-19 15:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_bulkimport'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='hibiditem',
+            name='auction_ends_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='hibiditem',
+            name='next_refresh_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='hibiditem',
+            name='refresh_requested_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
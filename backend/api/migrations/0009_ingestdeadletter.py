@@ -0,0 +1,29 @@
+# Generated by Django 5.2.4 on 2026-10-19 15:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_hibiditem_bid_refresh'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IngestDeadLetter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('record_id', models.CharField(max_length=64)),
+                ('backend', models.CharField(max_length=20)),
+                ('data', models.JSONField(blank=True, null=True)),
+                ('raw', models.TextField(blank=True)),
+                ('error', models.TextField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'db_table': 'ingest_dead_letters',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
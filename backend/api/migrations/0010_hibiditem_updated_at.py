@@ -0,0 +1,26 @@
+# Generated by Django 5.2.4 on 2026-10-19 16:20
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def backfill_updated_at(apps, schema_editor):
+    HiBidItem = apps.get_model('api', 'HiBidItem')
+    HiBidItem.objects.update(updated_at=models.F('processed_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_ingestdeadletter'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='hibiditem',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.RunPython(backfill_updated_at, migrations.RunPython.noop),
+    ]
@@ -72,12 +72,19 @@ class HiBidItem(models.Model):
     
     raw_data = models.JSONField(default=dict)  # Store complete processed data
     processed_at = models.DateTimeField(auto_now_add=True)
+    # Last time ingest stored a change; unchanged re-scrapes don't touch it
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
     status = models.CharField(max_length=20, choices=[
         ('pending', 'Pending'),
         ('processed', 'Processed'),
         ('error', 'Error')
     ], default='pending')
     
+    # Live bid refresh (see api/bid_refresh.py)
+    auction_ends_at = models.DateTimeField(null=True, blank=True)
+    next_refresh_at = models.DateTimeField(null=True, blank=True, db_index=True)
+    refresh_requested_at = models.DateTimeField(null=True, blank=True)
+    
     class Meta:
         db_table = 'hibid_items'
         ordering = ['-processed_at']
@@ -122,3 +129,211 @@ class AuctionItem(models.Model):
     
     def __str__(self):
         return f"{self.item_name} - {self.sku}"
+
+class ImagePrefetch(models.Model):
+    """
+    Background download of a HiBid item image into the local image cache
+    """
+    hibid_item = models.ForeignKey(HiBidItem, on_delete=models.CASCADE, related_name='image_prefetches')
+    url = models.URLField(max_length=1000)
+    status = models.CharField(max_length=20, choices=[
+        ('pending', 'Pending'),
+        ('downloading', 'Downloading'),
+        ('done', 'Done'),
+        ('skipped', 'Skipped'),
+        ('error', 'Error')
+    ], default='pending', db_index=True)
+    size = models.BigIntegerField(null=True, blank=True)
+    sha256 = models.CharField(max_length=64, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    fetched_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'image_prefetches'
+        ordering = ['id']
+        constraints = [
+            models.UniqueConstraint(fields=['hibid_item', 'url'], name='unique_image_prefetch_per_item'),
+        ]
+
+    def __str__(self):
+        return f"{self.url} ({self.status})"
+
+class OutboundCall(models.Model):
+    """
+    Outbound n8n webhook call, persisted so failed calls are retried
+    with backoff instead of being lost
+    """
+    webhook = models.CharField(max_length=50)
+    webhook_url = models.URLField(max_length=500)
+    payload = models.JSONField(default=dict)
+    # Identifies calls for the same work (e.g. one HiBid URL) so that
+    # concurrent submissions attach to the running call instead of re-sending
+    dedupe_key = models.CharField(max_length=64, blank=True, db_index=True)
+    state = models.CharField(max_length=20, choices=[
+        ('pending', 'Pending'),
+        ('in_flight', 'In Flight'),
+        ('succeeded', 'Succeeded'),
+        ('dead', 'Dead')
+    ], default='pending')
+    attempts = models.IntegerField(default=0)
+    max_attempts = models.IntegerField(default=8)
+    next_run_at = models.DateTimeField(null=True, blank=True)
+    last_status_code = models.IntegerField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    response_body = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'outbound_calls'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['state', 'next_run_at'], name='outbound_state_next_run_idx'),
+        ]
+        constraints = [
+            # At most one active call per dedupe key
+            models.UniqueConstraint(
+                fields=['dedupe_key'],
+                condition=models.Q(state__in=['pending', 'in_flight']) & ~models.Q(dedupe_key=''),
+                name='unique_active_outbound_dedupe_key',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.webhook} call {self.id} ({self.state}, {self.attempts} attempts)"
+
+class BulkImport(models.Model):
+    """
+    Bulk submission of HiBid URLs to n8n. Progress is checkpointed in
+    `cursor` (every URL before it has been handled) so an interrupted
+    import resumes where it stopped
+    """
+    source = models.CharField(max_length=255, blank=True)
+    # Submitted URLs, trimmed and unique after normalization, in upload order
+    urls = models.JSONField(default=list)
+    # len(urls), so listing imports doesn't have to load the URLs
+    total = models.IntegerField(default=0)
+    state = models.CharField(max_length=20, choices=[
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed')
+    ], default='pending', db_index=True)
+    cursor = models.IntegerField(default=0)
+    invalid_count = models.IntegerField(default=0)
+    existing_count = models.IntegerField(default=0)
+    deduplicated_count = models.IntegerField(default=0)
+    dispatched_count = models.IntegerField(default=0)
+    queued_count = models.IntegerField(default=0)
+    failed_count = models.IntegerField(default=0)
+    # URLs whose send raised; resuming the import sends them again
+    failed_urls = models.JSONField(default=list)
+    elapsed_seconds = models.FloatField(default=0)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'bulk_imports'
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"Bulk import {self.id} ({self.state}, {self.cursor}/{self.total})"
+
+class IngestDeadLetter(models.Model):
+    """
+    Buffered webhook payload that can never be applied (invalid, undecodable
+    or rejected by the database as bad data). `manage.py flush_ingest_buffer`
+    moves it here instead of dropping a payload that was already acked with 202
+    """
+    record_id = models.CharField(max_length=64)
+    backend = models.CharField(max_length=20)
+    data = models.JSONField(null=True, blank=True)
+    # The buffered line itself when it could not be decoded
+    raw = models.TextField(blank=True)
+    error = models.TextField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'ingest_dead_letters'
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"Dead-lettered {self.backend} ingest record {self.record_id}"
+
+class WebhookDataArchive(models.Model):
+    """
+    WebhookData rows moved out of the live table by `manage.py archive_old_rows`.
+    On PostgreSQL the table is range-partitioned by month of received_at.
+    """
+    original_id = models.BigIntegerField()
+    sku = models.CharField(max_length=100)
+    ebay_title = models.TextField(blank=True)
+    ebay_description = models.TextField(blank=True)
+    condition = models.CharField(max_length=100, blank=True)
+    ai_improved_estimate = models.TextField(blank=True)
+    ai_improved_description = models.TextField(blank=True)
+    quantity = models.IntegerField(default=1)
+    raw_data = models.JSONField(default=dict)
+    received_at = models.DateTimeField()
+    processed = models.BooleanField(default=False)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'webhook_data_archive'
+        ordering = ['-received_at']
+        indexes = [
+            models.Index(fields=['sku'], name='webhook_archive_sku_idx'),
+            models.Index(fields=['received_at'], name='webhook_archive_received_idx'),
+        ]
+
+    def __str__(self):
+        return f"Archived Webhook Data for {self.sku}"
+
+class HiBidItemArchive(models.Model):
+    """
+    HiBidItem rows moved out of the live table by `manage.py archive_old_rows`.
+    On PostgreSQL the table is range-partitioned by month of processed_at.
+    """
+    original_id = models.BigIntegerField()
+    url_main = models.URLField(max_length=500)
+    item_title = models.CharField(max_length=200, blank=True)
+    source = models.CharField(max_length=100, default='HiBid')
+    lot_number = models.CharField(max_length=50, blank=True)
+    description = models.TextField(blank=True)
+    lead = models.CharField(max_length=200, blank=True)
+    item_name = models.CharField(max_length=200, blank=True)
+    category = models.CharField(max_length=100, blank=True)
+    estimate = models.CharField(max_length=100, blank=True)
+    auction_name = models.CharField(max_length=200, blank=True)
+    auctioneer = models.CharField(max_length=200, blank=True)
+    auction_type = models.CharField(max_length=100, blank=True)
+    auction_dates = models.CharField(max_length=200, blank=True)
+    location = models.CharField(max_length=200, blank=True)
+    current_bid = models.CharField(max_length=100, blank=True)
+    bid_count = models.IntegerField(default=0)
+    time_remaining = models.CharField(max_length=100, blank=True)
+    shipping_available = models.BooleanField(default=False)
+    all_unique_image_urls = models.JSONField(default=list, blank=True)
+    main_image_url = models.URLField(max_length=500, blank=True)
+    gallery_image_urls = models.JSONField(default=list, blank=True)
+    broad_search_images = models.JSONField(default=list, blank=True)
+    tumbnail_images = models.JSONField(default=list, blank=True)
+    ai_response = models.TextField(blank=True)
+    raw_data = models.JSONField(default=dict)
+    processed_at = models.DateTimeField()
+    status = models.CharField(max_length=20, default='processed')
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'hibid_items_archive'
+        ordering = ['-processed_at']
+        indexes = [
+            models.Index(fields=['url_main'], name='hibid_archive_url_main_idx'),
+            models.Index(fields=['processed_at'], name='hibid_archive_processed_idx'),
+        ]
+
+    def __str__(self):
+        return f"Archived {self.item_title or self.item_name} - {self.lot_number} ({self.source})"
@@ -0,0 +1,32 @@
+"""
+Outbound calls to the n8n workflows
+"""
+
+import time
+
+from .metrics import LATENCY_BUCKETS, registry
+
+# Hardcoded n8n Webhook URLs - Direct and simple!
+URL_PROCESSING_WEBHOOK = "https://sorcer.app.n8n.cloud/webhook/789023dc-a9bf-459c-8789-d9d0c993d1cb"
+PHOTOGRAPHY_WEBHOOK = "https://sorcer.app.n8n.cloud/webhook/0be48928-c40c-4e16-a9f1-1e2fdf9ed9d2"
+
+
+def post_webhook(name, webhook_url, payload, timeout=30):
+    """
+    POST a JSON payload to an n8n webhook, recording latency and status code
+    under the given webhook name. Exceptions from requests propagate.
+    """
+    import requests
+
+    code = 'error'
+    start = time.perf_counter()
+    try:
+        response = requests.post(webhook_url, json=payload, timeout=timeout)
+        code = response.status_code
+        return response
+    finally:
+        registry.record(
+            counters=[('n8n_requests_total', {'webhook': name, 'status': code}, 1)],
+            histograms=[('n8n_request_duration_seconds', {'webhook': name},
+                         time.perf_counter() - start, LATENCY_BUCKETS)],
+        )
@@ -0,0 +1,225 @@
+"""
+Durable outbound n8n calls.
+
+Every call is recorded as an OutboundCall row before it is sent. A failed
+call (non-2xx status, timeout, connection error) goes back to ``pending``
+with an exponentially growing, jittered ``next_run_at``. Once it has used
+up ``max_attempts`` it moves to ``dead``, the dead-letter list. The
+scheduler (``manage.py run_outbound_scheduler``) retries due calls. Dead
+calls can be re-dispatched in bulk with ``replay``.
+"""
+
+import hashlib
+import random
+from datetime import timedelta
+from urllib.parse import urlsplit, urlunsplit
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from . import n8n
+from .models import OutboundCall
+
+SUCCESS_CODES = (200, 201, 202)
+MAX_STORED_BODY = 10000
+
+
+def backoff_seconds(attempts):
+    """Full-jitter exponential backoff for the retry after `attempts` failures"""
+    ceiling = min(settings.OUTBOUND_RETRY_MAX_SECONDS,
+                  settings.OUTBOUND_RETRY_BASE_SECONDS * (2 ** max(attempts - 1, 0)))
+    return random.uniform(ceiling / 2, ceiling)
+
+
+def dispatch(webhook, webhook_url, payload, timeout=30, dedupe_key=''):
+    """
+    Persist and send a call right away. Returns (call, response); response is
+    None when the request itself failed. Failed calls are left for the scheduler.
+    Raises IntegrityError if another active call already holds `dedupe_key`.
+    """
+    with transaction.atomic():
+        call = OutboundCall.objects.create(
+            webhook=webhook,
+            webhook_url=webhook_url,
+            payload=payload,
+            dedupe_key=dedupe_key,
+            state='in_flight',
+            max_attempts=settings.OUTBOUND_MAX_ATTEMPTS,
+        )
+    response = attempt(call, timeout=timeout)
+    return call, response
+
+
+def normalize_url(url):
+    """Canonical form of a submitted URL: trimmed, lower-case scheme/host, no fragment or trailing slash"""
+    parts = urlsplit(url.strip())
+    path = parts.path.rstrip('/') or '/'
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), path, parts.query, ''))
+
+
+def dedupe_key_for(webhook, value):
+    return hashlib.sha256(f'{webhook}:{value}'.encode('utf-8')).hexdigest()
+
+
+def succeeded_since(stored_at=None):
+    """
+    Cut-off for counting a succeeded url_processing call as still in progress:
+    it succeeded within OUTBOUND_SINGLE_FLIGHT_WINDOW_SECONDS and after the
+    HiBidItem was last stored (`stored_at`, None if there is no item yet).
+    None when the window is disabled.
+    """
+    window = settings.OUTBOUND_SINGLE_FLIGHT_WINDOW_SECONDS
+    if not window:
+        return None
+    cutoff = timezone.now() - timedelta(seconds=window)
+    return max(cutoff, stored_at) if stored_at else cutoff
+
+
+def find_existing(dedupe_key, succeeded_since=None):
+    """
+    The queued or in-flight call for `dedupe_key`. A succeeded call only counts
+    if it succeeded after `succeeded_since`: n8n accepting a call doesn't mean
+    it produced anything, so whether the work is done is for the caller to
+    check (e.g. for a stored HiBidItem, see ``succeeded_since()``).
+    """
+    active = Q(state__in=['pending', 'in_flight'])
+    if succeeded_since is not None:
+        active |= Q(state='succeeded', updated_at__gt=succeeded_since)
+    return (OutboundCall.objects.filter(active, dedupe_key=dedupe_key)
+            .order_by('-updated_at').first())
+
+
+def dispatch_once(webhook, webhook_url, payload, dedupe_key, timeout=30, succeeded_since=None):
+    """
+    Single-flight dispatch: if a call with the same key is queued or in
+    flight (or succeeded after `succeeded_since`), attach to it instead of
+    sending again.
+    Returns (call, response, attached); response is None when attached.
+    """
+    existing = find_existing(dedupe_key, succeeded_since)
+    if existing:
+        return existing, None, True
+    try:
+        call, response = dispatch(webhook, webhook_url, payload, timeout=timeout, dedupe_key=dedupe_key)
+    except IntegrityError:
+        # Lost the race to a concurrent submission of the same work
+        existing = find_existing(dedupe_key)
+        if existing is None:
+            raise
+        return existing, None, True
+    return call, response, False
+
+
+def attempt(call, timeout=30):
+    """Send a claimed (in_flight) call once and record the outcome"""
+    import requests
+
+    response = None
+    call.attempts += 1
+    try:
+        response = n8n.post_webhook(call.webhook, call.webhook_url, call.payload, timeout=timeout)
+        call.last_status_code = response.status_code
+        call.response_body = response.text[:MAX_STORED_BODY]
+        succeeded = response.status_code in SUCCESS_CODES
+        call.last_error = '' if succeeded else f'n8n webhook returned status {response.status_code}'
+    except requests.RequestException as e:
+        succeeded = False
+        call.last_status_code = None
+        call.last_error = str(e)
+
+    if succeeded:
+        call.state = 'succeeded'
+        call.next_run_at = None
+    elif call.attempts >= call.max_attempts:
+        call.state = 'dead'
+        call.next_run_at = None
+        print(f"Outbound call {call.id} ({call.webhook}) moved to dead-letter after {call.attempts} attempts")
+    else:
+        call.state = 'pending'
+        call.next_run_at = timezone.now() + timedelta(seconds=backoff_seconds(call.attempts))
+    call.save(update_fields=['attempts', 'state', 'next_run_at', 'last_status_code',
+                             'last_error', 'response_body', 'updated_at'])
+    return response
+
+
+def claim(call_id):
+    """Atomically move a pending call to in_flight; False if another scheduler got it first"""
+    return OutboundCall.objects.filter(id=call_id, state='pending').update(
+        state='in_flight', updated_at=timezone.now()
+    ) == 1
+
+
+def release_stuck(older_than_seconds=600):
+    """Return calls left in_flight by a crashed worker to the pending queue"""
+    cutoff = timezone.now() - timedelta(seconds=older_than_seconds)
+    return OutboundCall.objects.filter(state='in_flight', updated_at__lt=cutoff).update(
+        state='pending', next_run_at=timezone.now()
+    )
+
+
+def timeout_for(webhook):
+    """Request timeout for a webhook; the photography workflow answers slowly"""
+    if webhook == 'photography':
+        return settings.OUTBOUND_PHOTOGRAPHY_TIMEOUT_SECONDS
+    return settings.OUTBOUND_TIMEOUT_SECONDS
+
+
+def run_due(batch_size=50, timeout=None):
+    """
+    Retry up to `batch_size` due calls, each with `timeout` or else its
+    webhook's ``timeout_for()``. Returns {state: count} for the calls processed.
+    """
+    due_ids = list(
+        OutboundCall.objects.filter(state='pending', next_run_at__lte=timezone.now())
+        .order_by('next_run_at')
+        .values_list('id', flat=True)[:batch_size]
+    )
+    results = {}
+    for call_id in due_ids:
+        if not claim(call_id):
+            continue
+        call = OutboundCall.objects.get(id=call_id)
+        attempt(call, timeout=timeout or timeout_for(call.webhook))
+        results[call.state] = results.get(call.state, 0) + 1
+    return results
+
+
+def replay(ids=None, webhook=None):
+    """Re-dispatch dead-letter calls (all of them, or the given ids / webhook)"""
+    calls = OutboundCall.objects.filter(state='dead')
+    if ids:
+        calls = calls.filter(id__in=ids)
+    if webhook:
+        calls = calls.filter(webhook=webhook)
+
+    now = timezone.now()
+    unkeyed = calls.filter(dedupe_key='').update(state='pending', attempts=0, next_run_at=now, updated_at=now)
+    replayed = 0
+    # Keyed calls one at a time: a key that already has an active call is skipped
+    for call_id in calls.exclude(dedupe_key='').order_by('-updated_at').values_list('id', flat=True):
+        try:
+            with transaction.atomic():
+                replayed += OutboundCall.objects.filter(id=call_id, state='dead').update(
+                    state='pending', attempts=0, next_run_at=now, updated_at=now
+                )
+        except IntegrityError:
+            continue
+    return unkeyed + replayed
+
+
+def serialize(call):
+    return {
+        'id': call.id,
+        'webhook': call.webhook,
+        'state': call.state,
+        'attempts': call.attempts,
+        'max_attempts': call.max_attempts,
+        'next_run_at': call.next_run_at.isoformat() if call.next_run_at else None,
+        'last_status_code': call.last_status_code,
+        'last_error': call.last_error,
+        'payload': call.payload,
+        'created_at': call.created_at.isoformat(),
+        'updated_at': call.updated_at.isoformat(),
+    }
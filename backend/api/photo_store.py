@@ -0,0 +1,223 @@
+"""
+Content-addressed photo store under MEDIA_ROOT/photos.
+
+Photos are streamed to disk, hashed with SHA-256 and stored once per digest at
+``photos/<aa>/<bb>/<digest>``, so the same image uploaded twice (or sent to n8n
+for every unit of a lot) only exists once. Callers pass around the short
+reference ``sha256:<digest>`` instead of the image bytes.
+"""
+
+import base64
+import binascii
+import hashlib
+import os
+import re
+import time
+import uuid
+from pathlib import Path
+
+from django.conf import settings
+
+REF_PREFIX = 'sha256:'
+DIGEST_RE = re.compile(r'^[0-9a-f]{64}$')
+UPLOAD_ID_RE = re.compile(r'^[0-9a-f]{32}$')
+BASE64_RE = re.compile(r'^[A-Za-z0-9+/\s]+={0,2}$')
+CHUNK_SIZE = 64 * 1024
+SWEEP_INTERVAL = 3600
+
+_last_sweep = 0.0
+
+SIGNATURES = (
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'GIF87a', 'image/gif'),
+    (b'GIF89a', 'image/gif'),
+)
+
+
+class PhotoStoreError(Exception):
+    pass
+
+
+def photo_root():
+    return Path(settings.MEDIA_ROOT) / 'photos'
+
+
+def make_ref(digest):
+    return f'{REF_PREFIX}{digest}'
+
+
+def parse_ref(value):
+    """Return the digest of a `sha256:<digest>` reference, or None"""
+    if isinstance(value, str) and value.startswith(REF_PREFIX):
+        digest = value[len(REF_PREFIX):]
+        if DIGEST_RE.match(digest):
+            return digest
+    return None
+
+
+def path_for(digest):
+    if not DIGEST_RE.match(digest):
+        raise PhotoStoreError('Invalid photo digest')
+    return photo_root() / digest[:2] / digest[2:4] / digest
+
+
+def exists(digest):
+    return path_for(digest).is_file()
+
+
+def sniff_content_type(path):
+    with open(path, 'rb') as f:
+        head = f.read(16)
+    for signature, content_type in SIGNATURES:
+        if head.startswith(signature):
+            return content_type
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'image/webp'
+    if head[4:12] in (b'ftypheic', b'ftypheix', b'ftypmif1'):
+        return 'image/heic'
+    return 'application/octet-stream'
+
+
+def _commit(tmp_path, digest, size):
+    """Move a fully written temp file into place, dropping it if the digest is already stored"""
+    final = path_for(digest)
+    if final.exists():
+        tmp_path.unlink()
+    else:
+        final.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(tmp_path, final)
+    return {'ref': make_ref(digest), 'sha256': digest, 'size': size}
+
+
+def store_chunks(chunks):
+    """
+    Stream an iterable of byte chunks into the store.
+    Returns {'ref', 'sha256', 'size'}.
+    """
+    tmp_dir = photo_root() / 'tmp'
+    tmp_dir.mkdir(parents=True, exist_ok=True)
+    tmp_path = tmp_dir / uuid.uuid4().hex
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with open(tmp_path, 'wb') as f:
+            for chunk in chunks:
+                size += len(chunk)
+                if size > settings.PHOTO_UPLOAD_MAX_BYTES:
+                    raise PhotoStoreError(f'Photo exceeds {settings.PHOTO_UPLOAD_MAX_BYTES} bytes')
+                digest.update(chunk)
+                f.write(chunk)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+    return _commit(tmp_path, digest.hexdigest(), size)
+
+
+def store_uploaded_file(uploaded_file):
+    return store_chunks(uploaded_file.chunks(CHUNK_SIZE))
+
+
+def is_inline(value):
+    """Whether a photo value is a data: URL or a bare base64 string (rather than a URL or reference)"""
+    if not isinstance(value, str):
+        return False
+    return value.startswith('data:') or (len(value) >= 100 and BASE64_RE.match(value) is not None)
+
+
+def store_data_url(value):
+    """Store an inline `data:image/...;base64,...` (or bare base64) photo"""
+    encoded = value
+    if value.startswith('data:'):
+        header, comma, encoded = value.partition(',')
+        if not comma or not header.endswith(';base64'):
+            raise PhotoStoreError('Photo data URL is not base64 encoded')
+    try:
+        # Strictly base64, so arbitrary text isn't stored as a photo
+        data = base64.b64decode(''.join(encoded.split()), validate=True)
+    except (binascii.Error, ValueError):
+        raise PhotoStoreError('Photo is not valid base64 data')
+    if not data:
+        raise PhotoStoreError('Photo is empty')
+    return store_chunks(data[i:i + CHUNK_SIZE] for i in range(0, len(data), CHUNK_SIZE))
+
+
+# Chunked uploads: chunks are appended to photos/uploads/<upload_id> at the
+# offset the client says it is at, then hashed and committed on completion.
+
+def _upload_path(upload_id):
+    if not UPLOAD_ID_RE.match(upload_id or ''):
+        raise PhotoStoreError('Invalid upload_id')
+    return photo_root() / 'uploads' / upload_id
+
+
+def start_upload():
+    maybe_sweep()
+    upload_id = uuid.uuid4().hex
+    path = _upload_path(upload_id)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.touch()
+    return upload_id
+
+
+def append_chunk(upload_id, offset, uploaded_file):
+    """Append a chunk at `offset`; returns the number of bytes received so far"""
+    path = _upload_path(upload_id)
+    if not path.exists():
+        raise PhotoStoreError('Unknown upload_id')
+    received = path.stat().st_size
+    if offset != received:
+        raise PhotoStoreError(f'Expected offset {received}, got {offset}')
+    if received + uploaded_file.size > settings.PHOTO_UPLOAD_MAX_BYTES:
+        raise PhotoStoreError(f'Photo exceeds {settings.PHOTO_UPLOAD_MAX_BYTES} bytes')
+    with open(path, 'ab') as f:
+        for chunk in uploaded_file.chunks(CHUNK_SIZE):
+            f.write(chunk)
+    return path.stat().st_size
+
+
+def complete_upload(upload_id, expected_sha256=None):
+    path = _upload_path(upload_id)
+    if not path.exists():
+        raise PhotoStoreError('Unknown upload_id')
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    digest = digest.hexdigest()
+    if expected_sha256 and expected_sha256.lower() != digest:
+        path.unlink()
+        raise PhotoStoreError('Checksum mismatch, upload discarded')
+    return _commit(path, digest, path.stat().st_size)
+
+
+def maybe_sweep(force=False):
+    """Run sweep at most once per SWEEP_INTERVAL seconds per process"""
+    global _last_sweep
+    now = time.monotonic()
+    if not force and now - _last_sweep < SWEEP_INTERVAL:
+        return 0
+    _last_sweep = now
+    return sweep()
+
+
+def sweep(max_age=None):
+    """
+    Delete abandoned chunked uploads and temp files not modified for
+    `max_age` seconds (default PHOTO_UPLOAD_MAX_AGE_SECONDS). Returns the
+    number of files removed.
+    """
+    max_age = settings.PHOTO_UPLOAD_MAX_AGE_SECONDS if max_age is None else max_age
+    cutoff = time.time() - max_age
+    removed = 0
+    for directory in (photo_root() / 'uploads', photo_root() / 'tmp'):
+        if not directory.is_dir():
+            continue
+        for path in directory.iterdir():
+            try:
+                if path.stat().st_mtime < cutoff:
+                    path.unlink()
+                    removed += 1
+            except FileNotFoundError:
+                continue
+    return removed
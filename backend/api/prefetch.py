@@ -0,0 +1,172 @@
+"""
+Background prefetch of HiBid item images into the local image cache.
+
+When a HiBid item is ingested, one ImagePrefetch row per image URL is created
+and handed to a per-process thread pool. Downloads are limited per remote host
+by PREFETCH_PER_HOST_CONCURRENCY, images that are already cached are only
+hashed, and the rows double as the progress record served by
+get-prefetch-status/. Rows left pending by a restart are drained by
+``manage.py prefetch_images``.
+"""
+
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+from django.conf import settings
+from django.db import close_old_connections, connections, transaction
+from django.utils import timezone
+
+from . import image_cache
+from .models import ImagePrefetch
+
+_executor = None
+_executor_lock = threading.Lock()
+_host_semaphores = {}
+_host_semaphores_lock = threading.Lock()
+_local = threading.local()
+
+
+def _get_executor():
+    # Created lazily so no threads exist before gunicorn forks its workers
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.PREFETCH_WORKERS,
+                thread_name_prefix='image-prefetch'
+            )
+        return _executor
+
+
+def _host_semaphore(url):
+    host = (urlparse(url).hostname or '').lower()
+    with _host_semaphores_lock:
+        if host not in _host_semaphores:
+            _host_semaphores[host] = threading.BoundedSemaphore(settings.PREFETCH_PER_HOST_CONCURRENCY)
+        return _host_semaphores[host]
+
+
+def _session():
+    # One requests session per pool thread for keep-alive to the image CDN
+    if not hasattr(_local, 'session'):
+        import requests
+        _local.session = requests.Session()
+    return _local.session
+
+
+def item_image_urls(hibid_item):
+    urls = list(hibid_item.all_unique_image_urls or [])
+    if hibid_item.main_image_url:
+        urls.insert(0, hibid_item.main_image_url)
+    seen = set()
+    return [url for url in urls if isinstance(url, str) and url and not (url in seen or seen.add(url))]
+
+
+def enqueue_item(hibid_item):
+    """
+    Create prefetch rows for the item's images and schedule the pending ones
+    once the surrounding transaction commits. Returns the number of new rows.
+    """
+    if not settings.PREFETCH_ENABLED:
+        return 0
+    urls = item_image_urls(hibid_item)
+    if not urls:
+        return 0
+
+    existing = set(ImagePrefetch.objects.filter(hibid_item=hibid_item, url__in=urls).values_list('url', flat=True))
+    new_rows = [
+        ImagePrefetch(hibid_item=hibid_item, url=url, status='pending')
+        for url in urls if url not in existing
+    ]
+    ImagePrefetch.objects.bulk_create(new_rows, ignore_conflicts=True)
+
+    pending_ids = list(
+        ImagePrefetch.objects.filter(hibid_item=hibid_item, status='pending').values_list('id', flat=True)
+    )
+    transaction.on_commit(lambda: submit(pending_ids))
+    return len(new_rows)
+
+
+def submit(prefetch_ids):
+    executor = _get_executor()
+    for prefetch_id in prefetch_ids:
+        executor.submit(_run, prefetch_id)
+
+
+def _run(prefetch_id):
+    close_old_connections()
+    try:
+        return prefetch_one(prefetch_id)
+    except Exception as e:
+        print(f"Image prefetch {prefetch_id} crashed:", str(e))
+    finally:
+        connections.close_all()
+
+
+def _file_digest(path):
+    digest = hashlib.sha256()
+    size = 0
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(image_cache.CHUNK_SIZE), b''):
+            digest.update(chunk)
+            size += len(chunk)
+    return digest.hexdigest(), size
+
+
+def prefetch_one(prefetch_id, session=None):
+    """Download (or reuse the cached copy of) one image and record its size and hash"""
+    claimed = ImagePrefetch.objects.filter(id=prefetch_id, status__in=['pending', 'error']).update(status='downloading')
+    if not claimed:
+        return None
+    prefetch = ImagePrefetch.objects.get(id=prefetch_id)
+
+    if not image_cache.is_allowed(prefetch.url):
+        prefetch.status = 'skipped'
+        prefetch.error = 'Host not in IMAGE_PROXY_ALLOWED_HOSTS'
+        prefetch.save(update_fields=['status', 'error'])
+        return prefetch
+
+    try:
+        if image_cache.original_path(prefetch.url).is_file():
+            path, _ = image_cache.fetch_original(prefetch.url)
+        else:
+            with _host_semaphore(prefetch.url):
+                path, _ = image_cache.fetch_original(prefetch.url, session=session or _session())
+        prefetch.sha256, prefetch.size = _file_digest(path)
+        prefetch.status = 'done'
+        prefetch.error = ''
+        prefetch.fetched_at = timezone.now()
+    except (image_cache.ImageCacheError, OSError) as e:
+        prefetch.status = 'error'
+        prefetch.error = str(e)
+    prefetch.save(update_fields=['status', 'sha256', 'size', 'error', 'fetched_at'])
+    return prefetch
+
+
+def item_progress(hibid_item):
+    """Per-item prefetch progress for the API"""
+    images = list(ImagePrefetch.objects.filter(hibid_item=hibid_item).order_by('id'))
+    counts = {}
+    for image in images:
+        counts[image.status] = counts.get(image.status, 0) + 1
+    finished = sum(counts.get(s, 0) for s in ('done', 'skipped', 'error'))
+    return {
+        'item_id': hibid_item.id,
+        'total': len(images),
+        'counts': counts,
+        'complete': bool(images) and finished == len(images),
+        'bytes': sum(image.size or 0 for image in images),
+        'images': [
+            {
+                'url': image.url,
+                'status': image.status,
+                'size': image.size,
+                'sha256': image.sha256,
+                'error': image.error,
+                'fetched_at': image.fetched_at.isoformat() if image.fetched_at else None,
+            }
+            for image in images
+        ],
+    }
@@ -0,0 +1,167 @@
+"""
+On-demand request profiling.
+
+A request is profiled when it carries a valid signed ``X-Profile-Request``
+header (see ``manage.py profile_token``) or when it is picked by the
+``PROFILING_SAMPLE_RATE`` sampler. The cProfile stats and the SQL executed are
+written to ``PROFILING_DIR``, one file per profile, so the admin-only
+``/api/profiles/`` endpoints can serve a profile whichever worker captured
+it. Only the latest ``PROFILING_BUFFER_SIZE`` are kept.
+"""
+
+import cProfile
+import io
+import marshal
+import os
+import pstats
+import random
+import re
+import time
+import uuid
+from contextlib import ExitStack
+from pathlib import Path
+
+from django.conf import settings
+from django.core import signing
+from django.db import connections
+
+PROFILE_HEADER = 'X-Profile-Request'
+TOKEN_SALT = 'api.profiling'
+MAX_SQL_STATEMENTS = 500
+
+
+def make_token():
+    """Signed value for the X-Profile-Request header"""
+    return signing.dumps('profile', salt=TOKEN_SALT)
+
+
+def token_is_valid(value):
+    try:
+        signing.loads(value, salt=TOKEN_SALT, max_age=settings.PROFILING_TOKEN_MAX_AGE)
+        return True
+    except signing.BadSignature:
+        return False
+
+
+_profile_id = re.compile(r'^[0-9a-f]{16}$')
+
+
+class ProfileStore:
+    """The latest PROFILING_BUFFER_SIZE profiles, as marshal files shared by all workers"""
+
+    @property
+    def directory(self):
+        return Path(settings.PROFILING_DIR)
+
+    def _path(self, profile_id):
+        return self.directory / f'{profile_id}.prof'
+
+    def add(self, profile):
+        profile['id'] = uuid.uuid4().hex[:16]
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self._path(profile['id'])
+        tmp_path = path.with_name(f'.{path.name}.tmp')
+        tmp_path.write_bytes(marshal.dumps(profile))
+        os.replace(tmp_path, path)
+        for stale in self._paths()[settings.PROFILING_BUFFER_SIZE:]:
+            stale.unlink(missing_ok=True)
+        return profile['id']
+
+    def _paths(self):
+        """Profile files, latest first"""
+        entries = []
+        for path in self.directory.glob('*.prof'):
+            try:
+                entries.append((path.stat().st_mtime_ns, path))
+            except FileNotFoundError:
+                continue  # pruned by another worker
+        return [path for _, path in sorted(entries, reverse=True)]
+
+    def _read(self, path):
+        try:
+            return marshal.loads(path.read_bytes())
+        except (FileNotFoundError, EOFError, ValueError, TypeError):
+            return None
+
+    def list(self):
+        if not self.directory.is_dir():
+            return []
+        return [profile for profile in map(self._read, self._paths()) if profile is not None]
+
+    def get(self, profile_id):
+        if not _profile_id.match(profile_id):
+            return None
+        return self._read(self._path(profile_id))
+
+
+profiles = ProfileStore()
+
+
+class SQLRecorder:
+    """execute_wrapper that records each statement and its duration"""
+
+    def __init__(self):
+        self.statements = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            if len(self.statements) < MAX_SQL_STATEMENTS:
+                self.statements.append({
+                    'sql': sql,
+                    'params': repr(params)[:500],
+                    'duration_ms': round((time.perf_counter() - start) * 1000, 3),
+                })
+
+
+class ProfilingMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = getattr(settings, 'PROFILING_ENABLED', True)
+        self.sample_rate = getattr(settings, 'PROFILING_SAMPLE_RATE', 0.0)
+
+    def should_profile(self, request):
+        header = request.headers.get(PROFILE_HEADER)
+        if header:
+            return token_is_valid(header)
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def __call__(self, request):
+        if not self.enabled or request.path.startswith('/api/profiles/') or not self.should_profile(request):
+            return self.get_response(request)
+
+        recorder = SQLRecorder()
+        profiler = cProfile.Profile()
+        started_at = time.time()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            profiler.enable()
+            try:
+                response = self.get_response(request)
+            finally:
+                profiler.disable()
+        elapsed = time.perf_counter() - start
+
+        report = io.StringIO()
+        stats = pstats.Stats(profiler, stream=report)
+        stats.sort_stats('cumulative').print_stats(60)
+
+        match = getattr(request, 'resolver_match', None)
+        profile_id = profiles.add({
+            'view': match.url_name if match else None,
+            'method': request.method,
+            'path': request.get_full_path(),
+            'status_code': response.status_code,
+            'duration_ms': round(elapsed * 1000, 3),
+            'started_at': started_at,
+            'sql': recorder.statements,
+            'sql_time_ms': round(sum(s['duration_ms'] for s in recorder.statements), 3),
+            'report': report.getvalue(),
+            'pstats': marshal.dumps(stats.stats),
+        })
+        response['X-Profile-Id'] = profile_id
+        return response
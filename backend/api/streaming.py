@@ -0,0 +1,40 @@
+"""
+Streaming JSON list responses.
+
+``stream_items`` writes ``{"<key>": [...], "total_count": N, ...}`` one chunk
+of array elements at a time, so memory stays flat however many rows are
+returned: rows come from a chunked database cursor and each chunk is encoded
+and handed to the server before the next one is fetched. The count is only
+known at the end, which is why it (and the summary message) trails the array.
+"""
+
+from django.http import StreamingHttpResponse
+
+from .renderers import dumps
+
+
+def _json_stream(key, items, chunk_size, trailer):
+    yield b'{' + dumps(key) + b':['
+    total = 0
+    chunk = []
+    for item in items:
+        chunk.append(dumps(item))
+        if len(chunk) >= chunk_size:
+            yield (b',' if total else b'') + b','.join(chunk)
+            total += len(chunk)
+            chunk = []
+    if chunk:
+        yield (b',' if total else b'') + b','.join(chunk)
+        total += len(chunk)
+    yield b'],' + dumps({'total_count': total, **trailer(total)})[1:]
+
+
+def stream_items(key, items, chunk_size, trailer=lambda total: {}):
+    """
+    StreamingHttpResponse for an iterable of JSON-serializable rows.
+    `trailer(total)` returns extra top-level keys written after the array.
+    """
+    response = StreamingHttpResponse(_json_stream(key, items, chunk_size, trailer),
+                                     content_type='application/json')
+    response['X-Accel-Buffering'] = 'no'  # let nginx pass chunks through as they're produced
+    return response
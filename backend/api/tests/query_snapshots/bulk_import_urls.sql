@@ -0,0 +1 @@
+INSERT INTO "bulk_imports" ("source", "urls", "total", "state", "cursor", "invalid_count", "existing_count", "deduplicated_count", "dispatched_count", "queued_count", "failed_count", "failed_urls", "elapsed_seconds", "last_error", "created_at", "updated_at", "finished_at") VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, NULL) RETURNING "bulk_imports"."id"
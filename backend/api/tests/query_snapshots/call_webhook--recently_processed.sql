@@ -0,0 +1 @@
+SELECT "hibid_items"."id", "hibid_items"."url_main", "hibid_items"."item_title", "hibid_items"."lot_number", "hibid_items"."item_name", "hibid_items"."processed_at", "hibid_items"."updated_at", "hibid_items"."status" FROM "hibid_items" WHERE "hibid_items"."url_main" IN (...) ORDER BY "hibid_items"."processed_at" DESC LIMIT ?
@@ -0,0 +1,6 @@
+SELECT "hibid_items"."id", "hibid_items"."url_main", "hibid_items"."item_title", "hibid_items"."lot_number", "hibid_items"."item_name", "hibid_items"."processed_at", "hibid_items"."updated_at", "hibid_items"."status" FROM "hibid_items" WHERE "hibid_items"."url_main" IN (...) ORDER BY "hibid_items"."processed_at" DESC LIMIT ?
+SELECT "outbound_calls"."id", "outbound_calls"."webhook", "outbound_calls"."webhook_url", "outbound_calls"."payload", "outbound_calls"."dedupe_key", "outbound_calls"."state", "outbound_calls"."attempts", "outbound_calls"."max_attempts", "outbound_calls"."next_run_at", "outbound_calls"."last_status_code", "outbound_calls"."last_error", "outbound_calls"."response_body", "outbound_calls"."created_at", "outbound_calls"."updated_at" FROM "outbound_calls" WHERE (("outbound_calls"."state" IN (...) OR ("outbound_calls"."state" = ? AND "outbound_calls"."updated_at" > ?)) AND "outbound_calls"."dedupe_key" = ?) ORDER BY "outbound_calls"."updated_at" DESC LIMIT ?
+SAVEPOINT "savepoint"
+INSERT INTO "outbound_calls" ("webhook", "webhook_url", "payload", "dedupe_key", "state", "attempts", "max_attempts", "next_run_at", "last_status_code", "last_error", "response_body", "created_at", "updated_at") VALUES (?, ?, ?, ?, ?, ?, ?, NULL, NULL, ?, ?, ?, ?) RETURNING "outbound_calls"."id"
+RELEASE SAVEPOINT "savepoint"
+UPDATE "outbound_calls" SET "state" = ?, "attempts" = ?, "next_run_at" = NULL, "last_status_code" = ?, "last_error" = ?, "response_body" = ?, "updated_at" = ? WHERE "outbound_calls"."id" = ?
@@ -0,0 +1 @@
+SELECT "webhook_data_archive"."original_id" AS "original_id", "webhook_data_archive"."sku" AS "sku", "webhook_data_archive"."ebay_title" AS "ebay_title", "webhook_data_archive"."ebay_description" AS "ebay_description", "webhook_data_archive"."condition" AS "condition", "webhook_data_archive"."ai_improved_estimate" AS "ai_improved_estimate", "webhook_data_archive"."ai_improved_description" AS "ai_improved_description", "webhook_data_archive"."quantity" AS "quantity", "webhook_data_archive"."received_at" AS "received_at", "webhook_data_archive"."archived_at" AS "archived_at" FROM "webhook_data_archive" WHERE "webhook_data_archive"."ebay_title" LIKE ? ESCAPE ? ORDER BY ? DESC, "webhook_data_archive"."id" DESC LIMIT ?
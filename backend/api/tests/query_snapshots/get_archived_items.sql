@@ -0,0 +1 @@
+SELECT "hibid_items_archive"."original_id" AS "original_id", "hibid_items_archive"."url_main" AS "url_main", "hibid_items_archive"."item_title" AS "item_title", "hibid_items_archive"."item_name" AS "item_name", "hibid_items_archive"."lot_number" AS "lot_number", "hibid_items_archive"."category" AS "category", "hibid_items_archive"."estimate" AS "estimate", "hibid_items_archive"."auction_name" AS "auction_name", "hibid_items_archive"."auctioneer" AS "auctioneer", "hibid_items_archive"."auction_dates" AS "auction_dates", "hibid_items_archive"."location" AS "location", "hibid_items_archive"."current_bid" AS "current_bid", "hibid_items_archive"."bid_count" AS "bid_count", "hibid_items_archive"."main_image_url" AS "main_image_url", "hibid_items_archive"."ai_response" AS "ai_response", "hibid_items_archive"."status" AS "status", "hibid_items_archive"."processed_at" AS "processed_at", "hibid_items_archive"."archived_at" AS "archived_at" FROM "hibid_items_archive" ORDER BY ? DESC, "hibid_items_archive"."id" DESC LIMIT ?
@@ -0,0 +1,2 @@
+SELECT "bulk_imports"."id" AS "id" FROM "bulk_imports" ORDER BY ? ASC LIMIT ?
+SELECT "bulk_imports"."id", "bulk_imports"."source", "bulk_imports"."urls", "bulk_imports"."total", "bulk_imports"."state", "bulk_imports"."cursor", "bulk_imports"."invalid_count", "bulk_imports"."existing_count", "bulk_imports"."deduplicated_count", "bulk_imports"."dispatched_count", "bulk_imports"."queued_count", "bulk_imports"."failed_count", "bulk_imports"."failed_urls", "bulk_imports"."elapsed_seconds", "bulk_imports"."last_error", "bulk_imports"."created_at", "bulk_imports"."updated_at", "bulk_imports"."finished_at" FROM "bulk_imports" WHERE "bulk_imports"."id" = ? ORDER BY "bulk_imports"."created_at" DESC LIMIT ?
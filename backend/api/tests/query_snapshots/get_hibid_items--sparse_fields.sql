@@ -0,0 +1 @@
+SELECT "hibid_items"."id" AS "id", "hibid_items"."item_title" AS "item_title", "hibid_items"."item_name" AS "item_name", "hibid_items"."current_bid" AS "current_bid" FROM "hibid_items" WHERE "hibid_items"."status" = ? ORDER BY "hibid_items"."processed_at" DESC
@@ -0,0 +1 @@
+SELECT "hibid_items"."id" AS "id", "hibid_items"."url_main" AS "url_main", "hibid_items"."item_title" AS "item_title", "hibid_items"."item_name" AS "item_name", "hibid_items"."lot_number" AS "lot_number", "hibid_items"."description" AS "description", "hibid_items"."lead" AS "lead", "hibid_items"."category" AS "category", "hibid_items"."estimate" AS "estimate", "hibid_items"."auction_name" AS "auction_name", "hibid_items"."auctioneer" AS "auctioneer", "hibid_items"."auction_type" AS "auction_type", "hibid_items"."auction_dates" AS "auction_dates", "hibid_items"."location" AS "location", "hibid_items"."current_bid" AS "current_bid", "hibid_items"."bid_count" AS "bid_count", "hibid_items"."time_remaining" AS "time_remaining", "hibid_items"."shipping_available" AS "shipping_available", "hibid_items"."main_image_url" AS "main_image_url", "hibid_items"."all_unique_image_urls" AS "all_unique_image_urls", "hibid_items"."gallery_image_urls" AS "gallery_image_urls", "hibid_items"."ai_response" AS "ai_response", "hibid_items"."status" AS "status", "hibid_items"."processed_at" AS "processed_at" FROM "hibid_items" WHERE "hibid_items"."status" = ? ORDER BY ? DESC
@@ -0,0 +1,4 @@
+SELECT "django_session"."session_key", "django_session"."session_data", "django_session"."expire_date" FROM "django_session" WHERE ("django_session"."expire_date" > ? AND "django_session"."session_key" = ?) LIMIT ?
+SELECT "auth_user"."id", "auth_user"."password", "auth_user"."last_login", "auth_user"."is_superuser", "auth_user"."username", "auth_user"."first_name", "auth_user"."last_name", "auth_user"."email", "auth_user"."is_staff", "auth_user"."is_active", "auth_user"."date_joined" FROM "auth_user" WHERE "auth_user"."id" = ? LIMIT ?
+SELECT "outbound_calls"."id", "outbound_calls"."webhook", "outbound_calls"."webhook_url", "outbound_calls"."payload", "outbound_calls"."dedupe_key", "outbound_calls"."state", "outbound_calls"."attempts", "outbound_calls"."max_attempts", "outbound_calls"."next_run_at", "outbound_calls"."last_status_code", "outbound_calls"."last_error", "outbound_calls"."response_body", "outbound_calls"."created_at", "outbound_calls"."updated_at" FROM "outbound_calls" ORDER BY "outbound_calls"."created_at" DESC LIMIT ?
+SELECT COUNT(*) AS "__count" FROM "outbound_calls"
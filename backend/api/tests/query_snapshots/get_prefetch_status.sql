@@ -0,0 +1,3 @@
+SELECT "hibid_items"."id" AS "id" FROM "hibid_items" ORDER BY "hibid_items"."processed_at" DESC LIMIT ?
+SELECT "hibid_items"."id", "hibid_items"."url_main", "hibid_items"."item_title", "hibid_items"."source", "hibid_items"."lot_number", "hibid_items"."description", "hibid_items"."lead", "hibid_items"."item_name", "hibid_items"."category", "hibid_items"."estimate", "hibid_items"."auction_name", "hibid_items"."auctioneer", "hibid_items"."auction_type", "hibid_items"."auction_dates", "hibid_items"."location", "hibid_items"."current_bid", "hibid_items"."bid_count", "hibid_items"."time_remaining", "hibid_items"."shipping_available", "hibid_items"."all_unique_image_urls", "hibid_items"."main_image_url", "hibid_items"."gallery_image_urls", "hibid_items"."broad_search_images", "hibid_items"."tumbnail_images", "hibid_items"."ai_response", "hibid_items"."raw_data", "hibid_items"."processed_at", "hibid_items"."updated_at", "hibid_items"."status", "hibid_items"."auction_ends_at", "hibid_items"."next_refresh_at", "hibid_items"."refresh_requested_at" FROM "hibid_items" WHERE "hibid_items"."id" = ? LIMIT ?
+SELECT "image_prefetches"."id", "image_prefetches"."hibid_item_id", "image_prefetches"."url", "image_prefetches"."status", "image_prefetches"."size", "image_prefetches"."sha256", "image_prefetches"."error", "image_prefetches"."created_at", "image_prefetches"."fetched_at" FROM "image_prefetches" WHERE "image_prefetches"."hibid_item_id" = ? ORDER BY "image_prefetches"."id" ASC
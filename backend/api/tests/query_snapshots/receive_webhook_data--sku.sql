@@ -0,0 +1,4 @@
+SELECT "webhook_data"."id", "webhook_data"."sku", "webhook_data"."ebay_title", "webhook_data"."ebay_description", "webhook_data"."condition", "webhook_data"."ai_improved_estimate", "webhook_data"."ai_improved_description", "webhook_data"."quantity", "webhook_data"."raw_data", "webhook_data"."received_at", "webhook_data"."processed" FROM "webhook_data" WHERE "webhook_data"."sku" = ? LIMIT ?
+SAVEPOINT "savepoint"
+INSERT INTO "webhook_data" ("sku", "ebay_title", "ebay_description", "condition", "ai_improved_estimate", "ai_improved_description", "quantity", "raw_data", "received_at", "processed") VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?) RETURNING "webhook_data"."id"
+RELEASE SAVEPOINT "savepoint"
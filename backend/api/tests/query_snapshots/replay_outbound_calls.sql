@@ -0,0 +1,4 @@
+SELECT "django_session"."session_key", "django_session"."session_data", "django_session"."expire_date" FROM "django_session" WHERE ("django_session"."expire_date" > ? AND "django_session"."session_key" = ?) LIMIT ?
+SELECT "auth_user"."id", "auth_user"."password", "auth_user"."last_login", "auth_user"."is_superuser", "auth_user"."username", "auth_user"."first_name", "auth_user"."last_name", "auth_user"."email", "auth_user"."is_staff", "auth_user"."is_active", "auth_user"."date_joined" FROM "auth_user" WHERE "auth_user"."id" = ? LIMIT ?
+UPDATE "outbound_calls" SET "state" = ?, "attempts" = ?, "next_run_at" = ?, "updated_at" = ? WHERE ("outbound_calls"."state" = ? AND "outbound_calls"."dedupe_key" = ?)
+SELECT "outbound_calls"."id" AS "id" FROM "outbound_calls" WHERE ("outbound_calls"."state" = ? AND NOT ("outbound_calls"."dedupe_key" = ?)) ORDER BY "outbound_calls"."updated_at" DESC
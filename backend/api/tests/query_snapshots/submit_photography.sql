@@ -0,0 +1,4 @@
+SAVEPOINT "savepoint"
+INSERT INTO "outbound_calls" ("webhook", "webhook_url", "payload", "dedupe_key", "state", "attempts", "max_attempts", "next_run_at", "last_status_code", "last_error", "response_body", "created_at", "updated_at") VALUES (?, ?, ?, ?, ?, ?, ?, NULL, NULL, ?, ?, ?, ?) RETURNING "outbound_calls"."id"
+RELEASE SAVEPOINT "savepoint"
+UPDATE "outbound_calls" SET "state" = ?, "attempts" = ?, "next_run_at" = NULL, "last_status_code" = ?, "last_error" = ?, "response_body" = ?, "updated_at" = ? WHERE "outbound_calls"."id" = ?
@@ -0,0 +1,100 @@
+"""
+Admission control: rejected requests get 429 with Retry-After, a request
+turned away by one limit doesn't use up the other, slots are released when
+the view raises, and an unreachable Redis falls back to per-process limits.
+"""
+
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+from django.test.client import RequestFactory
+from rest_framework.response import Response
+
+from api import admission
+
+NAME = 'test_view'
+
+
+@admission.admission_controlled(NAME)
+def view(request):
+    if request.GET.get('fail'):
+        raise ValueError('view failed')
+    return Response({'status': 'ok'})
+
+
+def limits(**entry):
+    return override_settings(ADMISSION_CONTROL_ENABLED=True, REDIS_URL='', ADMISSION_LIMITS={NAME: entry})
+
+
+class AdmissionTests(SimpleTestCase):
+
+    def setUp(self):
+        patcher = mock.patch.multiple(admission, _local=admission.LocalLimiter(), _redis=None, _redis_retry_at=0.0)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.factory = RequestFactory()
+
+    def in_flight(self):
+        return admission._local._in_flight.get(NAME, 0)
+
+    @limits(rate=0.5, burst=1)
+    def test_rate_limited_request_gets_429_with_retry_after(self):
+        self.assertEqual(view(self.factory.get('/')).status_code, 200)
+        response = view(self.factory.get('/'))
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '2')
+        self.assertIn('rate limit', response.data['error'])
+
+    @limits(concurrency=1, retry_after=3)
+    def test_concurrency_limited_request_gets_429_with_retry_after(self):
+        release = admission.admit(NAME)
+        response = view(self.factory.get('/'))
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '3')
+        release()
+        self.assertEqual(view(self.factory.get('/')).status_code, 200)
+
+    @limits(concurrency=1, rate=0.001, burst=2)
+    def test_concurrency_rejection_keeps_the_rate_token(self):
+        release = admission.admit(NAME)
+        with self.assertRaises(admission.Rejected) as rejected:
+            admission.admit(NAME)
+        self.assertEqual(rejected.exception.reason, 'concurrency')
+        release()
+        # The rejected request didn't spend the second token
+        admission.admit(NAME)()
+        with self.assertRaises(admission.Rejected) as rejected:
+            admission.admit(NAME)
+        self.assertEqual(rejected.exception.reason, 'rate')
+
+    @limits(concurrency=1, rate=0.001, burst=1)
+    def test_rate_rejection_frees_the_concurrency_slot(self):
+        admission.admit(NAME)()
+        with self.assertRaises(admission.Rejected):
+            admission.admit(NAME)
+        self.assertEqual(self.in_flight(), 0)
+
+    @limits(concurrency=2)
+    def test_slot_is_released_when_the_view_raises(self):
+        with self.assertRaises(ValueError):
+            view(self.factory.get('/', {'fail': '1'}))
+        self.assertEqual(self.in_flight(), 0)
+
+    @limits(concurrency=1, rate=100)
+    def test_unreachable_redis_falls_back_to_local_limits(self):
+        # Nothing listens on port 1
+        with self.settings(REDIS_URL='redis://127.0.0.1:1/0'), mock.patch('builtins.print'):
+            release = admission.admit(NAME)
+            self.assertEqual(self.in_flight(), 1)
+            self.assertGreater(admission._redis_retry_at, 0)
+            with self.assertRaises(admission.Rejected):
+                admission.admit(NAME)
+            release()
+            self.assertEqual(self.in_flight(), 0)
+            self.assertIs(admission._limiter(), admission._local)
+
+    @override_settings(ADMISSION_CONTROL_ENABLED=False, ADMISSION_LIMITS={NAME: {'concurrency': 1}})
+    def test_disabled_admission_admits_everything(self):
+        for _ in range(3):
+            admission.admit(NAME)
+        self.assertEqual(self.in_flight(), 0)
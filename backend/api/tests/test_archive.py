@@ -0,0 +1,90 @@
+"""
+Archival: only rows older than the cutoff move to the archive tables, HiBid
+items an auction item links to stay live, and webhook data stays live while
+an auction item with its SKU is in progress.
+"""
+
+import io
+from datetime import timedelta
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from api import archive
+from api.models import AuctionItem, HiBidItem, HiBidItemArchive, WebhookData, WebhookDataArchive
+
+
+class ArchiveTests(TestCase):
+
+    def setUp(self):
+        self.now = timezone.now()
+
+    def hibid_item(self, name, age_days):
+        item = HiBidItem.objects.create(url_main=f'https://hibid.com/lot/{name}', item_name=name,
+                                        status='processed', raw_data={'name': name})
+        HiBidItem.objects.filter(id=item.id).update(processed_at=self.now - timedelta(days=age_days))
+        return item
+
+    def webhook_data(self, sku, age_days):
+        row = WebhookData.objects.create(sku=sku, ebay_title=f'Title {sku}', raw_data={'sku': sku})
+        WebhookData.objects.filter(id=row.id).update(received_at=self.now - timedelta(days=age_days))
+        return row
+
+    def auction_item(self, sku, status, hibid_item=None):
+        return AuctionItem.objects.create(sku=sku, auction_name='Spring', item_name=sku, lot_number='1',
+                                          status=status, hibid_item=hibid_item)
+
+    def archive(self, days=90, **options):
+        call_command('archive_old_rows', days=days, stdout=io.StringIO(), **options)
+
+    def test_only_rows_older_than_the_cutoff_are_archived(self):
+        old, recent = self.hibid_item('old', 120), self.hibid_item('recent', 30)
+        self.webhook_data('OLD-1', 120)
+        self.webhook_data('RECENT-1', 30)
+
+        self.archive(days=90)
+        self.assertEqual(list(HiBidItem.objects.values_list('id', flat=True)), [recent.id])
+        self.assertEqual(list(WebhookData.objects.values_list('sku', flat=True)), ['RECENT-1'])
+        archived = HiBidItemArchive.objects.get()
+        self.assertEqual((archived.original_id, archived.url_main, archived.raw_data),
+                         (old.id, old.url_main, {'name': 'old'}))
+        self.assertEqual(WebhookDataArchive.objects.get().sku, 'OLD-1')
+
+        self.archive(days=10)
+        self.assertFalse(HiBidItem.objects.exists())
+        self.assertEqual(HiBidItemArchive.objects.count(), 2)
+
+    def test_hibid_items_linked_to_auction_items_are_kept(self):
+        finalized, researching = self.hibid_item('finalized', 200), self.hibid_item('researching', 200)
+        unlinked = self.hibid_item('unlinked', 200)
+        self.auction_item('AI-1', 'finalized', finalized)
+        self.auction_item('AI-2', 'research', researching)
+
+        self.archive()
+        self.assertEqual(set(HiBidItem.objects.values_list('id', flat=True)), {finalized.id, researching.id})
+        self.assertEqual(list(HiBidItemArchive.objects.values_list('original_id', flat=True)), [unlinked.id])
+        self.assertEqual(AuctionItem.objects.get(sku='AI-1').hibid_item_id, finalized.id)
+
+    def test_webhook_data_of_auction_items_in_progress_is_kept(self):
+        for sku in ('IN-PROGRESS', 'FINALIZED', 'ORPHAN'):
+            self.webhook_data(sku, 200)
+        self.auction_item('IN-PROGRESS', 'photography')
+        self.auction_item('FINALIZED', 'finalized')
+
+        self.archive()
+        self.assertEqual(list(WebhookData.objects.values_list('sku', flat=True)), ['IN-PROGRESS'])
+        self.assertEqual(set(WebhookDataArchive.objects.values_list('sku', flat=True)), {'FINALIZED', 'ORPHAN'})
+
+    def test_batches_and_dry_run(self):
+        for n in range(5):
+            self.hibid_item(f'batch-{n}', 200)
+        cutoff = self.now - timedelta(days=90)
+
+        self.archive(dry_run=True)
+        self.assertEqual(HiBidItem.objects.count(), 5)
+        self.assertEqual(archive.archive_batch(archive.TARGETS['hibid'], cutoff, archive.TableSink(), batch_size=2), 2)
+        self.assertEqual(HiBidItem.objects.count(), 3)
+        self.archive(batch_size=2, table=['hibid'])
+        self.assertFalse(HiBidItem.objects.exists())
+        self.assertEqual(HiBidItemArchive.objects.count(), 5)
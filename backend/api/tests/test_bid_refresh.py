@@ -0,0 +1,96 @@
+"""
+Refreshed HiBid payloads keep the auction end time unless they carry a new
+countdown or new auction dates. A refresh that attaches to an auction's
+earlier call only counts the items that call carries.
+"""
+
+from datetime import timedelta
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from api import bid_refresh, ingest, outbound
+from api.models import HiBidItem, OutboundCall
+
+URL = 'https://hibid.com/lot/refresh-1'
+
+
+class AuctionEndTests(TestCase):
+
+    def ingest_at(self, moment, **data):
+        with mock.patch('django.utils.timezone.now', return_value=moment), \
+                mock.patch('api.ingest.prefetch.enqueue_item'):
+            ingest.apply_hibid_data({'url_main': URL, 'item_name': 'Oak dresser', **data})
+        return HiBidItem.objects.get(url_main=URL)
+
+    def test_payload_without_countdown_keeps_the_end(self):
+        scraped = timezone.now()
+        item = self.ingest_at(scraped, time_remaining='2h 0m', current_bid='$20')
+        self.assertEqual(item.auction_ends_at, scraped + timedelta(hours=2))
+
+        for hours in (1, 1.9, 3):
+            item = self.ingest_at(scraped + timedelta(hours=hours), current_bid=f'${20 + hours}')
+            self.assertEqual(item.auction_ends_at, scraped + timedelta(hours=2))
+        self.assertEqual(item.time_remaining, '2h 0m')
+
+    def test_new_countdown_or_dates_move_the_end(self):
+        scraped = timezone.now()
+        self.ingest_at(scraped, time_remaining='2h 0m')
+        item = self.ingest_at(scraped + timedelta(hours=1), time_remaining='3h 0m')
+        self.assertEqual(item.auction_ends_at, scraped + timedelta(hours=4))
+
+        item = self.ingest_at(scraped + timedelta(hours=2), auction_dates='1/5/2099 - 1/9/2099 7:00 PM')
+        self.assertEqual(timezone.localtime(item.auction_ends_at).date().isoformat(), '2099-01-09')
+
+
+class FakeN8NResponse:
+    status_code = 200
+    text = '{"status": "received"}'
+
+
+@override_settings(ADMISSION_CONTROL_ENABLED=False, BID_REFRESH_WEBHOOK_URL='https://n8n.example/bid-refresh')
+class BatchDispatchTests(TestCase):
+
+    def setUp(self):
+        self.now = timezone.now()
+        self.items = [
+            HiBidItem.objects.create(
+                url_main=f'https://hibid.com/lot/batch-{n}', item_name=f'Lot {n}', auction_name='Estate Sale',
+                auctioneer='Acme Auctions', auction_ends_at=self.now + timedelta(minutes=5),
+                next_refresh_at=self.now - timedelta(seconds=1),
+            )
+            for n in range(3)
+        ]
+        patcher = mock.patch('requests.post', return_value=FakeN8NResponse())
+        self.post = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def pending_call(self, urls):
+        return OutboundCall.objects.create(
+            webhook='bid_refresh', webhook_url='https://n8n.example/bid-refresh',
+            payload={'auction_name': 'Estate Sale', 'auctioneer': 'Acme Auctions', 'urls': urls},
+            dedupe_key=outbound.dedupe_key_for('bid_refresh', 'Estate Sale\nAcme Auctions'), state='pending',
+        )
+
+    def refreshed(self):
+        return {item.url_main for item in HiBidItem.objects.filter(refresh_requested_at=self.now)}
+
+    def test_attaching_marks_only_the_items_in_the_earlier_call(self):
+        earlier = self.pending_call([self.items[0].url_main])
+        self.assertEqual(bid_refresh.run_due(self.now), (1, 1))
+        self.assertEqual(self.refreshed(), {self.items[0].url_main})
+        self.post.assert_not_called()
+
+        # Once the earlier call is done, the items left out go in a new one
+        # (with the first, which is due again within BID_REFRESH_BATCH_AHEAD_SECONDS)
+        OutboundCall.objects.filter(id=earlier.id).update(state='succeeded')
+        self.assertEqual(bid_refresh.run_due(self.now), (3, 1))
+        self.assertEqual(self.refreshed(), {item.url_main for item in self.items})
+        self.assertEqual(set(self.post.call_args.kwargs['json']['urls']), {item.url_main for item in self.items})
+
+    def test_earlier_call_without_these_items_marks_none(self):
+        self.pending_call(['https://hibid.com/lot/sold-earlier'])
+        self.assertEqual(bid_refresh.run_due(self.now), (0, 0))
+        self.assertEqual(self.refreshed(), set())
+        self.assertEqual(HiBidItem.objects.filter(next_refresh_at__lte=self.now).count(), 3)
@@ -0,0 +1,318 @@
+"""
+Query-count and latency budgets for every route in api/urls.py.
+
+Each request in BUDGETS runs against a seeded SQLite database (see SEED).
+It must stay within its maximum number of SQL queries and its median
+latency in milliseconds. The slowest machines can scale the latency budgets
+with PERF_BUDGET_LATENCY_FACTOR, e.g. 3.
+
+When a budget is exceeded, the failure prints a diff of the executed SQL
+against the snapshot in query_snapshots/, with literals normalized. The
+diff shows the added statements, and repeated statements are counted, so an
+N+1 shows up as one line repeated N times. After an intended change,
+refresh the snapshots and update the budget:
+
+    UPDATE_QUERY_SNAPSHOTS=1 python manage.py test api
+
+Every route needs at least one entry in BUDGETS; test_every_route_has_a_budget
+fails for a new view without one.
+"""
+
+import difflib
+import io
+import os
+import re
+import shutil
+import statistics
+import tempfile
+import time
+from collections import Counter
+from datetime import timedelta
+from pathlib import Path
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+
+from api import archive, comparables, image_cache, photo_store, urls
+from api.models import (
+    AuctionItem, BulkImport, HiBidItem, ImagePrefetch, OutboundCall, WebhookData,
+)
+from api.profiling import profiles
+
+SNAPSHOT_DIR = Path(__file__).resolve().parent / 'query_snapshots'
+UPDATE_SNAPSHOTS = os.environ.get('UPDATE_QUERY_SNAPSHOTS') == '1'
+LATENCY_FACTOR = float(os.environ.get('PERF_BUDGET_LATENCY_FACTOR', '1'))
+RUNS = 5
+
+SEED = {
+    'hibid_items': 500,
+    'archived_hibid_items': 200,
+    'webhook_data': 200,
+    'archived_webhook_data': 100,
+    'auction_items': 100,
+    'outbound_calls': 100,
+    'prefetches_per_item': 4,
+    'bulk_imports': 20,
+}
+
+IMAGE_URL = 'https://cdn.hibid.com/img.axd?id=1'
+
+# name: URL name; queries: max SQL statements; ms: max median latency.
+# Optional: method ('get'), params (query string / form data, or a function of
+# the run number for requests that must differ per run), kwargs (URL kwargs,
+# a function of the test case), admin (log in a staff user), status (200),
+# multipart (send params as multipart instead of JSON).
+BUDGETS = [
+    {'name': 'hello_world', 'queries': 0, 'ms': 30},
+    {'name': 'test_post', 'method': 'post', 'params': {'ping': 1}, 'queries': 0, 'ms': 30},
+    {'name': 'test_webhook_data', 'method': 'post', 'params': {'ping': 1}, 'queries': 0, 'ms': 30},
+    {'name': 'call_webhook', 'method': 'post', 'queries': 6, 'ms': 60,
+     'params': lambda run: {'url_main': f'https://hibid.com/lot/budget-new-{run}'}},
+    {'name': 'call_webhook', 'label': 'recently processed', 'method': 'post', 'queries': 1, 'ms': 30,
+     'params': {'url_main': 'https://hibid.com/lot/seed-1'}},
+    {'name': 'bulk_import_urls', 'method': 'post', 'status': 202, 'queries': 1, 'ms': 60,
+     'params': {'urls': [f'https://hibid.com/lot/bulk-{i}' for i in range(1000)]}},
+    {'name': 'get_bulk_imports', 'queries': 1, 'ms': 30},
+    {'name': 'get_bulk_imports', 'label': 'one import', 'queries': 2, 'ms': 30,
+     'params': lambda run: {'id': BulkImport.objects.order_by('id').values_list('id', flat=True).first()}},
+    {'name': 'submit_photography', 'method': 'post', 'queries': 4, 'ms': 60,
+     'params': {'auction_name': 'Estate Sale Spring', 'item_name': 'Oak dresser', 'lot_number': '12',
+                'quantity': 1, 'photos': []}},
+    {'name': 'upload_photo', 'method': 'post', 'multipart': True, 'queries': 0, 'ms': 60,
+     'params': lambda run: {'file': SimpleUploadedFile(f'{run}.jpg', b'\xff\xd8\xff' + os.urandom(2048))}},
+    {'name': 'upload_photo_chunk', 'method': 'post', 'multipart': True, 'queries': 0, 'ms': 60,
+     'params': lambda run: {'chunk': SimpleUploadedFile('c', b'\xff\xd8\xff' + os.urandom(2048)),
+                            'complete': 'true'}},
+    {'name': 'get_photo', 'kwargs': lambda test: {'digest': test.photo['sha256']}, 'queries': 0, 'ms': 30},
+    {'name': 'image_proxy', 'params': {'url': IMAGE_URL, 'size': 'thumb', 'format': 'jpeg'},
+     'queries': 0, 'ms': 30},
+    {'name': 'receive_webhook_data', 'method': 'post', 'queries': 4, 'ms': 60,
+     'params': lambda run: {'url_main': f'https://hibid.com/lot/budget-received-{run}', 'item_name': 'Brass lamp',
+                            'current_bid': '$5', 'time_remaining': '2h 10m'}},
+    {'name': 'receive_webhook_data', 'label': 'unchanged hibid item', 'method': 'post', 'queries': 1, 'ms': 60,
+     'params': {'url_main': 'https://hibid.com/lot/seed-2', 'item_name': 'Seed lot 2', 'category': 'Furniture',
+                'estimate': '$100 - $200', 'auction_name': 'Seed auction 2', 'current_bid': '$20'}},
+    {'name': 'receive_webhook_data', 'label': 'sku', 'method': 'post', 'queries': 4, 'ms': 60,
+     'params': lambda run: {'sku': f'BUDGET-{run}', 'ebay_title': 'Oak dresser', 'quantity': 1}},
+    {'name': 'get_webhook_data', 'params': {'sku': 'SKU-7'}, 'queries': 1, 'ms': 30},
+    {'name': 'get_hibid_items', 'queries': 1, 'ms': 150},
+    {'name': 'get_hibid_items', 'label': 'sparse fields', 'params': {'fields': 'id,item_title,current_bid'},
+     'queries': 1, 'ms': 60},
+    {'name': 'get_hibid_items', 'label': 'streamed', 'params': {'stream': 'true'}, 'queries': 1, 'ms': 150},
+    {'name': 'get_archived_items', 'params': {'kind': 'hibid'}, 'queries': 1, 'ms': 60},
+    {'name': 'get_archived_items', 'label': 'webhook', 'params': {'kind': 'webhook', 'q': 'dresser'},
+     'queries': 1, 'ms': 60},
+    {'name': 'get_comparables', 'params': {'q': 'oak dresser brass'}, 'queries': 0, 'ms': 60},
+    {'name': 'get_comparables', 'label': 'hibid item',
+     'params': lambda run: {'hibid_item_id': HiBidItem.objects.values_list('id', flat=True).first()},
+     'queries': 2, 'ms': 60},
+    {'name': 'get_prefetch_status',
+     'params': lambda run: {'item_id': HiBidItem.objects.values_list('id', flat=True).first()},
+     'queries': 3, 'ms': 30},
+    {'name': 'get_outbound_calls', 'admin': True, 'queries': 4, 'ms': 60},
+    {'name': 'replay_outbound_calls', 'method': 'post', 'admin': True, 'params': {'all': True},
+     'queries': 4, 'ms': 60},
+    {'name': 'metrics', 'queries': 0, 'ms': 60},
+    {'name': 'list_profiles', 'admin': True, 'queries': 2, 'ms': 30},
+    {'name': 'download_profile', 'admin': True, 'kwargs': lambda test: {'profile_id': test.profile_id},
+     'queries': 2, 'ms': 30},
+]
+
+_literal = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_in_list = re.compile(r'IN \((?:\?, )*\?\)')
+# Django names savepoints after the thread id, which differs between runs
+_savepoint = re.compile(r'"s\d+_x\d+"')
+
+
+def normalize(sql):
+    """SQL with literals replaced by ? and IN lists collapsed, so runs with different ids compare equal"""
+    return _in_list.sub('IN (...)', _literal.sub('?', _savepoint.sub('"savepoint"', sql)))
+
+
+class FakeN8NResponse:
+    status_code = 200
+    text = '{"status": "received"}'
+    headers = {'Content-Type': 'application/json'}
+
+    def json(self):
+        return {'status': 'received'}
+
+
+@override_settings(
+    ADMISSION_CONTROL_ENABLED=False,
+    PREFETCH_ENABLED=False,
+    PROFILING_SAMPLE_RATE=0,
+    METRICS_TOKEN='',
+    WEBHOOK_INGEST_MODE='sync',
+    DATABASE_REPLICA_VIEWS=[],
+)
+class EndpointBudgetTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.media_root = tempfile.mkdtemp(prefix='budget-media-')
+        cls.media_settings = override_settings(
+            MEDIA_ROOT=cls.media_root,
+            IMAGE_CACHE_DIR=os.path.join(cls.media_root, 'image_cache'),
+            COMPARABLES_INDEX_PATH=os.path.join(cls.media_root, 'comparables.npz'),
+            PROFILING_DIR=os.path.join(cls.media_root, 'profiles'),
+        )
+        cls.media_settings.enable()
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls.media_settings.disable()
+        shutil.rmtree(cls.media_root, ignore_errors=True)
+
+    @classmethod
+    def setUpTestData(cls):
+        now = timezone.now()
+        # Archived rows first: archiving moves every row older than the cutoff
+        HiBidItem.objects.bulk_create([cls.hibid_item(f'old-{i}') for i in range(SEED['archived_hibid_items'])])
+        WebhookData.objects.bulk_create([cls.webhook_data(f'OLD-{i}') for i in range(SEED['archived_webhook_data'])])
+        for target in archive.TARGETS.values():
+            while archive.archive_batch(target, now + timedelta(days=1), archive.TableSink()):
+                pass
+
+        HiBidItem.objects.bulk_create([cls.hibid_item(f'seed-{i}') for i in range(SEED['hibid_items'])])
+        WebhookData.objects.bulk_create([cls.webhook_data(f'SKU-{i}') for i in range(SEED['webhook_data'])])
+        hibid_ids = list(HiBidItem.objects.values_list('id', flat=True))
+        AuctionItem.objects.bulk_create([
+            AuctionItem(sku=f'AUC-{i}', auction_name='Spring estate', item_name=f'Walnut desk {i}', lot_number=str(i),
+                        description='Walnut writing desk with three drawers', category='Furniture',
+                        ai_estimate='$150 - $300', hibid_item_id=hibid_ids[i])
+            for i in range(SEED['auction_items'])
+        ])
+        ImagePrefetch.objects.bulk_create([
+            ImagePrefetch(hibid_item_id=item_id, url=f'https://cdn.hibid.com/{item_id}/{n}.jpg', status='done', size=1000)
+            for item_id in hibid_ids[:50] for n in range(SEED['prefetches_per_item'])
+        ])
+        OutboundCall.objects.bulk_create([
+            OutboundCall(webhook='url_processing', webhook_url='https://n8n.example/webhook',
+                         payload={'url_main': f'https://hibid.com/lot/dead-{i}'},
+                         state='dead' if i % 4 == 0 else 'succeeded', attempts=8)
+            for i in range(SEED['outbound_calls'])
+        ])
+        BulkImport.objects.bulk_create([
+            BulkImport(source=f'upload-{i}.csv', urls=[f'https://hibid.com/lot/b{i}-{n}' for n in range(500)], total=500)
+            for i in range(SEED['bulk_imports'])
+        ])
+        cls.admin = get_user_model().objects.create_superuser('budget-admin', 'admin@example.com', 'password')
+
+    @staticmethod
+    def hibid_item(key):
+        return HiBidItem(
+            url_main=f'https://hibid.com/lot/{key}', item_title=f'Seed lot {key.rsplit("-", 1)[-1]}',
+            item_name=f'Seed lot {key.rsplit("-", 1)[-1]}', lot_number=key,
+            description='Oak dresser with brass pulls and a beveled mirror, light wear. ' * 4,
+            category='Furniture', estimate='$100 - $200', auction_name=f'Seed auction {key.rsplit("-", 1)[-1]}',
+            current_bid='$20', bid_count=3, time_remaining='', status='processed',
+            all_unique_image_urls=[f'https://cdn.hibid.com/{key}/{n}.jpg' for n in range(6)],
+            main_image_url=f'https://cdn.hibid.com/{key}/0.jpg',
+            raw_data={'url_main': f'https://hibid.com/lot/{key}', 'item_name': 'Seed lot'},
+        )
+
+    @staticmethod
+    def webhook_data(sku):
+        return WebhookData(sku=sku, ebay_title='Oak dresser with mirror', ebay_description='Solid oak dresser',
+                           ai_improved_estimate='$150', raw_data={'sku': sku})
+
+    def setUp(self):
+        comparables._index = comparables.load_index()
+        self.photo = photo_store.store_chunks([b'\xff\xd8\xff' + b'budget photo'])
+        original = image_cache.original_path(IMAGE_URL)
+        original.parent.mkdir(parents=True, exist_ok=True)
+        buffer = io.BytesIO()
+        Image.new('RGB', (800, 600), 'navy').save(buffer, 'JPEG')
+        original.write_bytes(buffer.getvalue())
+        self.profile_id = profiles.add({
+            'view': 'get_hibid_items', 'method': 'GET', 'path': '/api/get-hibid-items/', 'status_code': 200,
+            'duration_ms': 1.0, 'started_at': time.time(), 'sql': [], 'sql_time_ms': 0.0,
+            'report': '', 'pstats': b'',
+        })
+        patcher = mock.patch('requests.post', return_value=FakeN8NResponse())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def request(self, budget, run):
+        params = budget.get('params', {})
+        if callable(params):
+            params = params(run)
+        kwargs = budget.get('kwargs')
+        path = reverse(budget['name'], kwargs=kwargs(self) if kwargs else None)
+        if budget.get('method', 'get') == 'get':
+            response = self.client.get(path, params)
+        elif budget.get('multipart'):
+            response = self.client.post(path, params)
+        else:
+            response = self.client.post(path, params, content_type='application/json')
+        if response.streaming:
+            b''.join(response.streaming_content)
+        return response
+
+    def measure(self, budget):
+        """(queries of the first measured run, median latency in ms) after one warm-up run"""
+        if budget.get('admin'):
+            self.client.force_login(self.admin)
+        else:
+            self.client.logout()
+        self.request(budget, run=0)
+        timings = []
+        captured = None
+        for run in range(1, RUNS + 1):
+            with CaptureQueriesContext(connection) as queries:
+                start = time.perf_counter()
+                response = self.request(budget, run)
+                timings.append((time.perf_counter() - start) * 1000)
+            expected = budget.get('status', 200)
+            self.assertEqual(response.status_code, expected,
+                             f"{budget['name']} returned {response.status_code}, not {expected}")
+            if captured is None:
+                captured = [normalize(query['sql']) for query in queries.captured_queries]
+        return captured, statistics.median(timings)
+
+    def snapshot_path(self, budget):
+        label = budget.get('label', '').replace(' ', '_')
+        return SNAPSHOT_DIR / (f"{budget['name']}--{label}.sql" if label else f"{budget['name']}.sql")
+
+    def sql_report(self, budget, statements):
+        path = self.snapshot_path(budget)
+        expected = path.read_text().splitlines() if path.exists() else []
+        diff = difflib.unified_diff(expected, statements, fromfile=f'{path.name} (snapshot)',
+                                    tofile='executed', lineterm='')
+        repeated = [f'  {count}x {sql}' for sql, count in Counter(statements).most_common() if count > 1]
+        return '\n'.join(
+            ['SQL diff:', *diff]
+            + (['Repeated statements:', *repeated] if repeated else [])
+        )
+
+    def test_every_route_has_a_budget(self):
+        budgeted = {budget['name'] for budget in BUDGETS}
+        missing = [pattern.name for pattern in urls.urlpatterns if pattern.name not in budgeted]
+        self.assertEqual(missing, [], 'Add query/latency budgets to BUDGETS for these routes')
+
+    def test_endpoint_budgets(self):
+        for budget in BUDGETS:
+            label = f"{budget['name']} ({budget['label']})" if 'label' in budget else budget['name']
+            with self.subTest(label):
+                statements, median_ms = self.measure(budget)
+                if UPDATE_SNAPSHOTS:
+                    SNAPSHOT_DIR.mkdir(exist_ok=True)
+                    self.snapshot_path(budget).write_text('\n'.join(statements) + '\n' if statements else '')
+                    print(f'{label}: {len(statements)} queries, {median_ms:.1f} ms')
+                    continue
+                if len(statements) > budget['queries']:
+                    self.fail(f"{label}: {len(statements)} queries, budget {budget['queries']}\n"
+                              + self.sql_report(budget, statements))
+                max_ms = budget['ms'] * LATENCY_FACTOR
+                if median_ms > max_ms:
+                    self.fail(f'{label}: median {median_ms:.1f} ms over {RUNS} runs, budget {max_ms:.0f} ms')
@@ -0,0 +1,61 @@
+"""
+Bulk imports keep the URLs whose send failed and send them again when the
+import is resumed, instead of moving the cursor past them for good.
+"""
+
+from unittest import mock
+
+from django.test import TestCase, override_settings
+
+from api import bulk_import
+from api.models import BulkImport, HiBidItem
+
+URLS = [f'https://hibid.com/lot/{i}' for i in range(10)]
+
+
+@override_settings(BULK_IMPORT_WORKERS=2, BULK_IMPORT_CHECKPOINT_EVERY=3)
+class BulkImportRetryTests(TestCase):
+
+    def setUp(self):
+        self.sent = []
+        self.failing = {URLS[2], URLS[7]}
+
+    def send(self, url, timeout=30):
+        self.sent.append(url)
+        return 'failed' if url in self.failing else 'dispatched'
+
+    def run_import(self, job):
+        self.assertTrue(bulk_import.claim(job.id))
+        with mock.patch.object(bulk_import, 'send', self.send):
+            return bulk_import.run(BulkImport.objects.get(id=job.id))
+
+    def test_failed_urls_are_sent_again_on_resume(self):
+        job = bulk_import.create('\n'.join(URLS))
+
+        job = self.run_import(job)
+        self.assertEqual(job.state, 'failed')
+        self.assertEqual(job.cursor, len(URLS))
+        self.assertEqual(job.failed_count, 2)
+        self.assertEqual(job.dispatched_count, 8)
+        self.assertEqual(BulkImport.objects.get(id=job.id).failed_urls, [URLS[2], URLS[7]])
+        self.assertIn(job.id, bulk_import.resumable())
+
+        # One of them went through in the meantime, the other now sends
+        HiBidItem.objects.create(url_main=URLS[7], item_name='Imported meanwhile')
+        self.failing.clear()
+        self.sent.clear()
+        job = self.run_import(job)
+        self.assertEqual(self.sent, [URLS[2]])
+        self.assertEqual(job.state, 'completed')
+        self.assertEqual(job.failed_urls, [])
+        self.assertEqual((job.failed_count, job.dispatched_count, job.existing_count), (0, 9, 1))
+        self.assertNotIn(job.id, bulk_import.resumable())
+
+    def test_url_failing_again_stays_failed(self):
+        job = self.run_import(bulk_import.create('\n'.join(URLS)))
+        self.sent.clear()
+        job = self.run_import(job)
+        self.assertEqual(sorted(self.sent), sorted(self.failing))
+        self.assertEqual(job.state, 'failed')
+        self.assertEqual(job.failed_count, 2)
+        self.assertEqual(sorted(BulkImport.objects.get(id=job.id).failed_urls), sorted(self.failing))
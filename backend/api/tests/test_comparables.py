@@ -0,0 +1,124 @@
+"""
+get-comparables while the index is loading: requests are answered with 503
+instead of waiting for the background build, and malformed ids with 400.
+Refreshes pick up edited items and drop deleted (archived) ones.
+"""
+
+import shutil
+import tempfile
+import threading
+import time
+from pathlib import Path
+from unittest import mock
+
+from django.conf import settings
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from api import comparables
+from api.models import AuctionItem, HiBidItem
+
+
+def ready_index():
+    index = comparables.ComparablesIndex(settings.COMPARABLES_SIGNATURE_SIZE)
+    index.add([comparables._hibid_doc({
+        'id': 1, 'item_title': 'Oak dresser with brass pulls', 'item_name': '', 'category': 'Furniture',
+        'description': 'Oak dresser with a beveled mirror', 'estimate': '$100 - $200', 'current_bid': '$20',
+    })])
+    index.refreshed_at = time.monotonic()
+    return index
+
+
+@override_settings(ADMISSION_CONTROL_ENABLED=False, PROFILING_SAMPLE_RATE=0, COMPARABLES_REFRESH_SECONDS=3600)
+class ComparablesLoadingTests(TestCase):
+
+    def setUp(self):
+        comparables._index = None
+        self.addCleanup(setattr, comparables, '_index', None)
+
+    def test_answers_503_until_the_index_is_loaded(self):
+        release = threading.Event()
+
+        def slow_update(index):
+            release.wait(5)
+            comparables._index = ready_index()
+            comparables._updater = None
+
+        with mock.patch.object(comparables, '_update', slow_update):
+            response = self.client.get(reverse('get_comparables'), {'q': 'oak dresser'})
+            self.assertEqual(response.status_code, 503)
+            self.assertEqual(response['Retry-After'], '5')
+            updater = comparables._updater
+            # A second request doesn't start another build
+            self.client.get(reverse('get_comparables'), {'q': 'oak dresser'})
+            self.assertIs(comparables._updater, updater)
+            release.set()
+            updater.join()
+
+        response = self.client.get(reverse('get_comparables'), {'q': 'oak dresser'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([item['id'] for item in response.json()['comparables']], [1])
+
+    def test_non_numeric_ids_are_rejected(self):
+        for name in ('hibid_item_id', 'auction_item_id'):
+            response = self.client.get(reverse('get_comparables'), {name: 'abc'})
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.json()['error'], f'{name} must be an integer')
+
+
+@override_settings(COMPARABLES_RECONCILE_SECONDS=3600)
+class ComparablesRefreshTests(TestCase):
+
+    def setUp(self):
+        self.index = comparables.ComparablesIndex(settings.COMPARABLES_SIGNATURE_SIZE)
+
+    def hibid_item(self, title, **fields):
+        return HiBidItem.objects.create(url_main=f'https://hibid.com/lot/{title.replace(" ", "-")}',
+                                        item_title=title, category='Furniture', estimate='$100', **fields)
+
+    def top_ids(self, query):
+        return [(kind, item_id) for kind, item_id, _, _ in
+                self.index.query(comparables.tokens(query), k=3)]
+
+    def test_edited_items_are_picked_up(self):
+        item = self.hibid_item('Oak dresser with mirror')
+        auction = AuctionItem.objects.create(sku='AI-1', auction_name='Spring', item_name='Brass floor lamp',
+                                             lot_number='1', category='Lighting')
+        self.assertEqual(self.index.refresh(), 2)
+        self.assertEqual(self.index.refresh(), 0)
+
+        item.item_title = 'Walnut rolltop desk'
+        item.save()
+        auction.item_name = 'Cast iron garden bench'
+        auction.save()
+        self.assertEqual(self.index.refresh(), 2)
+        self.assertEqual(self.index.count, 2)
+        self.assertEqual(self.top_ids('walnut rolltop desk')[0], ('hibid', item.id))
+        self.assertEqual(self.top_ids('cast iron garden bench')[0], ('auction', auction.id))
+
+    @override_settings(COMPARABLES_RECONCILE_SECONDS=0)
+    def test_deleted_items_are_dropped(self):
+        items = [self.hibid_item(title) for title in
+                 ('Oak dresser with mirror', 'Walnut rolltop desk', 'Brass floor lamp')]
+        self.index.refresh()
+        items[0].delete()
+        self.index.refresh()
+        self.assertEqual(self.index.count, 2)
+        self.assertNotIn(('hibid', items[0].id), self.index.positions)
+        # The row moved into the freed slot is still found under its own id
+        self.assertEqual(self.top_ids('brass floor lamp')[0], ('hibid', items[2].id))
+        self.assertEqual(self.top_ids('walnut rolltop desk')[0], ('hibid', items[1].id))
+
+    def test_saved_index_keeps_watermarks_and_is_reconciled_on_load(self):
+        directory = tempfile.mkdtemp(prefix='comparables-')
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        path = Path(directory) / 'comparables.npz'
+        kept, archived = self.hibid_item('Oak dresser with mirror'), self.hibid_item('Brass floor lamp')
+        self.index.refresh()
+        self.index.save(path)
+
+        archived.delete()
+        loaded = comparables.ComparablesIndex.load(path, settings.COMPARABLES_SIGNATURE_SIZE)
+        self.assertEqual(loaded.hibid_updated_at, self.index.hibid_updated_at)
+        self.assertEqual(loaded.refresh(), 0)
+        self.assertEqual(list(loaded.positions), [('hibid', kept.id)])
@@ -0,0 +1,89 @@
+"""
+Read-replica routing: GETs of the list views read from a replica, everything
+else and every write uses the primary, and after a write the pin cookie sends
+the client's reads to the primary until it expires.
+"""
+
+import time
+from unittest import mock
+
+from django.http import HttpResponse
+from django.test import SimpleTestCase, override_settings
+from django.test.client import RequestFactory
+from django.urls import resolve, reverse
+
+from api import db_router
+from api.models import HiBidItem
+
+router = db_router.PrimaryReplicaRouter()
+
+
+@override_settings(DATABASE_REPLICA_VIEWS=['get_hibid_items'], DATABASE_REPLICA_PIN_SECONDS=5)
+class ReplicaRoutingTests(SimpleTestCase):
+
+    def setUp(self):
+        patcher = mock.patch.object(db_router, 'replica_aliases', return_value=['replica'])
+        self.replicas = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.factory = RequestFactory()
+
+    def handle(self, name, method='get', cookie=None, write=False):
+        """Run a request through the middleware; returns (databases read from, response)"""
+        path = reverse(name)
+        request = getattr(self.factory, method)(path)
+        if cookie is not None:
+            request.COOKIES[db_router.PIN_COOKIE] = cookie
+        request.resolver_match = resolve(path)
+        reads = []
+
+        def view(request):
+            middleware.process_view(request, None, (), {})
+            reads.append(router.db_for_read(HiBidItem))
+            if write:
+                self.assertEqual(router.db_for_write(HiBidItem), 'default')
+                reads.append(router.db_for_read(HiBidItem))
+            return HttpResponse()
+
+        middleware = db_router.ReplicaRoutingMiddleware(view)
+        return reads, middleware(request)
+
+    def test_list_view_reads_from_a_replica(self):
+        reads, response = self.handle('get_hibid_items')
+        self.assertEqual(reads, ['replica'])
+        self.assertNotIn(db_router.PIN_COOKIE, response.cookies)
+
+    def test_other_views_and_methods_use_the_primary(self):
+        self.assertEqual(self.handle('get_webhook_data')[0], ['default'])
+        self.assertEqual(self.handle('get_hibid_items', method='post')[0], ['default'])
+
+    def test_write_pins_the_rest_of_the_request_and_the_client(self):
+        reads, response = self.handle('get_hibid_items', write=True)
+        self.assertEqual(reads, ['replica', 'default'])
+        cookie = response.cookies[db_router.PIN_COOKIE]
+        self.assertEqual(cookie['max-age'], 5)
+        self.assertTrue(cookie['httponly'])
+        self.assertAlmostEqual(float(cookie.value), time.time() + 5, delta=2)
+
+        # The client's next read sees its own write
+        self.assertEqual(self.handle('get_hibid_items', cookie=cookie.value)[0], ['default'])
+
+    def test_expired_or_malformed_pin_reads_from_a_replica(self):
+        for cookie in (str(time.time() - 1), 'not-a-time'):
+            self.assertEqual(self.handle('get_hibid_items', cookie=cookie)[0], ['replica'])
+
+    def test_routing_state_ends_with_the_request(self):
+        wrote = db_router._wrote.get()
+        self.handle('get_hibid_items', write=True)
+        self.assertEqual(router.db_for_read(HiBidItem), 'default')
+        self.assertFalse(db_router._use_replica.get())
+        self.assertEqual(db_router._wrote.get(), wrote)
+
+    def test_without_replicas_nothing_changes(self):
+        self.replicas.return_value = []
+        reads, response = self.handle('get_hibid_items', write=True)
+        self.assertEqual(reads, ['default', 'default'])
+        self.assertNotIn(db_router.PIN_COOKIE, response.cookies)
+
+    def test_only_the_primary_is_migrated(self):
+        self.assertTrue(router.allow_migrate('default', 'api'))
+        self.assertFalse(router.allow_migrate('replica', 'api'))
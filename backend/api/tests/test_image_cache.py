@@ -0,0 +1,181 @@
+"""
+Image proxy cache against a local HTTP stub: one download per URL under
+concurrency, redirects only to allowed hosts, and undecodable or oversized
+images answered with 4xx instead of a server error.
+"""
+
+import io
+import shutil
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from api import image_cache
+
+
+def jpeg_bytes(size=(400, 300)):
+    buffer = io.BytesIO()
+    Image.new('RGB', size, 'darkgreen').save(buffer, 'JPEG')
+    return buffer.getvalue()
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    hits = {}
+    hits_lock = threading.Lock()
+
+    def do_GET(self):
+        with self.hits_lock:
+            self.hits[self.path] = self.hits.get(self.path, 0) + 1
+        if self.path == '/flaky.jpg' and self.hits[self.path] == 1:
+            time.sleep(0.3)
+            self.send_response(500)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+        elif self.path.startswith(('/slow.jpg', '/flaky.jpg')):
+            time.sleep(0.3)
+            self.send_image()
+        elif self.path.startswith('/image.jpg'):
+            self.send_image()
+        elif self.path == '/redirect-allowed':
+            self.send_redirect('/image.jpg?via=redirect')
+        elif self.path == '/redirect-away':
+            # localhost is the same stub, but not on the allowlist
+            self.send_redirect(f'http://localhost:{self.server.server_port}/image.jpg?via=away')
+        elif self.path == '/redirect-loop':
+            self.send_redirect('/redirect-loop')
+        else:
+            self.send_response(404)
+            self.end_headers()
+
+    def send_image(self):
+        body = jpeg_bytes()
+        self.send_response(200)
+        self.send_header('Content-Type', 'image/jpeg')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_redirect(self, location):
+        self.send_response(302)
+        self.send_header('Location', location)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+@override_settings(
+    ADMISSION_CONTROL_ENABLED=False,
+    IMAGE_PROXY_ALLOWED_HOSTS=['127.0.0.1'],
+    IMAGE_PROXY_FETCH_TIMEOUT=5,
+)
+class ImageCacheTests(SimpleTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+        cls.server_thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.server_thread.start()
+        cls.base_url = f'http://127.0.0.1:{cls.server.server_port}'
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp(prefix='image-cache-')
+        self.addCleanup(shutil.rmtree, self.cache_dir, ignore_errors=True)
+        cache_settings = override_settings(IMAGE_CACHE_DIR=self.cache_dir)
+        cache_settings.enable()
+        self.addCleanup(cache_settings.disable)
+        StubHandler.hits.clear()
+
+    def test_concurrent_callers_share_one_download(self):
+        url = f'{self.base_url}/slow.jpg'
+        barrier = threading.Barrier(8)
+        results = []
+
+        def fetch():
+            barrier.wait()
+            results.append(image_cache.fetch_original(url))
+
+        threads = [threading.Thread(target=fetch) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(StubHandler.hits['/slow.jpg'], 1)
+        self.assertEqual(sum(downloaded for _, downloaded in results), 1)
+        self.assertEqual(image_cache._fetch_locks, {})
+
+    def test_late_caller_waits_for_retry_after_failed_download(self):
+        # The first download fails while two callers wait; one of them retries,
+        # and a caller arriving during that retry must wait for it too
+        url = f'{self.base_url}/flaky.jpg'
+        errors = []
+
+        def fetch(delay):
+            time.sleep(delay)
+            try:
+                image_cache.fetch_original(url)
+            except image_cache.ImageFetchError as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=fetch, args=(delay,)) for delay in (0, 0.1, 0.1, 0.45)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(errors), 1)
+        self.assertEqual(StubHandler.hits['/flaky.jpg'], 2)
+        self.assertEqual(image_cache._fetch_locks, {})
+
+    def test_redirect_to_allowed_host_is_followed(self):
+        path, downloaded = image_cache.fetch_original(f'{self.base_url}/redirect-allowed')
+        self.assertTrue(downloaded)
+        self.assertEqual(StubHandler.hits['/image.jpg?via=redirect'], 1)
+        with Image.open(path) as image:
+            self.assertEqual(image.size, (400, 300))
+
+    def test_redirect_to_other_host_is_refused(self):
+        with self.assertRaisesMessage(image_cache.ImageFetchError, 'not allowed'):
+            image_cache.fetch_original(f'{self.base_url}/redirect-away')
+        self.assertNotIn('/image.jpg?via=away', StubHandler.hits)
+        self.assertFalse(image_cache.original_path(f'{self.base_url}/redirect-away').exists())
+
+    def test_redirect_loop_is_cut_off(self):
+        with self.assertRaisesMessage(image_cache.ImageFetchError, 'redirects'):
+            image_cache.fetch_original(f'{self.base_url}/redirect-loop')
+        self.assertEqual(StubHandler.hits['/redirect-loop'], image_cache.MAX_REDIRECTS + 1)
+
+    def test_proxy_serves_thumbnail(self):
+        response = self.client.get(reverse('image_proxy'), {
+            'url': f'{self.base_url}/image.jpg', 'size': 'thumb', 'format': 'jpeg',
+        })
+        self.assertEqual(response.status_code, 200)
+        with Image.open(io.BytesIO(b''.join(response.streaming_content))) as image:
+            self.assertEqual(max(image.size), image_cache.THUMBNAIL_SIZES['thumb'])
+
+    def test_proxy_refuses_redirect_off_allowlist(self):
+        response = self.client.get(reverse('image_proxy'), {'url': f'{self.base_url}/redirect-away'})
+        self.assertEqual(response.status_code, 502)
+
+    def test_decompression_bomb_is_a_client_error(self):
+        with mock.patch.object(Image, 'MAX_IMAGE_PIXELS', 1000):
+            response = self.client.get(reverse('image_proxy'), {
+                'url': f'{self.base_url}/image.jpg', 'format': 'jpeg',
+            })
+        self.assertEqual(response.status_code, 422)
+        self.assertIn('Could not decode image', response.json()['error'])
@@ -0,0 +1,258 @@
+"""
+Write-behind ingest buffer: payloads acked with 202 are applied exactly once
+across flusher crashes, transient database errors leave them buffered, and
+only payloads that can never be applied end up in the dead-letter table.
+
+The Redis buffer runs against FakeRedis, an in-memory stand-in for the
+stream and consumer-group commands it uses.
+"""
+
+import shutil
+import tempfile
+import time
+from unittest import mock
+
+from django.db import OperationalError
+from django.test import TestCase, override_settings
+
+from api import ingest, ingest_buffer
+from api.models import IngestDeadLetter, WebhookData
+
+
+def payload(n, **extra):
+    return {'sku': f'BUF-{n}', 'ebay_title': f'Buffered item {n}', **extra}
+
+
+def flaky_apply(fail_on):
+    """ingest.apply that raises 'database is locked' the first time it sees `fail_on`"""
+    real_apply = ingest.apply
+    seen = set()
+
+    def apply(data):
+        if data['sku'] == fail_on and fail_on not in seen:
+            seen.add(fail_on)
+            raise OperationalError('database is locked')
+        return real_apply(data)
+    return apply
+
+
+class FakeRedis:
+    """Streams with one consumer group, enough for RedisStreamBuffer"""
+
+    def __init__(self):
+        self.entries = {}  # id -> fields, in insertion order
+        self.last_delivered = (0, 0)
+        self.pending = {}  # id -> [consumer, delivered_at]
+        self.sequence = 0
+
+    @staticmethod
+    def _id(entry_id):
+        return entry_id.encode() if isinstance(entry_id, str) else entry_id
+
+    @staticmethod
+    def _key(entry_id):
+        ms, seq = entry_id.decode().split('-')
+        return int(ms), int(seq)
+
+    def xgroup_create(self, stream, group, id='0', mkstream=False):
+        pass
+
+    def xadd(self, stream, fields):
+        self.sequence += 1
+        entry_id = f'{self.sequence}-0'.encode()
+        self.entries[entry_id] = {key.encode(): value.encode() for key, value in fields.items()}
+        return entry_id
+
+    def xreadgroup(self, group, consumer, streams, count=None, block=None):
+        (stream, start), = streams.items()
+        if start == '0':
+            ids = [entry_id for entry_id, (owner, _) in self.pending.items() if owner == consumer][:count]
+            return [[stream.encode(), [(entry_id, self.entries.get(entry_id, {})) for entry_id in ids]]]
+        ids = [entry_id for entry_id in self.entries if self._key(entry_id) > self.last_delivered][:count]
+        if not ids:
+            return []
+        self.last_delivered = self._key(ids[-1])
+        for entry_id in ids:
+            self.pending[entry_id] = [consumer, time.monotonic()]
+        return [[stream.encode(), [(entry_id, self.entries[entry_id]) for entry_id in ids]]]
+
+    def xautoclaim(self, stream, group, consumer, min_idle_time, start_id='0-0', count=100):
+        now = time.monotonic()
+        claimed = []
+        for entry_id, delivery in list(self.pending.items()):
+            if len(claimed) < count and (now - delivery[1]) * 1000 >= min_idle_time:
+                self.pending[entry_id] = [consumer, now]
+                claimed.append((entry_id, self.entries.get(entry_id, {})))
+        return [b'0-0', claimed, []]
+
+    def xack(self, stream, group, *ids):
+        return sum(self.pending.pop(self._id(entry_id), None) is not None for entry_id in ids)
+
+    def xdel(self, stream, *ids):
+        return sum(self.entries.pop(self._id(entry_id), None) is not None for entry_id in ids)
+
+    def xlen(self, stream):
+        return len(self.entries)
+
+    def pipeline(self):
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    def __init__(self, client):
+        self.client = client
+        self.calls = []
+
+    def __getattr__(self, name):
+        return lambda *args: self.calls.append((name, args))
+
+    def execute(self):
+        return [getattr(self.client, name)(*args) for name, args in self.calls]
+
+
+@override_settings(PREFETCH_ENABLED=False)
+class FileBufferTests(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(prefix='ingest-buffer-')
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        self.buffer = ingest_buffer.FileBuffer(self.directory)
+
+    def restarted(self):
+        """A new flusher process on the same log, e.g. after a crash"""
+        return ingest_buffer.FileBuffer(self.directory)
+
+    def test_crash_before_commit_reapplies_from_the_committed_offset(self):
+        for n in range(5):
+            self.buffer.append(payload(n))
+        self.assertEqual(ingest_buffer.flush(self.buffer, batch_size=2), (2, 0))
+        committed = self.buffer._read_offset()
+
+        # Crash after reading the next batch but before committing it
+        self.assertEqual(len(self.buffer.read(2)), 2)
+        buffer = self.restarted()
+        self.assertEqual(buffer._read_offset(), committed)
+        self.assertEqual(ingest_buffer.flush(buffer, batch_size=10), (3, 0))
+        self.assertEqual(sorted(WebhookData.objects.values_list('sku', flat=True)),
+                         [f'BUF-{n}' for n in range(5)])
+
+    def test_log_is_compacted_once_fully_applied(self):
+        for n in range(3):
+            self.buffer.append(payload(n))
+        ingest_buffer.flush(self.buffer, batch_size=2)
+        self.assertGreater(self.buffer.log_path.stat().st_size, 0)
+        ingest_buffer.flush(self.buffer, batch_size=2)
+        self.assertEqual(self.buffer.log_path.stat().st_size, 0)
+        self.assertEqual(self.buffer._read_offset(), 0)
+        self.assertEqual(self.buffer.pending(), 0)
+
+        self.buffer.append(payload(3))
+        self.assertEqual(ingest_buffer.flush(self.restarted()), (1, 0))
+
+    def test_torn_last_line_waits_until_complete(self):
+        self.buffer.append(payload(0))
+        with open(self.buffer.log_path, 'a') as log:
+            log.write('{"id": "torn", "data": {"sku": "BUF-')
+        self.assertEqual(ingest_buffer.flush(self.buffer), (1, 0))
+        self.assertEqual(self.buffer.pending(), len('{"id": "torn", "data": {"sku": "BUF-'))
+        self.assertFalse(IngestDeadLetter.objects.exists())
+
+    def test_transient_error_leaves_the_record_buffered(self):
+        for n in range(3):
+            self.buffer.append(payload(n))
+        with mock.patch.object(ingest, 'apply', flaky_apply('BUF-1')):
+            with self.assertRaises(OperationalError):
+                ingest_buffer.flush(self.buffer)
+            self.assertEqual(list(WebhookData.objects.values_list('sku', flat=True)), ['BUF-0'])
+            self.assertEqual(ingest_buffer.flush(self.restarted()), (2, 0))
+        self.assertEqual(WebhookData.objects.count(), 3)
+        self.assertFalse(IngestDeadLetter.objects.exists())
+
+    def test_invalid_and_corrupt_records_are_dead_lettered(self):
+        self.buffer.append(payload(0))
+        self.buffer.append({'unknown': 'format'})
+        corrupt_at = self.buffer.log_path.stat().st_size
+        with open(self.buffer.log_path, 'a') as log:
+            log.write('not json\n')
+        self.buffer.append(payload(1, quantity='several'))
+        self.buffer.append(payload(2))
+
+        self.assertEqual(ingest_buffer.flush(self.buffer), (2, 3))
+        self.assertEqual(WebhookData.objects.count(), 2)
+        letters = {letter.record_id: letter for letter in IngestDeadLetter.objects.all()}
+        self.assertEqual(len(letters), 3)
+        self.assertEqual(letters[f'offset-{corrupt_at}'].raw, 'not json\n')
+        self.assertTrue(all(letter.backend == 'file' and letter.error for letter in letters.values()))
+        self.assertEqual(self.buffer.pending(), 0)
+
+
+@override_settings(PREFETCH_ENABLED=False)
+class RedisStreamBufferTests(TestCase):
+
+    def setUp(self):
+        self.redis = FakeRedis()
+        patcher = mock.patch('redis.Redis.from_url', return_value=self.redis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def buffer(self, consumer='flusher', claim_idle_seconds=300):
+        return ingest_buffer.RedisStreamBuffer('redis://fake', consumer, claim_idle_seconds)
+
+    def test_restarted_consumer_reapplies_its_unacked_entries(self):
+        buffer = self.buffer()
+        for n in range(3):
+            buffer.append(payload(n))
+        self.assertEqual(len(buffer.read(10)), 3)  # delivered, then the flusher dies
+
+        restarted = self.buffer()
+        self.assertEqual(ingest_buffer.flush(restarted), (3, 0))
+        self.assertEqual(self.redis.pending, {})
+        self.assertEqual(self.redis.xlen('api:ingest'), 0)
+        self.assertEqual(WebhookData.objects.count(), 3)
+
+    def test_idle_entries_of_another_consumer_are_claimed(self):
+        old = self.buffer(consumer='old-flusher')
+        for n in range(2):
+            old.append(payload(n))
+        old.read(10)
+
+        # Not idle long enough yet
+        buffer = self.buffer(claim_idle_seconds=300)
+        self.assertEqual(ingest_buffer.flush(buffer), (0, 0))
+
+        buffer = self.buffer(claim_idle_seconds=0)
+        self.assertEqual(ingest_buffer.flush(buffer), (2, 0))
+        self.assertEqual(self.redis.pending, {})
+        self.assertEqual(WebhookData.objects.count(), 2)
+
+    def test_entries_deleted_meanwhile_are_acknowledged(self):
+        buffer = self.buffer()
+        entry_id = buffer.append(payload(0))
+        buffer.read(10)
+        self.redis.xdel('api:ingest', entry_id.encode())
+
+        restarted = self.buffer()
+        self.assertEqual(ingest_buffer.flush(restarted), (0, 0))
+        self.assertEqual(self.redis.pending, {})
+
+    def test_transient_error_leaves_the_entry_pending(self):
+        buffer = self.buffer()
+        for n in range(3):
+            buffer.append(payload(n))
+        with mock.patch.object(ingest, 'apply', flaky_apply('BUF-1')):
+            with self.assertRaises(OperationalError):
+                ingest_buffer.flush(buffer)
+            self.assertEqual(len(self.redis.pending), 2)
+            self.assertEqual(self.redis.xlen('api:ingest'), 2)
+            self.assertEqual(ingest_buffer.flush(buffer), (2, 0))
+        self.assertEqual(self.redis.pending, {})
+        self.assertEqual(WebhookData.objects.count(), 3)
+
+    def test_invalid_entry_is_dead_lettered_and_acknowledged(self):
+        buffer = self.buffer()
+        buffer.append({'unknown': 'format'})
+        buffer.append(payload(0))
+        self.assertEqual(ingest_buffer.flush(buffer), (1, 1))
+        letter = IngestDeadLetter.objects.get()
+        self.assertEqual((letter.backend, letter.data), ('redis', {'unknown': 'format'}))
+        self.assertEqual(self.redis.xlen('api:ingest'), 0)
@@ -0,0 +1,99 @@
+"""
+Request metrics: the execute_wrapper counts every query a request runs, and
+/api/metrics/ renders the counters in the Prometheus text format.
+"""
+
+from unittest import mock
+
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from api.metrics import LATENCY_BUCKETS, Registry
+from api.middleware import QueryStats
+from api.models import HiBidItem
+
+
+def sample(text, series):
+    """The value of one series in rendered metrics text"""
+    for line in text.splitlines():
+        name, _, value = line.rpartition(' ')
+        if name == series:
+            return float(value)
+    raise AssertionError(f'{series} not in metrics output')
+
+
+@override_settings(REDIS_URL='', METRICS_TOKEN='', ADMISSION_CONTROL_ENABLED=False, PROFILING_SAMPLE_RATE=0)
+class MetricsTests(TestCase):
+
+    def setUp(self):
+        self.registry = Registry()
+        for target in ('api.middleware.registry', 'api.views.registry'):
+            patcher = mock.patch(target, self.registry)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_query_stats_counts_every_statement(self):
+        stats = QueryStats()
+        with connection.execute_wrapper(stats):
+            HiBidItem.objects.count()
+            list(HiBidItem.objects.all())
+            HiBidItem.objects.create(url_main='https://hibid.com/lot/metrics-1', item_name='Oak dresser')
+        self.assertEqual(stats.count, 3)
+        self.assertGreater(stats.seconds, 0)
+
+    def test_request_query_count_matches_the_queries_run(self):
+        HiBidItem.objects.create(url_main='https://hibid.com/lot/metrics-2', item_name='Oak dresser',
+                                 status='processed')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('get_hibid_items'))
+        self.assertEqual(response.status_code, 200)
+        # Read before the next request resets connection.queries
+        executed = len(queries)
+        self.assertGreater(executed, 0)
+
+        text = self.client.get(reverse('metrics')).content.decode()
+        labels = '{view="get_hibid_items"}'
+        self.assertEqual(sample(text, f'api_request_db_queries_sum{labels}'), executed)
+        self.assertEqual(sample(text, f'api_request_db_queries_count{labels}'), 1)
+        self.assertEqual(sample(text, 'api_requests_total{view="get_hibid_items",method="GET",status="200"}'), 1)
+        # Scrapes of the metrics endpoint itself aren't recorded
+        self.assertNotIn('view="metrics"', text)
+
+    def test_prometheus_text_format(self):
+        self.registry.inc('n8n_requests_total', {'webhook': 'photography', 'status': 200})
+        self.registry.inc('n8n_requests_total', {'webhook': 'photography', 'status': 200})
+        self.registry.observe('api_request_duration_seconds', {'view': 'call_webhook'}, 0.3)
+        self.registry.observe('api_request_duration_seconds', {'view': 'call_webhook'}, 4.0)
+        self.registry.register_collector(
+            lambda: [('outbound_calls_dead', 'gauge', 'Dead-letter outbound calls', [({}, 3)])]
+        )
+
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response['Content-Type'], 'text/plain; version=0.0.4; charset=utf-8')
+        lines = response.content.decode().splitlines()
+        histogram = [
+            f'api_request_duration_seconds_bucket{{view="call_webhook",le="{bound!r}"}} {1 if bound < 4 else 2}'
+            for bound in LATENCY_BUCKETS if bound >= 0.3
+        ]
+        self.assertEqual(lines, [
+            '# HELP api_request_duration_seconds API request latency by view',
+            '# TYPE api_request_duration_seconds histogram',
+            *histogram,
+            'api_request_duration_seconds_bucket{view="call_webhook",le="+Inf"} 2',
+            'api_request_duration_seconds_count{view="call_webhook"} 2',
+            'api_request_duration_seconds_sum{view="call_webhook"} 4.3',
+            '# HELP n8n_requests_total Outbound n8n webhook calls by webhook and status code',
+            '# TYPE n8n_requests_total counter',
+            'n8n_requests_total{webhook="photography",status="200"} 2',
+            '# HELP outbound_calls_dead Dead-letter outbound calls',
+            '# TYPE outbound_calls_dead gauge',
+            'outbound_calls_dead 3',
+        ])
+
+    @override_settings(METRICS_TOKEN='scrape-secret')
+    def test_token_is_required_when_configured(self):
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 403)
+        response = self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer scrape-secret')
+        self.assertEqual(response.status_code, 200)
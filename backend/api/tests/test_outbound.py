@@ -0,0 +1,252 @@
+"""
+Outbound n8n calls: a URL submitted again while its call is queued, in
+flight, or accepted by n8n but not yet stored attaches to that call instead
+of being sent twice, including when two submissions race to insert it.
+Failed calls are retried with backoff until they are dead-lettered, and
+the scheduler recovers abandoned calls and replays dead ones.
+"""
+
+from datetime import timedelta
+from unittest import mock
+
+from django.db import IntegrityError, transaction
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from api import outbound
+from api.models import HiBidItem, OutboundCall
+
+URL = 'https://hibid.com/lot/4242'
+KEY = outbound.dedupe_key_for('url_processing', outbound.normalize_url(URL))
+
+
+class FakeN8NResponse:
+    headers = {'Content-Type': 'application/json'}
+
+    def __init__(self, status_code=200):
+        self.status_code = status_code
+        self.text = '{"status": "received"}'
+
+
+@override_settings(URL_DEDUPE_WINDOW_SECONDS=21600, OUTBOUND_SINGLE_FLIGHT_WINDOW_SECONDS=900)
+class SingleFlightTests(TestCase):
+
+    def setUp(self):
+        patcher = mock.patch('requests.post', return_value=FakeN8NResponse())
+        self.post = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def submit(self, url=URL):
+        response = self.client.post(reverse('call_webhook'), {'url_main': url}, content_type='application/json')
+        self.assertIn(response.status_code, (200, 202))
+        return response.json()
+
+    def store_item(self, **fields):
+        return HiBidItem.objects.create(url_main=URL, item_name='Oak dresser', status='processed', **fields)
+
+    def test_resubmission_attaches_to_a_pending_call(self):
+        self.post.return_value = FakeN8NResponse(503)
+        first = self.submit()
+        self.assertEqual(OutboundCall.objects.get().state, 'pending')
+
+        second = self.submit(URL + '/')
+        self.assertTrue(second['deduplicated'])
+        self.assertEqual(second['status'], 'queued')
+        self.assertEqual(second['outbound_call_id'], first['outbound_call_id'])
+        self.assertEqual(self.post.call_count, 1)
+
+    def test_succeeded_call_counts_until_the_item_is_stored(self):
+        first = self.submit()
+        self.assertEqual(OutboundCall.objects.get().state, 'succeeded')
+
+        second = self.submit()
+        self.assertTrue(second['deduplicated'])
+        self.assertEqual(second['status'], 'processing')
+        self.assertEqual(second['outbound_call_id'], first['outbound_call_id'])
+        self.assertEqual(self.post.call_count, 1)
+
+        self.store_item()
+        self.assertEqual(self.submit()['status'], 'processed')
+        # Stored after the call succeeded, so a re-scrape past the item window sends again
+        with self.settings(URL_DEDUPE_WINDOW_SECONDS=0):
+            self.assertNotIn('deduplicated', self.submit())
+        self.assertEqual(self.post.call_count, 2)
+
+    def test_succeeded_call_older_than_the_window_is_sent_again(self):
+        self.submit()
+        OutboundCall.objects.update(updated_at=timezone.now() - timedelta(seconds=901))
+        self.assertNotIn('deduplicated', self.submit())
+        self.assertEqual(self.post.call_count, 2)
+
+        with self.settings(OUTBOUND_SINGLE_FLIGHT_WINDOW_SECONDS=0):
+            self.assertNotIn('deduplicated', self.submit())
+        self.assertEqual(self.post.call_count, 3)
+
+    def test_freshness_follows_the_last_update_not_creation(self):
+        item = self.store_item()
+        HiBidItem.objects.filter(id=item.id).update(processed_at=timezone.now() - timedelta(days=2))
+        response = self.submit()
+        self.assertEqual(response['status'], 'processed')
+        self.assertEqual(response['hibid_item']['id'], item.id)
+
+        HiBidItem.objects.filter(id=item.id).update(updated_at=timezone.now() - timedelta(days=1))
+        self.assertNotIn('deduplicated', self.submit())
+        self.assertEqual(self.post.call_count, 1)
+
+    def test_force_always_sends(self):
+        self.submit()
+        response = self.client.post(reverse('call_webhook'), {'url_main': URL, 'force': 'true'},
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.post.call_count, 2)
+
+
+class DedupeConstraintTests(TestCase):
+
+    def call(self, state, dedupe_key=KEY):
+        return OutboundCall.objects.create(webhook='url_processing', webhook_url='https://n8n.example/webhook',
+                                           payload={'url_main': URL}, dedupe_key=dedupe_key, state=state)
+
+    def test_one_active_call_per_key(self):
+        self.call('pending')
+        for state in ('pending', 'in_flight'):
+            with self.assertRaises(IntegrityError), transaction.atomic():
+                self.call(state)
+        # Finished calls and unkeyed calls don't hold the key
+        self.call('succeeded')
+        self.call('dead')
+        self.call('pending', dedupe_key='')
+        self.call('pending', dedupe_key='')
+
+    @mock.patch('requests.post', return_value=FakeN8NResponse())
+    def test_concurrent_insert_attaches_to_the_winner(self, post):
+        real_find_existing = outbound.find_existing
+        winner = []
+
+        def find_existing(dedupe_key, succeeded_since=None):
+            if not winner:
+                # The other submission inserts between our check and our insert
+                winner.append(self.call('in_flight'))
+                return None
+            return real_find_existing(dedupe_key, succeeded_since)
+
+        with mock.patch.object(outbound, 'find_existing', find_existing):
+            call, response, attached = outbound.dispatch_once(
+                'url_processing', 'https://n8n.example/webhook', {'url_main': URL}, KEY
+            )
+        self.assertTrue(attached)
+        self.assertIsNone(response)
+        self.assertEqual(call.id, winner[0].id)
+        self.assertEqual(OutboundCall.objects.count(), 1)
+        post.assert_not_called()
+
+
+@override_settings(OUTBOUND_RETRY_BASE_SECONDS=30, OUTBOUND_RETRY_MAX_SECONDS=3600, OUTBOUND_MAX_ATTEMPTS=3,
+                   OUTBOUND_TIMEOUT_SECONDS=30, OUTBOUND_PHOTOGRAPHY_TIMEOUT_SECONDS=90)
+class SchedulerTests(TestCase):
+
+    def setUp(self):
+        patcher = mock.patch('requests.post', return_value=FakeN8NResponse(503))
+        self.post = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def make_due(self):
+        OutboundCall.objects.filter(state='pending').update(next_run_at=timezone.now() - timedelta(seconds=1))
+
+    def test_backoff_doubles_up_to_the_cap(self):
+        for attempts, ceiling in ((1, 30), (2, 60), (4, 240), (20, 3600)):
+            for _ in range(20):
+                self.assertTrue(ceiling / 2 <= outbound.backoff_seconds(attempts) <= ceiling)
+
+    def test_failed_call_is_scheduled_with_backoff(self):
+        before = timezone.now()
+        call, response = outbound.dispatch('url_processing', 'https://n8n.example/webhook', {'url_main': URL})
+        self.assertEqual(response.status_code, 503)
+        call.refresh_from_db()
+        self.assertEqual((call.state, call.attempts), ('pending', 1))
+        self.assertEqual(call.last_error, 'n8n webhook returned status 503')
+        self.assertTrue(before + timedelta(seconds=15) <= call.next_run_at <= timezone.now() + timedelta(seconds=30))
+
+        # Not due yet
+        self.assertEqual(outbound.run_due(), {})
+        self.assertEqual(self.post.call_count, 1)
+
+    def test_call_is_dead_lettered_after_max_attempts(self):
+        call, _ = outbound.dispatch('url_processing', 'https://n8n.example/webhook', {'url_main': URL})
+        self.make_due()
+        self.assertEqual(outbound.run_due(), {'pending': 1})
+        self.make_due()
+        self.assertEqual(outbound.run_due(), {'dead': 1})
+        call.refresh_from_db()
+        self.assertEqual((call.state, call.attempts, call.next_run_at), ('dead', 3, None))
+        self.make_due()
+        self.assertEqual(outbound.run_due(), {})
+        self.assertEqual(self.post.call_count, 3)
+
+    def test_retries_use_the_webhook_timeout(self):
+        outbound.dispatch('photography', 'https://n8n.example/photography', {'sku': 'P-1'})
+        outbound.dispatch('url_processing', 'https://n8n.example/webhook', {'url_main': URL})
+        self.post.reset_mock()
+        self.post.return_value = FakeN8NResponse(200)
+        self.make_due()
+        self.assertEqual(outbound.run_due(), {'succeeded': 2})
+        timeouts = {call.args[0]: call.kwargs['timeout'] for call in self.post.call_args_list}
+        self.assertEqual(timeouts, {'https://n8n.example/photography': 90, 'https://n8n.example/webhook': 30})
+
+    def test_release_stuck_requeues_abandoned_calls(self):
+        stuck, recent = (
+            OutboundCall.objects.create(webhook='url_processing', webhook_url='https://n8n.example/webhook',
+                                        payload={}, state='in_flight')
+            for _ in range(2)
+        )
+        OutboundCall.objects.filter(id=stuck.id).update(updated_at=timezone.now() - timedelta(seconds=700))
+        self.assertEqual(outbound.release_stuck(600), 1)
+        stuck.refresh_from_db()
+        recent.refresh_from_db()
+        self.assertEqual(stuck.state, 'pending')
+        self.assertLessEqual(stuck.next_run_at, timezone.now())
+        self.assertEqual(recent.state, 'in_flight')
+
+    def test_replay_requeues_dead_calls_unless_their_key_is_active(self):
+        def dead(dedupe_key='', webhook='url_processing'):
+            return OutboundCall.objects.create(webhook=webhook, webhook_url='https://n8n.example/webhook',
+                                               payload={}, dedupe_key=dedupe_key, state='dead', attempts=3)
+
+        unkeyed, keyed, blocked, other = dead(), dead('key-a'), dead(KEY), dead(webhook='photography')
+        OutboundCall.objects.create(webhook='url_processing', webhook_url='https://n8n.example/webhook',
+                                    payload={}, dedupe_key=KEY, state='pending')
+
+        self.assertEqual(outbound.replay(webhook='url_processing'), 2)
+        states = dict(OutboundCall.objects.filter(
+            id__in=[unkeyed.id, keyed.id, blocked.id, other.id]).values_list('id', 'state'))
+        self.assertEqual(states, {unkeyed.id: 'pending', keyed.id: 'pending', blocked.id: 'dead', other.id: 'dead'})
+        self.assertEqual(OutboundCall.objects.get(id=keyed.id).attempts, 0)
+
+        self.assertEqual(outbound.replay(ids=[other.id]), 1)
+
+
+class OutboundCallListTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        OutboundCall.objects.bulk_create([
+            OutboundCall(webhook='url_processing', webhook_url='https://n8n.example/webhook', payload={}, state='dead')
+            for _ in range(3)
+        ])
+        cls.admin = get_user_model().objects.create_superuser('outbound-admin', 'admin@example.com', 'password')
+
+    def list_calls(self, limit):
+        self.client.force_login(self.admin)
+        return self.client.get(reverse('get_outbound_calls'), {'limit': limit})
+
+    def test_limit_is_clamped(self):
+        self.assertEqual(len(self.list_calls(0).json()['outbound_calls']), 1)
+        self.assertEqual(len(self.list_calls(-5).json()['outbound_calls']), 1)
+        self.assertEqual(len(self.list_calls(5000).json()['outbound_calls']), 3)
+
+    def test_non_integer_limit_is_rejected(self):
+        response = self.list_calls('ten')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('error', response.json())
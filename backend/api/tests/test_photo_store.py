@@ -0,0 +1,110 @@
+"""
+Content-addressed photo store: identical photos are stored once, chunked
+uploads are assembled and checked against the client's hash, abandoned
+uploads are swept, and malformed inline photos are rejected with a 400.
+"""
+
+import base64
+import hashlib
+import os
+import shutil
+import tempfile
+import time
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from api import photo_store
+
+JPEG = b'\xff\xd8\xff' + b'oak dresser, front view' * 200
+
+
+class PhotoStoreTests(TestCase):
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp(prefix='photo-store-')
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=media_root, PHOTO_UPLOAD_MAX_BYTES=1024 * 1024,
+                                              PHOTO_UPLOAD_MAX_AGE_SECONDS=3600)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def stored_files(self):
+        return sorted(
+            path.name for path in photo_store.photo_root().rglob('*')
+            if path.is_file() and path.parent.name not in ('tmp', 'uploads')
+        )
+
+    def test_identical_photos_are_stored_once(self):
+        encoded = base64.b64encode(JPEG).decode()
+        refs = {
+            photo_store.store_chunks([JPEG[:100], JPEG[100:]])['ref'],
+            photo_store.store_uploaded_file(SimpleUploadedFile('a.jpg', JPEG))['ref'],
+            photo_store.store_data_url(f'data:image/jpeg;base64,{encoded}')['ref'],
+            photo_store.store_data_url(encoded)['ref'],
+        }
+        digest = hashlib.sha256(JPEG).hexdigest()
+        self.assertEqual(refs, {photo_store.make_ref(digest)})
+        self.assertEqual(self.stored_files(), [digest])
+        self.assertEqual(list((photo_store.photo_root() / 'tmp').iterdir()), [])
+        self.assertEqual(photo_store.sniff_content_type(photo_store.path_for(digest)), 'image/jpeg')
+
+    def test_malformed_inline_photos_are_rejected(self):
+        encoded = base64.b64encode(JPEG).decode()
+        for value in ('data:image/jpeg;base64', f'data:image/jpeg,{encoded}', 'data:image/jpeg;base64,!!not base64!!',
+                      'data:image/jpeg;base64,', 'data:image/jpeg;base64,QUJD=Q'):
+            with self.subTest(value=value[:40]), self.assertRaises(photo_store.PhotoStoreError):
+                photo_store.store_data_url(value)
+        self.assertEqual(self.stored_files(), [])
+
+    def test_submit_photography_answers_400_for_a_malformed_photo(self):
+        response = self.client.post(reverse('submit_photography'), {
+            'auction_name': 'Estate Sale Spring', 'item_name': 'Oak dresser', 'lot_number': '12',
+            'photos': ['data:image/jpeg;base64'],
+        }, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('Invalid photo', response.json()['error'])
+
+    def test_chunked_upload_is_assembled_and_hash_checked(self):
+        upload_id = photo_store.start_upload()
+        offset = 0
+        for start in range(0, len(JPEG), 1000):
+            chunk = JPEG[start:start + 1000]
+            offset = photo_store.append_chunk(upload_id, offset, SimpleUploadedFile('chunk', chunk))
+        self.assertEqual(offset, len(JPEG))
+        with self.assertRaisesMessage(photo_store.PhotoStoreError, f'Expected offset {len(JPEG)}, got 0'):
+            photo_store.append_chunk(upload_id, 0, SimpleUploadedFile('chunk', b'again'))
+
+        digest = hashlib.sha256(JPEG).hexdigest()
+        photo = photo_store.complete_upload(upload_id, digest.upper())
+        self.assertEqual((photo['sha256'], photo['size']), (digest, len(JPEG)))
+        self.assertEqual(photo_store.path_for(digest).read_bytes(), JPEG)
+        with self.assertRaisesMessage(photo_store.PhotoStoreError, 'Unknown upload_id'):
+            photo_store.complete_upload(upload_id)
+
+    def test_upload_with_a_wrong_hash_is_discarded(self):
+        upload_id = photo_store.start_upload()
+        photo_store.append_chunk(upload_id, 0, SimpleUploadedFile('chunk', JPEG))
+        with self.assertRaisesMessage(photo_store.PhotoStoreError, 'Checksum mismatch'):
+            photo_store.complete_upload(upload_id, '0' * 64)
+        self.assertEqual(list((photo_store.photo_root() / 'uploads').iterdir()), [])
+        self.assertEqual(self.stored_files(), [])
+
+    def test_sweep_removes_abandoned_uploads_only(self):
+        abandoned, active = photo_store.start_upload(), photo_store.start_upload()
+        photo_store.append_chunk(active, 0, SimpleUploadedFile('chunk', JPEG[:500]))
+        stale_tmp = photo_store.photo_root() / 'tmp' / 'left-by-a-crash'
+        stale_tmp.parent.mkdir(parents=True, exist_ok=True)
+        stale_tmp.write_bytes(JPEG)
+        photo = photo_store.store_chunks([JPEG])
+
+        long_ago = time.time() - 7200
+        for path in (photo_store._upload_path(abandoned), stale_tmp, photo_store.path_for(photo['sha256'])):
+            os.utime(path, (long_ago, long_ago))
+
+        self.assertEqual(photo_store.sweep(), 2)
+        self.assertFalse(photo_store._upload_path(abandoned).exists())
+        self.assertFalse(stale_tmp.exists())
+        self.assertTrue(photo_store._upload_path(active).exists())
+        self.assertTrue(photo_store.exists(photo['sha256']))
@@ -0,0 +1,92 @@
+"""
+Image prefetch: an item's images get one prefetch row each however often it
+is ingested, only pending rows are scheduled, and get-prefetch-status reports
+their progress.
+"""
+
+import hashlib
+import shutil
+import tempfile
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from api import image_cache, prefetch
+from api.models import HiBidItem, ImagePrefetch
+
+IMAGES = [f'https://cdn.hibid.com/lot-1/{n}.jpg' for n in range(3)]
+
+
+@override_settings(PREFETCH_ENABLED=True, IMAGE_PROXY_ALLOWED_HOSTS=['hibid.com'],
+                   ADMISSION_CONTROL_ENABLED=False, PROFILING_SAMPLE_RATE=0)
+class PrefetchTests(TestCase):
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp(prefix='prefetch-cache-')
+        self.addCleanup(shutil.rmtree, self.cache_dir, ignore_errors=True)
+        cache_settings = override_settings(IMAGE_CACHE_DIR=self.cache_dir)
+        cache_settings.enable()
+        self.addCleanup(cache_settings.disable)
+        self.item = HiBidItem.objects.create(
+            url_main='https://hibid.com/lot/1', item_name='Oak dresser', status='processed',
+            main_image_url=IMAGES[0], all_unique_image_urls=[IMAGES[0], IMAGES[1], IMAGES[1], IMAGES[2], ''],
+        )
+
+    def enqueue(self):
+        """enqueue_item, returning (new rows, ids scheduled on commit)"""
+        with mock.patch.object(prefetch, 'submit') as submit, self.captureOnCommitCallbacks(execute=True):
+            created = prefetch.enqueue_item(self.item)
+        scheduled = submit.call_args.args[0] if submit.called else None
+        return created, scheduled
+
+    def test_each_image_is_enqueued_once(self):
+        created, scheduled = self.enqueue()
+        self.assertEqual(created, 3)
+        self.assertEqual(list(ImagePrefetch.objects.order_by('id').values_list('url', flat=True)), IMAGES)
+        self.assertEqual(sorted(scheduled), sorted(ImagePrefetch.objects.values_list('id', flat=True)))
+
+        # Ingested again: no new rows, and images already fetched aren't scheduled again
+        ImagePrefetch.objects.filter(url=IMAGES[0]).update(status='done')
+        created, scheduled = self.enqueue()
+        self.assertEqual(created, 0)
+        self.assertEqual(ImagePrefetch.objects.count(), 3)
+        self.assertEqual(sorted(scheduled),
+                         sorted(ImagePrefetch.objects.exclude(url=IMAGES[0]).values_list('id', flat=True)))
+
+    @override_settings(PREFETCH_ENABLED=False)
+    def test_disabled_prefetch_creates_nothing(self):
+        self.assertEqual(self.enqueue(), (0, None))
+        self.assertFalse(ImagePrefetch.objects.exists())
+
+    def test_prefetch_status_reports_progress(self):
+        self.enqueue()
+        cached = b'\xff\xd8\xff cached image'
+        path = image_cache.original_path(IMAGES[0])
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(cached)
+        prefetch.prefetch_one(ImagePrefetch.objects.get(url=IMAGES[0]).id)
+        ImagePrefetch.objects.filter(url=IMAGES[1]).update(url='https://elsewhere.example/1.jpg')
+        prefetch.prefetch_one(ImagePrefetch.objects.get(url='https://elsewhere.example/1.jpg').id)
+
+        response = self.client.get(reverse('get_prefetch_status'), {'item_id': self.item.id})
+        self.assertEqual(response.status_code, 200)
+        progress = response.json()['prefetch']
+        self.assertEqual(progress['total'], 3)
+        self.assertEqual(progress['counts'], {'done': 1, 'skipped': 1, 'pending': 1})
+        self.assertFalse(progress['complete'])
+        self.assertEqual(progress['bytes'], len(cached))
+        self.assertEqual(progress['images'][0]['sha256'], hashlib.sha256(cached).hexdigest())
+
+        # A finished prefetch isn't claimed again
+        self.assertIsNone(prefetch.prefetch_one(ImagePrefetch.objects.get(url=IMAGES[0]).id))
+
+        ImagePrefetch.objects.filter(status='pending').update(status='error', error='timed out')
+        progress = self.client.get(reverse('get_prefetch_status'), {'item_id': self.item.id}).json()['prefetch']
+        self.assertTrue(progress['complete'])
+
+    def test_prefetch_status_validates_the_item(self):
+        self.assertEqual(self.client.get(reverse('get_prefetch_status')).status_code, 400)
+        for item_id in (self.item.id + 1, 'abc'):
+            response = self.client.get(reverse('get_prefetch_status'), {'item_id': item_id})
+            self.assertEqual(response.status_code, 404)
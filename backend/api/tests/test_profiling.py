@@ -0,0 +1,93 @@
+"""
+Request profiling is opt-in: only requests with a valid signed header (or
+picked by the sampler) are profiled, profiles are downloadable by staff
+users only, and a profile id can't reach files outside PROFILING_DIR.
+"""
+
+import marshal
+import shutil
+import tempfile
+from pathlib import Path
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from api import profiling
+from api.models import HiBidItem
+
+
+@override_settings(ADMISSION_CONTROL_ENABLED=False, PROFILING_ENABLED=True, PROFILING_SAMPLE_RATE=0)
+class ProfilingTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = get_user_model().objects.create_superuser('profile-admin', 'admin@example.com', 'password')
+        cls.user = get_user_model().objects.create_user('profile-user', 'user@example.com', 'password')
+        HiBidItem.objects.create(url_main='https://hibid.com/lot/profiled', item_name='Oak dresser',
+                                 status='processed')
+
+    def setUp(self):
+        self.directory = Path(tempfile.mkdtemp(prefix='profiles-'))
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        settings_override = override_settings(PROFILING_DIR=str(self.directory / 'profiles'))
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def get_items(self, **headers):
+        response = self.client.get(reverse('get_hibid_items'), headers=headers)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def profile(self):
+        return self.get_items(**{profiling.PROFILE_HEADER: profiling.make_token()})['X-Profile-Id']
+
+    def test_requests_are_not_profiled_unless_asked(self):
+        self.assertNotIn('X-Profile-Id', self.get_items())
+        forged = profiling.make_token()[:-2] + 'xx'
+        self.assertNotIn('X-Profile-Id', self.get_items(**{profiling.PROFILE_HEADER: forged}))
+        self.assertEqual(profiling.profiles.list(), [])
+
+    @override_settings(PROFILING_ENABLED=False)
+    def test_disabled_profiling_ignores_valid_tokens(self):
+        response = self.get_items(**{profiling.PROFILE_HEADER: profiling.make_token()})
+        self.assertNotIn('X-Profile-Id', response)
+        self.assertFalse((self.directory / 'profiles').exists())
+
+    @override_settings(PROFILING_SAMPLE_RATE=1.0)
+    def test_sampled_requests_are_profiled(self):
+        self.assertIn('X-Profile-Id', self.get_items())
+
+    def test_signed_request_is_profiled_with_its_sql(self):
+        profile = profiling.profiles.get(self.profile())
+        self.assertEqual((profile['view'], profile['method'], profile['status_code']), ('get_hibid_items', 'GET', 200))
+        self.assertTrue(any('hibid_items' in statement['sql'] for statement in profile['sql']))
+        self.assertIn('function calls', profile['report'])
+
+    def test_downloads_are_staff_only(self):
+        profile_id = self.profile()
+        urls = [reverse('list_profiles'), reverse('download_profile', args=[profile_id])]
+        for url in urls:
+            self.assertEqual(self.client.get(url).status_code, 403)
+        self.client.force_login(self.user)
+        for url in urls:
+            self.assertEqual(self.client.get(url).status_code, 403)
+
+        self.client.force_login(self.admin)
+        listed = self.client.get(urls[0]).json()['profiles']
+        self.assertEqual([profile['id'] for profile in listed], [profile_id])
+        self.assertIn('GET /api/get-hibid-items/ -> 200', self.client.get(urls[1]).content.decode())
+        raw = self.client.get(urls[1], {'output': 'prof'})
+        self.assertEqual(raw['Content-Disposition'], f'attachment; filename="profile-{profile_id}.prof"')
+        self.assertIsInstance(marshal.loads(raw.content), dict)
+
+    def test_profile_ids_cannot_leave_the_profile_directory(self):
+        self.profile()
+        secret = self.directory / 'secret.prof'
+        secret.write_bytes(marshal.dumps({'report': 'outside'}))
+        for profile_id in ('../secret', '..%2Fsecret', 'secret', '0123456789abcdef0'):
+            self.assertIsNone(profiling.profiles.get(profile_id))
+
+        self.client.force_login(self.admin)
+        for path in ('/api/profiles/..%2Fsecret/', '/api/profiles/%2E%2E%2Fsecret/'):
+            self.assertEqual(self.client.get(path).status_code, 404)
@@ -0,0 +1,48 @@
+"""
+ORJSONRenderer output is byte-for-byte what DRF's JSONRenderer produces.
+"""
+
+import datetime
+import decimal
+import uuid
+from unittest import skipIf
+
+from django.test import SimpleTestCase
+from django.utils.translation import gettext_lazy
+from rest_framework.renderers import JSONRenderer
+
+from api.renderers import ORJSONRenderer, orjson
+
+UTC = datetime.timezone.utc
+
+
+@skipIf(orjson is None, 'orjson is not installed')
+class ORJSONRendererTests(SimpleTestCase):
+
+    def assertSameAsDRF(self, data, context=None):
+        self.assertEqual(ORJSONRenderer().render(data, renderer_context=context),
+                         JSONRenderer().render(data, renderer_context=context))
+
+    def test_datetimes(self):
+        self.assertSameAsDRF({
+            'utc': datetime.datetime(2026, 1, 2, 3, 4, 5, 123456, tzinfo=UTC),
+            'utc_whole_seconds': datetime.datetime(2026, 1, 2, 3, 4, 5, tzinfo=UTC),
+            'offset': datetime.datetime(2026, 1, 2, 3, 4, 5, 120000,
+                                        tzinfo=datetime.timezone(datetime.timedelta(hours=-5))),
+            'naive': datetime.datetime(2026, 1, 2, 3, 4, 5, 999),
+            'date': datetime.date(2026, 1, 2),
+            'time': datetime.time(3, 4, 5, 123456),
+        })
+
+    def test_values_orjson_hands_to_drf(self):
+        self.assertSameAsDRF({
+            'decimal': decimal.Decimal('12.50'),
+            'uuid': uuid.UUID('12345678-1234-5678-1234-567812345678'),
+            'duration': datetime.timedelta(minutes=3),
+            'lazy': gettext_lazy('Finalized'),
+            'separators': 'line\u2028paragraph\u2029',
+            1: 'non-string key',
+        })
+
+    def test_indent(self):
+        self.assertSameAsDRF({'items': [{'id': 1}]}, {'indent': 2})
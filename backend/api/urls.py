@@ -6,8 +6,22 @@ urlpatterns = [
     path('test-post/', views.test_post, name='test_post'),
     path('test-webhook-data/', views.test_webhook_data, name='test_webhook_data'),
     path('call-webhook/', views.call_webhook, name='call_webhook'),
+    path('bulk-import-urls/', views.bulk_import_urls, name='bulk_import_urls'),
+    path('get-bulk-imports/', views.get_bulk_imports, name='get_bulk_imports'),
     path('submit-photography/', views.submit_photography, name='submit_photography'),
+    path('upload-photo/', views.upload_photo, name='upload_photo'),
+    path('upload-photo-chunk/', views.upload_photo_chunk, name='upload_photo_chunk'),
+    path('photos/<str:digest>/', views.get_photo, name='get_photo'),
+    path('image-proxy/', views.image_proxy, name='image_proxy'),
     path('receive-webhook-data/', views.receive_webhook_data, name='receive_webhook_data'),
     path('get-webhook-data/', views.get_webhook_data, name='get_webhook_data'),
     path('get-hibid-items/', views.get_hibid_items, name='get_hibid_items'),
+    path('get-archived-items/', views.get_archived_items, name='get_archived_items'),
+    path('get-comparables/', views.get_comparables, name='get_comparables'),
+    path('get-prefetch-status/', views.get_prefetch_status, name='get_prefetch_status'),
+    path('get-outbound-calls/', views.get_outbound_calls, name='get_outbound_calls'),
+    path('replay-outbound-calls/', views.replay_outbound_calls, name='replay_outbound_calls'),
+    path('metrics/', views.metrics, name='metrics'),
+    path('profiles/', views.list_profiles, name='list_profiles'),
+    path('profiles/<str:profile_id>/', views.download_profile, name='download_profile'),
 ] 
\ No newline at end of file
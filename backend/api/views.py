@@ -1,10 +1,30 @@
-from rest_framework.decorators import api_view
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAdminUser
 from rest_framework.response import Response
 from rest_framework import status
-from .models import WebhookData, AuctionItem
-import requests
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, JsonResponse
+from django.db import transaction
+from django.db.models import Q
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from datetime import datetime, timedelta
+from .models import WebhookData, AuctionItem, OutboundCall
+from .metrics import registry
+from .profiling import profiles
+from .admission import admission_controlled
+from . import photo_store
+from . import image_cache
+from . import prefetch
+from . import outbound
+from . import ingest
+from . import ingest_buffer
+from . import n8n
+from . import fieldsets
+from . import streaming
+from . import bulk_import
 import json
-import base64
 import time
 import string
 
@@ -39,6 +59,7 @@ def test_webhook_data(request):
     }, status=status.HTTP_200_OK)
 
 @api_view(['POST'])
+@admission_controlled('call_webhook')
 def call_webhook(request):
     """
     Call n8n webhook with URL data - now just sends data without expecting immediate response
@@ -55,8 +76,7 @@ def call_webhook(request):
         print("Request headers:", dict(request.headers))
         print("URL received:", url_main)
         
-        # Hardcoded n8n Webhook URL - Direct and simple!
-        webhook_url = "https://sorcer.app.n8n.cloud/webhook/789023dc-a9bf-459c-8789-d9d0c993d1cb"
+        webhook_url = n8n.URL_PROCESSING_WEBHOOK
         
         print("Calling n8n webhook:", webhook_url)
         
@@ -66,47 +86,171 @@ def call_webhook(request):
         }
         
         print("Payload being sent:", payload)
-        print("Making HTTP request to n8n...")
         
-        # Send data to n8n webhook - don't wait for response content
-        response = requests.post(webhook_url, json=payload, timeout=30)
+        # Single-flight: a URL processed recently, or already queued/in flight,
+        # is not sent to n8n again unless the caller passes force=true
+        force = str(request.data.get('force', '')).lower() == 'true'
+        window = settings.URL_DEDUPE_WINDOW_SECONDS
+        normalized_url = outbound.normalize_url(url_main)
+        stored_at = None
+        if not force:
+            from .models import HiBidItem
+            cached_item = HiBidItem.objects.filter(
+                url_main__in={url_main, normalized_url}
+            ).only('id', 'url_main', 'item_title', 'item_name', 'lot_number', 'status',
+                   'processed_at', 'updated_at').first()
+            stored_at = cached_item.updated_at if cached_item else None
+            cutoff = timezone.now() - timedelta(seconds=window)
+            if window and cached_item and cached_item.status == 'processed' and stored_at >= cutoff:
+                print("URL already processed at", stored_at.isoformat(), "- not re-dispatching")
+                return Response({
+                    'message': 'URL was processed recently; returning the existing item.',
+                    'hibid_item': {
+                        'id': cached_item.id,
+                        'url_main': cached_item.url_main,
+                        'item_title': cached_item.item_title or cached_item.item_name,
+                        'lot_number': cached_item.lot_number,
+                        'status': cached_item.status,
+                        'processed_at': cached_item.processed_at.isoformat(),
+                        'updated_at': stored_at.isoformat()
+                    },
+                    'deduplicated': True,
+                    'status': 'processed'
+                }, status=status.HTTP_200_OK)
         
+        # Send data to n8n webhook - don't wait for response content.
+        # The call is persisted first, so a failure is retried by the scheduler
+        dedupe_key = outbound.dedupe_key_for('url_processing', normalized_url)
+        if force:
+            call, response = outbound.dispatch('url_processing', webhook_url, payload, timeout=30)
+            attached = False
+        else:
+            # A call n8n accepted after the item was last stored is still being
+            # worked on, so attach to it too
+            call, response, attached = outbound.dispatch_once(
+                'url_processing', webhook_url, payload, dedupe_key, timeout=30,
+                succeeded_since=outbound.succeeded_since(stored_at)
+            )
+        
+        if attached:
+            print(f"URL already submitted (outbound call {call.id}, {call.state}) - attaching")
+            return Response({
+                'message': 'URL is already being processed. Data will be available shortly.',
+                'outbound_call_id': call.id,
+                'deduplicated': True,
+                'status': 'processing' if call.state != 'pending' else 'queued',
+                'note': 'Check the dashboard for processed data in a few moments'
+            }, status=status.HTTP_200_OK)
+        
+        print("Made HTTP request to n8n")
         print("=== N8N WEBHOOK RESPONSE ===")
-        print("Webhook Response Status:", response.status_code)
-        print("Webhook Response Headers:", dict(response.headers))
-        print("Webhook Response Body:", response.text)
+        if response is not None:
+            print("Webhook Response Status:", response.status_code)
+            print("Webhook Response Headers:", dict(response.headers))
+            print("Webhook Response Body:", response.text)
+        else:
+            print("Webhook request failed:", call.last_error)
         
         # Check if webhook was received successfully
-        if response.status_code in [200, 201, 202]:
+        if call.state == 'succeeded':
             print("=== WEBHOOK CALL COMPLETED ===")
             return Response({
                 'message': 'URL sent to n8n for processing. Data will be available shortly.',
                 'webhook_status': response.status_code,
+                'outbound_call_id': call.id,
                 'status': 'processing',
                 'note': 'Check the dashboard for processed data in a few moments'
             }, status=status.HTTP_200_OK)
         else:
-            print("=== WEBHOOK CALL FAILED ===")
+            print("=== WEBHOOK CALL FAILED, QUEUED FOR RETRY ===")
             return Response({
-                'error': f'n8n webhook returned status {response.status_code}',
-                'webhook_status': response.status_code,
-                'status': 'failed'
-            }, status=status.HTTP_400_BAD_REQUEST)
+                'message': f'n8n is unavailable ({call.last_error}). The URL was queued and will be retried automatically.',
+                'webhook_status': call.last_status_code,
+                'outbound_call_id': call.id,
+                'next_retry_at': call.next_run_at.isoformat() if call.next_run_at else None,
+                'status': 'queued'
+            }, status=status.HTTP_202_ACCEPTED)
         
-    except requests.RequestException as e:
-        print("Webhook request failed:", str(e))
+    except Exception as e:
+        print("Unexpected error:", str(e))
         return Response({
-            'error': f'Webhook request failed: {str(e)}',
+            'error': f'Unexpected error: {str(e)}',
             'status': 'failed'
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+@api_view(['POST'])
+@admission_controlled('bulk_import_urls')
+def bulk_import_urls(request):
+    """
+    Queue many HiBid URLs for n8n processing at once. Send a CSV or text file
+    as multipart `file`, or `urls` as a list or newline-separated text.
+    The import is run by `manage.py import_urls --resume-all` (the
+    bulk-importer service); progress is at get-bulk-imports/?id=<id>.
+    """
+    try:
+        upload = request.FILES.get('file')
+        if upload is not None:
+            text = upload.read().decode('utf-8-sig', errors='replace')
+            source = upload.name
+        else:
+            urls = request.data.get('urls') or ''
+            text = '\n'.join(urls) if isinstance(urls, list) else str(urls)
+            source = 'api'
+        if not text.strip():
+            return Response({
+                'error': 'Provide a file or urls'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            job = bulk_import.create(text, source=source)
+        except ValueError as e:
+            return Response({
+                'error': str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        print(f"Bulk import {job.id}: {job.total} URLs from {source}")
+        return Response({
+            'message': f'{job.total} URLs queued for processing',
+            'bulk_import': bulk_import.serialize(job),
+            'status': 'queued'
+        }, status=status.HTTP_202_ACCEPTED)
+
     except Exception as e:
-        print("Unexpected error:", str(e))
+        print("Error creating bulk import:", str(e))
         return Response({
-            'error': f'Unexpected error: {str(e)}',
+            'error': f'Error creating bulk import: {str(e)}',
             'status': 'failed'
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+@api_view(['GET'])
+def get_bulk_imports(request):
+    """
+    Progress and throughput of one bulk import (?id=) or the most recent ones
+    """
+    from .models import BulkImport
+
+    import_id = request.query_params.get('id')
+    if import_id:
+        job = BulkImport.objects.filter(id=import_id).first() if import_id.isdigit() else None
+        if job is None:
+            return Response({
+                'error': f'Bulk import {import_id} not found'
+            }, status=status.HTTP_404_NOT_FOUND)
+        return Response({
+            'message': 'Bulk import retrieved successfully',
+            'bulk_import': bulk_import.serialize(job),
+            'status': 'success'
+        }, status=status.HTTP_200_OK)
+
+    jobs = [bulk_import.serialize(job) for job in BulkImport.objects.defer('urls', 'failed_urls')[:20]]
+    return Response({
+        'message': f'Retrieved {len(jobs)} bulk imports',
+        'bulk_imports': jobs,
+        'status': 'success'
+    }, status=status.HTTP_200_OK)
+
 @api_view(['POST'])
+@admission_controlled('submit_photography')
 def submit_photography(request):
     try:
         # Extract all required parameters from request
@@ -125,18 +269,28 @@ def submit_photography(request):
         quantity = int(request.data.get('quantity', 1))
         photos = request.data.get('photos', [])
 
-        # Webhook URL for photography submission
-        webhook_url = "https://sorcer.app.n8n.cloud/webhook/0be48928-c40c-4e16-a9f1-1e2fdf9ed9d2"
-        print(f"=== PHOTOGRAPHY WEBHOOK CALL ===")
-        print(f"Webhook URL: {webhook_url}")
-        print(f"Quantity: {quantity}")
-        print(f"SKU Base: {sku_base}")
+        # Store inline photos once and send n8n short URLs instead of the image
+        # bytes, so every unit of the lot shares the same stored photos
+        try:
+            photos = [photo_reference_url(request, photo) for photo in photos]
+        except photo_store.PhotoStoreError as e:
+            return Response({
+                'error': f'Invalid photo: {str(e)}'
+            }, status=status.HTTP_400_BAD_REQUEST)
 
         # Generate SKU prefix from first letter of each of the first 3 words of auction_name and lot_number
         auction_words = [w for w in auction_name.split() if w.isalpha()]
         sku_prefix = ''.join([w[0].upper() for w in auction_words[:3]])
         sku_base = f"{sku_prefix}-{lot_number}"
 
+        # Webhook URL for photography submission
+        webhook_url = n8n.PHOTOGRAPHY_WEBHOOK
+        print(f"=== PHOTOGRAPHY WEBHOOK CALL ===")
+        print(f"Webhook URL: {webhook_url}")
+        print(f"Quantity: {quantity}")
+        print(f"SKU Base: {sku_base}")
+        print(f"Photos: {len(photos)}")
+
         # Prepare responses
         webhook_responses = []
         research2_items = []
@@ -163,17 +317,25 @@ def submit_photography(request):
             print(f"SKU: {sku}")
             print(f"Payload: {json.dumps(payload, indent=2)}")
             
-            response = requests.post(webhook_url, json=payload)
+            call, response = outbound.dispatch('photography', webhook_url, payload,
+                                             timeout=outbound.timeout_for('photography'))
             print(f"Photography Webhook Call {i+1}/{quantity} - SKU: {sku}")
-            print("Status:", response.status_code)
-            print("Body:", response.text)
-            try:
-                response_data = response.json()
-            except json.JSONDecodeError:
-                response_data = {'raw_response': response.text}
+            print("Status:", call.last_status_code)
+            print("Body:", response.text if response is not None else call.last_error)
+            if response is None:
+                response_data = {'error': call.last_error}
+            else:
+                try:
+                    response_data = response.json()
+                except json.JSONDecodeError:
+                    response_data = {'raw_response': response.text}
+            if call.state != 'succeeded':
+                # Persisted; the outbound scheduler retries it
+                response_data['queued_for_retry'] = True
             webhook_responses.append({
                 'sku': sku,
-                'status': response.status_code,
+                'status': call.last_status_code,
+                'outbound_call_id': call.id,
                 'response': response_data
             })
             # Create research2 item for frontend
@@ -209,18 +371,151 @@ def submit_photography(request):
             'status': 'success'
         }, status=status.HTTP_200_OK)
 
-    except requests.RequestException as e:
-        print("Photography webhook request failed:", str(e))
-        return Response({
-            'error': f'Photography webhook request failed: {str(e)}'
-        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
     except Exception as e:
         print("Photography unexpected error:", str(e))
         return Response({
             'error': f'Photography unexpected error: {str(e)}'
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+def photo_reference_url(request, photo):
+    """
+    Resolve one entry of a `photos` array to a URL n8n can fetch: inline
+    base64/data URLs are stored in the photo store, `sha256:` references are
+    looked up, and anything else (e.g. an existing http URL) is passed through.
+    """
+    if isinstance(photo, dict):
+        photo = photo.get('ref') or photo.get('url') or photo.get('data') or ''
+    digest = photo_store.parse_ref(photo)
+    if digest is None and photo_store.is_inline(photo):
+        digest = photo_store.store_data_url(photo)['sha256']
+    if digest is None:
+        return photo
+    if not photo_store.exists(digest):
+        raise photo_store.PhotoStoreError(f'Unknown photo reference {photo}')
+    return request.build_absolute_uri(reverse('get_photo', args=[digest]))
+
+@api_view(['POST'])
+def upload_photo(request):
+    """
+    Upload one or more photos (multipart field `file`) into the content-addressed
+    photo store. Returns a `sha256:` reference per photo for use in `photos`.
+    """
+    files = request.FILES.getlist('file')
+    if not files:
+        return Response({
+            'error': 'file is required'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        stored = []
+        for uploaded_file in files:
+            photo = photo_store.store_uploaded_file(uploaded_file)
+            photo['url'] = request.build_absolute_uri(reverse('get_photo', args=[photo['sha256']]))
+            stored.append(photo)
+    except photo_store.PhotoStoreError as e:
+        return Response({
+            'error': str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    return Response({
+        'message': f'Stored {len(stored)} photos',
+        'photos': stored,
+        'status': 'success'
+    }, status=status.HTTP_200_OK)
+
 @api_view(['POST'])
+def upload_photo_chunk(request):
+    """
+    Chunked upload for large photos. Send chunks in order as multipart field
+    `chunk` with the byte `offset` they start at; the first request omits
+    `upload_id` and gets one back. Send `complete=true` (optionally with the
+    expected `sha256`) on the last request to store the photo.
+    """
+    upload_id = request.data.get('upload_id')
+    chunk = request.FILES.get('chunk')
+    complete = str(request.data.get('complete', '')).lower() == 'true'
+
+    try:
+        if not upload_id:
+            upload_id = photo_store.start_upload()
+        received = None
+        if chunk is not None:
+            received = photo_store.append_chunk(upload_id, int(request.data.get('offset', 0)), chunk)
+        if not complete:
+            return Response({
+                'message': 'Chunk received',
+                'upload_id': upload_id,
+                'received': received or 0,
+                'status': 'uploading'
+            }, status=status.HTTP_200_OK)
+
+        photo = photo_store.complete_upload(upload_id, request.data.get('sha256'))
+    except (photo_store.PhotoStoreError, ValueError) as e:
+        return Response({
+            'error': str(e),
+            'upload_id': upload_id
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    photo['url'] = request.build_absolute_uri(reverse('get_photo', args=[photo['sha256']]))
+    return Response({
+        'message': 'Photo stored successfully',
+        'photo': photo,
+        'status': 'success'
+    }, status=status.HTTP_200_OK)
+
+def get_photo(request, digest):
+    """
+    Serve a stored photo. Content never changes for a digest, so it can be cached forever.
+    """
+    try:
+        path = photo_store.path_for(digest)
+    except photo_store.PhotoStoreError:
+        return HttpResponse('Not found\n', status=404, content_type='text/plain')
+    if not path.is_file():
+        return HttpResponse('Not found\n', status=404, content_type='text/plain')
+    response = FileResponse(open(path, 'rb'), content_type=photo_store.sniff_content_type(path))
+    response['Cache-Control'] = 'public, max-age=31536000, immutable'
+    response['ETag'] = f'"{digest}"'
+    return response
+
+def image_proxy(request):
+    """
+    Serve a cached, resized copy of a remote auction image.
+    GET ?url=<image url>&size=thumb|card|large&format=webp|jpeg
+    Without `format`, WebP is served to clients that accept it and JPEG otherwise.
+    """
+    url = request.GET.get('url', '')
+    size = request.GET.get('size', 'card')
+    fmt = request.GET.get('format')
+    negotiated = fmt is None
+    if negotiated:
+        fmt = 'webp' if 'image/webp' in request.headers.get('Accept', '') else 'jpeg'
+
+    if not url or not image_cache.is_allowed(url):
+        return JsonResponse({'error': 'url is required and must point to an allowed image host'}, status=400)
+    if size not in image_cache.THUMBNAIL_SIZES or fmt not in image_cache.FORMATS:
+        return JsonResponse({
+            'error': f'size must be one of {sorted(image_cache.THUMBNAIL_SIZES)} '
+                     f'and format one of {sorted(image_cache.FORMATS)}'
+        }, status=400)
+
+    try:
+        path = image_cache.get_thumbnail(url, size, fmt)
+    except image_cache.ImageFetchError as e:
+        print("Image proxy fetch failed:", str(e))
+        return JsonResponse({'error': str(e)}, status=502)
+    except image_cache.ImageCacheError as e:
+        print("Image proxy error:", str(e))
+        return JsonResponse({'error': str(e)}, status=422)
+
+    response = FileResponse(open(path, 'rb'), content_type=image_cache.FORMATS[fmt][1])
+    response['Cache-Control'] = f'public, max-age={settings.IMAGE_PROXY_CACHE_MAX_AGE}, immutable'
+    if negotiated:
+        response['Vary'] = 'Accept'
+    return response
+
+@api_view(['POST'])
+@admission_controlled('receive_webhook_data')
 def receive_webhook_data(request):
     """
     Receive webhook data from n8n workflow and store it appropriately
@@ -231,6 +526,22 @@ def receive_webhook_data(request):
         print("=== RECEIVED WEBHOOK DATA ===")
         print("Received webhook data:", json.dumps(data, indent=2))
         
+        # Write-behind mode: validate, append to the durable buffer and ack;
+        # the flusher applies buffered payloads in batched transactions
+        if ingest_buffer.is_enabled():
+            error = ingest.validate(data)
+            if error:
+                return Response({
+                    'error': error,
+                    'received_data': data
+                }, status=status.HTTP_400_BAD_REQUEST)
+            buffer_id = ingest_buffer.get_buffer().append(data)
+            return Response({
+                'message': 'Webhook data queued for storage',
+                'buffer_id': buffer_id,
+                'status': 'queued'
+            }, status=status.HTTP_202_ACCEPTED)
+        
         # Check if this is HiBid URL processing data
         if 'url_main' in data and 'hibid.com' in data.get('url_main', ''):
             print("Processing HiBid URL data...")
@@ -260,103 +571,13 @@ def process_hibid_data(data):
     Process and store HiBid URL processing data
     """
     try:
-        from .models import HiBidItem
-        
         url_main = data.get('url_main')
         if not url_main:
             return Response({
                 'error': 'url_main is required for HiBid data'
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        # Extract data from the webhook response (matching n8n JSON structure)
-        item_title = data.get('item_name', '')  # Use item_name as item_title
-        lot_number = data.get('lot_number', '')
-        description = data.get('description', '')
-        lead = data.get('lead', '')
-        item_name = data.get('item_name', '')
-        category = data.get('category', '')
-        estimate = data.get('estimate', '')
-        auction_name = data.get('auction_name', '')
-        auctioneer = data.get('auctioneer', '')
-        auction_type = data.get('auction_type', '')
-        auction_dates = data.get('auction_dates', '')
-        location = data.get('location', '')
-        current_bid = data.get('current_bid', '')
-        bid_count = data.get('bid_count', 0)
-        time_remaining = data.get('time_remaining', '')
-        shipping_available = data.get('shipping_available', False)
-        
-        # Extract image URLs from n8n processing
-        all_unique_image_urls = data.get('all_unique_image_urls', [])
-        main_image_url = data.get('main_image_url', '')
-        gallery_image_urls = data.get('gallery_image_urls', [])
-        broad_search_images = data.get('broad_search_images', [])
-        tumbnail_images = data.get('tumbnail_images', [])
-        
-        # Extract AI response
-        ai_response = data.get('ai_response', '')
-        
-        print(f"Processing HiBid data for: {item_name} (Lot: {lot_number})")
-        print(f"Images found: {len(all_unique_image_urls)} unique, {len(gallery_image_urls)} gallery")
-        
-        # Create or update HiBid item
-        hibid_item, created = HiBidItem.objects.get_or_create(
-            url_main=url_main,
-            defaults={
-                'item_title': item_title,
-                'lot_number': lot_number,
-                'description': description,
-                'lead': lead,
-                'item_name': item_name,
-                'category': category,
-                'estimate': estimate,
-                'auction_name': auction_name,
-                'auctioneer': auctioneer,
-                'auction_type': auction_type,
-                'auction_dates': auction_dates,
-                'location': location,
-                'current_bid': current_bid,
-                'bid_count': bid_count,
-                'time_remaining': time_remaining,
-                'shipping_available': shipping_available,
-                'all_unique_image_urls': all_unique_image_urls,
-                'main_image_url': main_image_url,
-                'gallery_image_urls': gallery_image_urls,
-                'broad_search_images': broad_search_images,
-                'tumbnail_images': tumbnail_images,
-                'ai_response': ai_response,
-                'raw_data': data,
-                'status': 'processed'
-            }
-        )
-        
-        if not created:
-            # Update existing record
-            hibid_item.item_title = item_title or hibid_item.item_title
-            hibid_item.lot_number = lot_number or hibid_item.lot_number
-            hibid_item.description = description or hibid_item.description
-            hibid_item.lead = lead or hibid_item.lead
-            hibid_item.item_name = item_name or hibid_item.item_name
-            hibid_item.category = category or hibid_item.category
-            hibid_item.estimate = estimate or hibid_item.estimate
-            hibid_item.auction_name = auction_name or hibid_item.auction_name
-            hibid_item.auctioneer = auctioneer or hibid_item.auctioneer
-            hibid_item.auction_type = auction_type or hibid_item.auction_type
-            hibid_item.auction_dates = auction_dates or hibid_item.auction_dates
-            hibid_item.location = location or hibid_item.location
-            hibid_item.current_bid = current_bid or hibid_item.current_bid
-            hibid_item.bid_count = bid_count or hibid_item.bid_count
-            hibid_item.time_remaining = time_remaining or hibid_item.time_remaining
-            hibid_item.shipping_available = shipping_available
-            hibid_item.all_unique_image_urls = all_unique_image_urls or hibid_item.all_unique_image_urls
-            hibid_item.main_image_url = main_image_url or hibid_item.main_image_url
-            hibid_item.gallery_image_urls = gallery_image_urls or hibid_item.gallery_image_urls
-            hibid_item.broad_search_images = broad_search_images or hibid_item.broad_search_images
-            hibid_item.tumbnail_images = tumbnail_images or hibid_item.tumbnail_images
-            hibid_item.ai_response = ai_response or hibid_item.ai_response
-            hibid_item.raw_data = data
-            hibid_item.status = 'processed'
-            hibid_item.save()
+        hibid_item, created = ingest.apply_hibid_data(data)
         
         print(f"HiBid data {'created' if created else 'updated'} successfully")
         print(f"Item: {hibid_item.item_title or hibid_item.item_name}")
@@ -393,38 +614,13 @@ def process_sku_data(data):
     Process and store SKU-based webhook data (existing functionality)
     """
     try:
-        from .models import WebhookData
-        
         sku = data.get('sku')
         if not sku:
             return Response({
                 'error': 'sku is required in webhook data'
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        # Check if webhook data already exists for this SKU
-        webhook_data, created = WebhookData.objects.get_or_create(
-            sku=sku,
-            defaults={
-                'ebay_title': data.get('ebay_title', ''),
-                'ebay_description': data.get('ebay_description', ''),
-                'condition': data.get('condition', ''),
-                'ai_improved_estimate': data.get('ai_improved_estimate', ''),
-                'ai_improved_description': data.get('ai_improved_description', ''),
-                'quantity': data.get('quantity', 1),
-                'raw_data': data
-            }
-        )
-        
-        if not created:
-            # Update existing record
-            webhook_data.ebay_title = data.get('ebay_title', webhook_data.ebay_title)
-            webhook_data.ebay_description = data.get('ebay_description', webhook_data.ebay_description)
-            webhook_data.condition = data.get('condition', webhook_data.condition)
-            webhook_data.ai_improved_estimate = data.get('ai_improved_estimate', webhook_data.ai_improved_estimate)
-            webhook_data.ai_improved_description = data.get('ai_improved_description', webhook_data.ai_improved_description)
-            webhook_data.quantity = data.get('quantity', webhook_data.quantity)
-            webhook_data.raw_data = data
-            webhook_data.save()
+        webhook_data, created = ingest.apply_sku_data(data)
         
         return Response({
             'message': 'Webhook data received and stored successfully',
@@ -491,43 +687,36 @@ def get_webhook_data(request):
 @api_view(['GET'])
 def get_hibid_items(request):
     """
-    Get all processed HiBid items for the dashboard
+    Get all processed HiBid items for the dashboard.
+    ?fields=a,b selects output fields; ?stream=true streams the list.
     """
     try:
         from .models import HiBidItem
         
-        # Get all HiBid items, ordered by most recent first
+        # Get all HiBid items, ordered by most recent first; ?fields= limits
+        # the columns selected to the requested output fields
+        try:
+            fields = fieldsets.parse(request.query_params.get('fields'), fieldsets.HIBID_ITEM_FIELDS)
+        except fieldsets.InvalidFields as e:
+            return Response({
+                'error': str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
         hibid_items = HiBidItem.objects.filter(status='processed').order_by('-processed_at')
         
-        # Convert to list for response
-        items_data = []
-        for item in hibid_items:
-            items_data.append({
-                'id': item.id,
-                'url_main': item.url_main,
-                'item_title': item.item_title or item.item_name,
-                'item_name': item.item_name,
-                'lot_number': item.lot_number,
-                'description': item.description,
-                'lead': item.lead,
-                'category': item.category,
-                'estimate': item.estimate,
-                'auction_name': item.auction_name,
-                'auctioneer': item.auctioneer,
-                'auction_type': item.auction_type,
-                'auction_dates': item.auction_dates,
-                'location': item.location,
-                'current_bid': item.current_bid,
-                'bid_count': item.bid_count,
-                'time_remaining': item.time_remaining,
-                'shipping_available': item.shipping_available,
-                'main_image_url': item.main_image_url,
-                'image_count': len(item.all_unique_image_urls),
-                'gallery_count': len(item.gallery_image_urls),
-                'ai_response': item.ai_response,
-                'status': item.status,
-                'processed_at': item.processed_at.isoformat()
-            })
+        # ?stream=true: write the rows as they come off a chunked cursor instead of
+        # building the whole list and response body in memory ("show all" views)
+        if request.query_params.get('stream', '').lower() in ('1', 'true'):
+            # Pin the database now; the rows are read after the routing middleware returns
+            hibid_items = hibid_items.using(hibid_items.db)
+            chunk_size = settings.STREAM_CHUNK_SIZE
+            return streaming.stream_items(
+                'hibid_items',
+                fieldsets.rows(hibid_items, fields, fieldsets.HIBID_ITEM_FIELDS, chunk_size=chunk_size),
+                chunk_size,
+                lambda total: {'message': f'Retrieved {total} HiBid items successfully', 'status': 'success'}
+            )
+        
+        items_data = list(fieldsets.rows(hibid_items, fields, fieldsets.HIBID_ITEM_FIELDS))
         
         return Response({
             'message': f'Retrieved {len(items_data)} HiBid items successfully',
@@ -540,4 +729,328 @@ def get_hibid_items(request):
         print("Error retrieving HiBid items:", str(e))
         return Response({
             'error': f'Error retrieving HiBid items: {str(e)}'
-        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR) 
\ No newline at end of file
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@api_view(['GET'])
+def get_archived_items(request):
+    """
+    Query archived HiBid items (?kind=hibid, default) or webhook data (?kind=webhook).
+    Filters: url_main / sku, q (title search), since / until (ISO dates on the
+    original processed_at / received_at), limit (max 1000) and offset.
+    """
+    from .models import HiBidItemArchive, WebhookDataArchive
+
+    kind = request.query_params.get('kind', 'hibid')
+    if kind not in ('hibid', 'webhook'):
+        return Response({
+            'error': "kind must be 'hibid' or 'webhook'"
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    bounds = {}
+    try:
+        limit = min(max(int(request.query_params.get('limit', 100)), 1), 1000)
+        offset = max(int(request.query_params.get('offset', 0)), 0)
+        for name in ('since', 'until'):
+            if request.query_params.get(name):
+                day = parse_date(request.query_params[name])
+                if day is None:
+                    raise ValueError(name)
+                bounds[name] = timezone.make_aware(datetime.combine(day, datetime.min.time()))
+    except ValueError:
+        return Response({
+            'error': 'limit/offset must be integers and since/until ISO dates (YYYY-MM-DD)'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    if kind == 'hibid':
+        time_field = 'processed_at'
+        items = HiBidItemArchive.objects.all()
+        if request.query_params.get('url_main'):
+            items = items.filter(url_main=request.query_params['url_main'])
+        if request.query_params.get('q'):
+            items = items.filter(Q(item_title__icontains=request.query_params['q']) |
+                                 Q(item_name__icontains=request.query_params['q']))
+        fields = ['original_id', 'url_main', 'item_title', 'item_name', 'lot_number', 'category',
+                  'estimate', 'auction_name', 'auctioneer', 'auction_dates', 'location', 'current_bid',
+                  'bid_count', 'main_image_url', 'ai_response', 'status', 'processed_at', 'archived_at']
+    else:
+        time_field = 'received_at'
+        items = WebhookDataArchive.objects.all()
+        if request.query_params.get('sku'):
+            items = items.filter(sku=request.query_params['sku'])
+        if request.query_params.get('q'):
+            items = items.filter(ebay_title__icontains=request.query_params['q'])
+        fields = ['original_id', 'sku', 'ebay_title', 'ebay_description', 'condition',
+                  'ai_improved_estimate', 'ai_improved_description', 'quantity', 'received_at', 'archived_at']
+
+    try:
+        fields = fieldsets.parse(request.query_params.get('fields'), fields)
+    except fieldsets.InvalidFields as e:
+        return Response({
+            'error': str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    # Bounds on the partition key let PostgreSQL skip the other monthly partitions
+    if 'since' in bounds:
+        items = items.filter(**{f'{time_field}__gte': bounds['since']})
+    if 'until' in bounds:
+        items = items.filter(**{f'{time_field}__lt': bounds['until'] + timedelta(days=1)})
+
+    rows = list(items.order_by(f'-{time_field}', '-id').values(*fields)[offset:offset + limit])
+    for row in rows:
+        for key in (time_field, 'archived_at'):
+            if key in row:
+                row[key] = row[key].isoformat()
+
+    return Response({
+        'message': f'Retrieved {len(rows)} archived {kind} rows',
+        'kind': kind,
+        'items': rows,
+        'limit': limit,
+        'offset': offset,
+        'status': 'success'
+    }, status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+def get_comparables(request):
+    """
+    Top-k similar HiBid / auction items with their estimates, for one of
+    ?hibid_item_id=, ?auction_item_id=, ?sku= (auction item or webhook data) or ?q= (free text).
+    ?k= (default 10, max 50); ?with_estimate=false also returns items without an estimate.
+    """
+    from .models import HiBidItem
+    from . import comparables
+
+    params = request.query_params
+    try:
+        k = min(max(int(params.get('k', 10)), 1), 50)
+    except ValueError:
+        return Response({
+            'error': 'k must be an integer'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    with_estimate = params.get('with_estimate', 'true').lower() != 'false'
+
+    for name in ('hibid_item_id', 'auction_item_id'):
+        if params.get(name) and not params[name].isdigit():
+            return Response({
+                'error': f'{name} must be an integer'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+    exclude = None
+    if params.get('hibid_item_id'):
+        item = HiBidItem.objects.filter(id=params['hibid_item_id']).first()
+        if item is None:
+            return Response({'error': 'HiBid item not found'}, status=status.HTTP_404_NOT_FOUND)
+        query = {'title': item.item_title or item.item_name, 'category': item.category, 'description': item.description}
+        exclude = ('hibid', item.id)
+    elif params.get('auction_item_id') or params.get('sku'):
+        if params.get('auction_item_id'):
+            item = AuctionItem.objects.filter(id=params['auction_item_id']).first()
+        else:
+            item = AuctionItem.objects.filter(sku=params['sku']).first()
+        if item is not None:
+            query = {'title': item.item_name, 'category': item.category, 'description': item.description}
+            exclude = ('auction', item.id)
+        else:
+            webhook_data = WebhookData.objects.filter(sku=params.get('sku')).first() if params.get('sku') else None
+            if webhook_data is None:
+                return Response({'error': 'Auction item not found'}, status=status.HTTP_404_NOT_FOUND)
+            query = {'title': webhook_data.ebay_title, 'category': '', 'description': webhook_data.ebay_description}
+    elif params.get('q'):
+        query = {'title': params['q'], 'category': '', 'description': ''}
+    else:
+        return Response({
+            'error': 'One of hibid_item_id, auction_item_id, sku or q is required'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    index = comparables.get_index()
+    if index is None:
+        response = Response({
+            'error': 'The comparables index is still loading, try again shortly'
+        }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        response['Retry-After'] = '5'
+        return response
+    start = time.perf_counter()
+    results = index.query(
+        comparables.tokens(query['title'], query['category'], query['description']),
+        k=k, exclude=exclude, with_estimate=with_estimate
+    )
+    took_ms = (time.perf_counter() - start) * 1000
+
+    items = [
+        {
+            'kind': kind,
+            'id': item_id,
+            'title': title,
+            'category': category,
+            'estimate': estimate,
+            'current_bid': current_bid,
+            'similarity': round(similarity, 3),
+        }
+        for kind, item_id, similarity, (title, category, estimate, current_bid) in results
+    ]
+    return Response({
+        'message': f'Found {len(items)} comparables',
+        'query': query['title'],
+        'comparables': items,
+        'estimate_summary': comparables.summarize_estimates(items),
+        'indexed_items': index.count,
+        'took_ms': round(took_ms, 2),
+        'status': 'success'
+    }, status=status.HTTP_200_OK)
+
+
+def metrics(request):
+    """
+    Prometheus text endpoint for the metrics recorded by MetricsMiddleware.
+    Requires `Authorization: Bearer <METRICS_TOKEN>` when METRICS_TOKEN is set.
+    """
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    if token and request.headers.get('Authorization', '') != f'Bearer {token}':
+        return HttpResponse('Forbidden\n', status=403, content_type='text/plain')
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def list_profiles(request):
+    """
+    List the stored request profiles (latest first)
+    """
+    summaries = [
+        {key: value for key, value in profile.items() if key not in ('report', 'pstats', 'sql')}
+        | {'sql_count': len(profile['sql'])}
+        for profile in profiles.list()
+    ]
+    return Response({
+        'message': f'Retrieved {len(summaries)} profiles',
+        'profiles': summaries,
+        'status': 'success'
+    }, status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def download_profile(request, profile_id):
+    """
+    Download one profile: ?output=txt (default) for the cumulative report plus
+    SQL, ?output=prof for raw pstats data (snakeviz, pstats.Stats), or
+    ?output=json for everything except the raw stats.
+    """
+    profile = profiles.get(profile_id)
+    if profile is None:
+        return Response({
+            'error': f'Profile {profile_id} not found (only the latest {settings.PROFILING_BUFFER_SIZE} are kept)'
+        }, status=status.HTTP_404_NOT_FOUND)
+
+    fmt = request.query_params.get('output', 'txt')
+    if fmt == 'json':
+        return Response({
+            'message': 'Profile retrieved successfully',
+            'profile': {key: value for key, value in profile.items() if key != 'pstats'},
+            'status': 'success'
+        }, status=status.HTTP_200_OK)
+
+    if fmt == 'prof':
+        response = HttpResponse(profile['pstats'], content_type='application/octet-stream')
+        response['Content-Disposition'] = f'attachment; filename="profile-{profile_id}.prof"'
+        return response
+
+    lines = [
+        f"{profile['method']} {profile['path']} -> {profile['status_code']}",
+        f"view: {profile['view']}  duration: {profile['duration_ms']} ms  "
+        f"sql: {len(profile['sql'])} queries, {profile['sql_time_ms']} ms",
+        '',
+        profile['report'],
+        '',
+        '=== SQL ===',
+    ]
+    for statement in profile['sql']:
+        lines.append(f"[{statement['duration_ms']} ms] {statement['sql']} {statement['params']}")
+    response = HttpResponse('\n'.join(lines) + '\n', content_type='text/plain; charset=utf-8')
+    response['Content-Disposition'] = f'attachment; filename="profile-{profile_id}.txt"'
+    return response
+
+@api_view(['GET'])
+def get_prefetch_status(request):
+    """
+    Get image prefetch progress for a HiBid item
+    """
+    try:
+        from .models import HiBidItem
+        
+        item_id = request.query_params.get('item_id')
+        if not item_id:
+            return Response({
+                'error': 'item_id parameter is required'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            hibid_item = HiBidItem.objects.get(id=item_id)
+        except (HiBidItem.DoesNotExist, ValueError):
+            return Response({
+                'error': f'HiBid item {item_id} not found'
+            }, status=status.HTTP_404_NOT_FOUND)
+        
+        return Response({
+            'message': 'Prefetch status retrieved successfully',
+            'prefetch': prefetch.item_progress(hibid_item),
+            'status': 'success'
+        }, status=status.HTTP_200_OK)
+        
+    except Exception as e:
+        print("Error retrieving prefetch status:", str(e))
+        return Response({
+            'error': f'Error retrieving prefetch status: {str(e)}'
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def get_outbound_calls(request):
+    """
+    List outbound n8n calls, e.g. ?state=dead for the dead-letter list.
+    Query params: state, webhook, limit (1-1000, default 100)
+    """
+    calls = OutboundCall.objects.all()
+    state = request.query_params.get('state')
+    if state:
+        calls = calls.filter(state=state)
+    webhook = request.query_params.get('webhook')
+    if webhook:
+        calls = calls.filter(webhook=webhook)
+    try:
+        limit = min(max(int(request.query_params.get('limit', 100)), 1), 1000)
+    except ValueError:
+        return Response({
+            'error': 'limit must be an integer'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    calls_data = [outbound.serialize(call) for call in calls[:limit]]
+    return Response({
+        'message': f'Retrieved {len(calls_data)} outbound calls',
+        'outbound_calls': calls_data,
+        'total_count': calls.count(),
+        'status': 'success'
+    }, status=status.HTTP_200_OK)
+
+@api_view(['POST'])
+@permission_classes([IsAdminUser])
+def replay_outbound_calls(request):
+    """
+    Re-dispatch dead-letter calls. Body: {"ids": [...]} for specific calls,
+    {"webhook": "..."} for one webhook, or {"all": true} for every dead call.
+    """
+    ids = request.data.get('ids') or []
+    webhook = request.data.get('webhook')
+    if not ids and not webhook and not request.data.get('all'):
+        return Response({
+            'error': 'Provide ids, webhook or all=true'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    replayed = outbound.replay(ids=ids, webhook=webhook)
+    return Response({
+        'message': f'{replayed} dead-letter calls queued for re-dispatch',
+        'replayed': replayed,
+        'status': 'success'
+    }, status=status.HTTP_200_OK)
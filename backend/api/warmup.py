@@ -0,0 +1,54 @@
+"""
+Worker startup.
+
+Django imports the URLconf, and with it the views, DRF and everything they
+import, on the first request a process serves, and the views import
+requests, Pillow and NumPy only when a request needs them. A freshly started
+or recycled gunicorn worker therefore answers its first requests a few
+hundred milliseconds late. With ``preload_app`` (see gunicorn.conf.py) the
+master loads the app and calls ``warm`` once; workers forked from it start
+with all of that, and the saved comparables index, already in memory and
+shared copy-on-write.
+
+Nothing here may open a database connection or start a thread, neither of
+which survives a fork. ``release_connections`` runs in the master before
+every fork and again in each worker after it, in case a hook opened one.
+"""
+
+import importlib
+
+from django.db import connections
+from django.urls import get_resolver
+
+from . import comparables
+
+# Imported on first use by the code that needs them; optional ones may be missing
+LAZY_IMPORTS = ('requests', 'PIL.Image', 'PIL.ImageOps', 'redis', 'orjson', 'brotli')
+
+# DRF imports its renderer, parser and authentication classes on first access
+API_SETTINGS = ('DEFAULT_RENDERER_CLASSES', 'DEFAULT_PARSER_CLASSES', 'DEFAULT_AUTHENTICATION_CLASSES',
+                'DEFAULT_PERMISSION_CLASSES', 'DEFAULT_CONTENT_NEGOTIATION_CLASS', 'DEFAULT_THROTTLE_CLASSES')
+
+
+def warm():
+    """Import and load everything a worker would otherwise load on its first requests"""
+    from rest_framework.settings import api_settings
+
+    get_resolver().url_patterns
+    for name in API_SETTINGS:
+        getattr(api_settings, name)
+    for module in LAZY_IMPORTS:
+        try:
+            importlib.import_module(module)
+        except ImportError:
+            pass
+    comparables.preload()
+
+
+def release_connections():
+    """Close this process's database connections and connection pools"""
+    for connection in connections.all(initialized_only=True):
+        connection.close()
+        close_pool = getattr(connection, 'close_pool', None)
+        if close_pool is not None:
+            close_pool()
@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
 from pathlib import Path
+import json
 import os
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -44,6 +45,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.middleware.MetricsMiddleware',
+    'api.profiling.ProfilingMiddleware',
+    'api.compression.CompressionMiddleware',
+    'api.db_router.ReplicaRoutingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     # 'corsheaders.middleware.CorsMiddleware',  # Temporarily disabled
@@ -85,6 +90,27 @@ DATABASES = {
     }
 }
 
+# Opt-in SQLite profile for installs where concurrent webhook writes and
+# dashboard reads hit "database is locked" (SQLITE_PROFILE=concurrent): WAL so
+# readers don't block the writer, synchronous=NORMAL (durable in WAL mode
+# except for the last commits on power loss), memory-mapped reads, a busy
+# timeout, and write transactions that take the write lock up front
+# (BEGIN IMMEDIATE) instead of failing when a read upgrades to a write.
+SQLITE_CONCURRENT_OPTIONS = {
+    'init_command': (
+        'PRAGMA journal_mode=WAL;'
+        'PRAGMA synchronous=NORMAL;'
+        'PRAGMA mmap_size=268435456;'
+        'PRAGMA busy_timeout=20000;'
+        'PRAGMA temp_store=MEMORY;'
+        'PRAGMA cache_size=-32000'
+    ),
+    'transaction_mode': 'IMMEDIATE',
+    'timeout': 20,
+}
+if os.environ.get('SQLITE_PROFILE', '').lower() == 'concurrent':
+    DATABASES['default']['OPTIONS'] = SQLITE_CONCURRENT_OPTIONS
+
 # Use PostgreSQL only when explicitly configured for production/Docker
 if os.environ.get('USE_POSTGRES', 'false').lower() == 'true':
     DATABASES = {
@@ -98,6 +124,13 @@ if os.environ.get('USE_POSTGRES', 'false').lower() == 'true':
         }
     }
 
+# Optional read replicas: every DATABASES alias other than 'default' is a
+# replica. Only the list views below read from them; writes and the client's
+# reads for DATABASE_REPLICA_PIN_SECONDS after a write go to the primary.
+DATABASE_ROUTERS = ['api.db_router.PrimaryReplicaRouter']
+DATABASE_REPLICA_VIEWS = ['get_hibid_items', 'get_webhook_data', 'get_archived_items', 'get_comparables']
+DATABASE_REPLICA_PIN_SECONDS = int(os.environ.get('DATABASE_REPLICA_PIN_SECONDS', '5'))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -143,6 +176,28 @@ STATICFILES_DIRS = [
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Content-addressed photo store (MEDIA_ROOT/photos) used by submit_photography
+PHOTO_UPLOAD_MAX_BYTES = int(os.environ.get('PHOTO_UPLOAD_MAX_BYTES', str(50 * 1024 * 1024)))
+# Chunked uploads not touched for this long are deleted
+PHOTO_UPLOAD_MAX_AGE_SECONDS = int(os.environ.get('PHOTO_UPLOAD_MAX_AGE_SECONDS', str(24 * 3600)))
+
+# Image proxy: remote images are fetched once, resized and cached on disk (LRU)
+IMAGE_CACHE_DIR = os.environ.get('IMAGE_CACHE_DIR', os.path.join(MEDIA_ROOT, 'image_cache'))
+IMAGE_CACHE_MAX_BYTES = int(os.environ.get('IMAGE_CACHE_MAX_BYTES', str(2 * 1024 * 1024 * 1024)))
+IMAGE_PROXY_ALLOWED_HOSTS = [
+    host.strip().lower()
+    for host in os.environ.get('IMAGE_PROXY_ALLOWED_HOSTS', 'hibid.com').split(',')
+    if host.strip()
+]
+IMAGE_PROXY_FETCH_TIMEOUT = float(os.environ.get('IMAGE_PROXY_FETCH_TIMEOUT', '10'))
+IMAGE_PROXY_MAX_SOURCE_BYTES = int(os.environ.get('IMAGE_PROXY_MAX_SOURCE_BYTES', str(25 * 1024 * 1024)))
+IMAGE_PROXY_CACHE_MAX_AGE = int(os.environ.get('IMAGE_PROXY_CACHE_MAX_AGE', '31536000'))
+
+# Prefetch images of newly ingested HiBid items into the image cache
+PREFETCH_ENABLED = os.environ.get('PREFETCH_ENABLED', 'true').lower() == 'true'
+PREFETCH_WORKERS = int(os.environ.get('PREFETCH_WORKERS', '8'))
+PREFETCH_PER_HOST_CONCURRENCY = int(os.environ.get('PREFETCH_PER_HOST_CONCURRENCY', '4'))
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -154,10 +209,132 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.AllowAny',
     ],
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
+        'api.renderers.ORJSONRenderer',
     ],
 }
 
+# Rows fetched and encoded per chunk by streaming list responses (?stream=true)
+STREAM_CHUNK_SIZE = int(os.environ.get('STREAM_CHUNK_SIZE', '2000'))
+
+# Brotli (if installed) or gzip for JSON/text responses of at least this size
+COMPRESSION_ENABLED = os.environ.get('COMPRESSION_ENABLED', 'true').lower() == 'true'
+COMPRESSION_MIN_BYTES = int(os.environ.get('COMPRESSION_MIN_BYTES', '1024'))
+COMPRESSION_BROTLI_QUALITY = int(os.environ.get('COMPRESSION_BROTLI_QUALITY', '4'))
+
+# Redis (optional) - shared state across gunicorn workers
+REDIS_URL = os.environ.get('REDIS_URL', '')
+
+# Outbound n8n calls are persisted and retried with exponential backoff by
+# `manage.py run_outbound_scheduler`; calls that exhaust their attempts are
+# moved to the dead-letter list (state='dead') and can be replayed.
+OUTBOUND_MAX_ATTEMPTS = int(os.environ.get('OUTBOUND_MAX_ATTEMPTS', '8'))
+OUTBOUND_RETRY_BASE_SECONDS = float(os.environ.get('OUTBOUND_RETRY_BASE_SECONDS', '30'))
+OUTBOUND_RETRY_MAX_SECONDS = float(os.environ.get('OUTBOUND_RETRY_MAX_SECONDS', '3600'))
+OUTBOUND_TIMEOUT_SECONDS = float(os.environ.get('OUTBOUND_TIMEOUT_SECONDS', '30'))
+# The photography workflow answers slowly. Its timeout must stay below
+# OUTBOUND_STUCK_AFTER_SECONDS, after which the scheduler assumes an in_flight
+# call was abandoned and sends it again, and below the gunicorn timeout.
+OUTBOUND_PHOTOGRAPHY_TIMEOUT_SECONDS = float(os.environ.get('OUTBOUND_PHOTOGRAPHY_TIMEOUT_SECONDS', '90'))
+OUTBOUND_STUCK_AFTER_SECONDS = int(os.environ.get('OUTBOUND_STUCK_AFTER_SECONDS', '600'))
+
+# call_webhook single-flight: a URL already queued or in flight, or processed
+# within this many seconds, is not sent to n8n again (0 disables the window)
+URL_DEDUPE_WINDOW_SECONDS = int(os.environ.get('URL_DEDUPE_WINDOW_SECONDS', '21600'))
+# n8n accepts a url_processing call right away but stores the HiBidItem
+# minutes later. For this long after a call succeeded, and until the item is
+# stored, a resubmission attaches to that call (0 attaches to active calls only)
+OUTBOUND_SINGLE_FLIGHT_WINDOW_SECONDS = int(os.environ.get('OUTBOUND_SINGLE_FLIGHT_WINDOW_SECONDS', '900'))
+
+# Bulk URL import (bulk-import-urls/ creates it, `manage.py import_urls` runs
+# it, see the bulk-importer service in docker-compose.yml): URLs per
+# import, dispatch threads per running import, and how often (in handled
+# URLs) progress is checkpointed. The n8n call rate is the
+# 'bulk_import_dispatch' entry of ADMISSION_LIMITS.
+BULK_IMPORT_MAX_URLS = int(os.environ.get('BULK_IMPORT_MAX_URLS', '20000'))
+BULK_IMPORT_WORKERS = int(os.environ.get('BULK_IMPORT_WORKERS', '4'))
+BULK_IMPORT_CHECKPOINT_EVERY = int(os.environ.get('BULK_IMPORT_CHECKPOINT_EVERY', '25'))
+
+# Live bid refresh: an item closing within N seconds is refreshed every M
+# seconds ([N, M] pairs, closest first), further out every
+# BID_REFRESH_FAR_SECONDS, once more this long after the close and then never.
+# Items without a parseable end time every BID_REFRESH_UNKNOWN_SECONDS (0 = never).
+# BID_REFRESH_WEBHOOK_URL: an n8n workflow taking {"urls": [...]} per auction;
+# unset, items are sent one by one to the URL processing workflow.
+BID_REFRESH_TIERS = json.loads(os.environ.get(
+    'BID_REFRESH_TIERS', '[[600, 60], [3600, 300], [21600, 900], [86400, 3600]]'
+))
+BID_REFRESH_FAR_SECONDS = int(os.environ.get('BID_REFRESH_FAR_SECONDS', '43200'))
+BID_REFRESH_AFTER_CLOSE_SECONDS = int(os.environ.get('BID_REFRESH_AFTER_CLOSE_SECONDS', '600'))
+BID_REFRESH_UNKNOWN_SECONDS = int(os.environ.get('BID_REFRESH_UNKNOWN_SECONDS', '0'))
+BID_REFRESH_END_TOLERANCE_SECONDS = int(os.environ.get('BID_REFRESH_END_TOLERANCE_SECONDS', '300'))
+BID_REFRESH_BATCH_SIZE = int(os.environ.get('BID_REFRESH_BATCH_SIZE', '50'))
+BID_REFRESH_BATCH_AHEAD_SECONDS = int(os.environ.get('BID_REFRESH_BATCH_AHEAD_SECONDS', '120'))
+BID_REFRESH_WEBHOOK_URL = os.environ.get('BID_REFRESH_WEBHOOK_URL', '')
+
+# `manage.py archive_old_rows` moves HiBid items / webhook data older than this
+# to the archive tables; HiBid items linked to an auction item are kept, and
+# webhook data only while its auction item is still in progress
+ARCHIVE_AFTER_DAYS = int(os.environ.get('ARCHIVE_AFTER_DAYS', '90'))
+
+# get-comparables: in-memory MinHash index of HiBid and auction items, loaded
+# from COMPARABLES_INDEX_PATH (`manage.py build_comparables_index`) or built in
+# the background on first use (503 until ready), topped up from the database
+# every COMPARABLES_REFRESH_SECONDS, and cleared of deleted (archived) items
+# every COMPARABLES_RECONCILE_SECONDS
+COMPARABLES_INDEX_PATH = os.environ.get('COMPARABLES_INDEX_PATH', os.path.join(BASE_DIR, 'var', 'comparables.npz'))
+COMPARABLES_SIGNATURE_SIZE = int(os.environ.get('COMPARABLES_SIGNATURE_SIZE', '128'))
+COMPARABLES_REFRESH_SECONDS = float(os.environ.get('COMPARABLES_REFRESH_SECONDS', '30'))
+COMPARABLES_RECONCILE_SECONDS = float(os.environ.get('COMPARABLES_RECONCILE_SECONDS', '600'))
+
+# Webhook ingestion: 'sync' stores each receive_webhook_data payload inline;
+# 'buffered' appends it to a durable buffer and acks with 202, and
+# `manage.py flush_ingest_buffer` applies the buffer in batched transactions.
+WEBHOOK_INGEST_MODE = os.environ.get('WEBHOOK_INGEST_MODE', 'sync')
+WEBHOOK_INGEST_BACKEND = os.environ.get('WEBHOOK_INGEST_BACKEND', '')  # 'redis', 'file' or '' (auto)
+WEBHOOK_INGEST_LOG_DIR = os.environ.get('WEBHOOK_INGEST_LOG_DIR', os.path.join(BASE_DIR, 'var', 'ingest'))
+# Redis backend: the flusher's consumer name must survive restarts so it finds
+# its unacknowledged entries again; entries idle this long under any other
+# consumer are claimed. The Redis server must persist data (appendonly).
+WEBHOOK_INGEST_CONSUMER = os.environ.get('WEBHOOK_INGEST_CONSUMER', 'flusher')
+WEBHOOK_INGEST_CLAIM_IDLE_SECONDS = float(os.environ.get('WEBHOOK_INGEST_CLAIM_IDLE_SECONDS', '300'))
+WEBHOOK_INGEST_BATCH_SIZE = int(os.environ.get('WEBHOOK_INGEST_BATCH_SIZE', '200'))
+WEBHOOK_INGEST_FLUSH_INTERVAL = float(os.environ.get('WEBHOOK_INGEST_FLUSH_INTERVAL', '0.5'))
+
+# Admission control: per-endpoint concurrency caps and token-bucket rate
+# limits (requests/second, burst), shared across workers through Redis when
+# REDIS_URL is set. Over-limit requests get 429 with Retry-After. `lease` is
+# how long a crashed worker's slot is held before it expires. Override with a
+# JSON object in ADMISSION_LIMITS, e.g. {"call_webhook": {"rate": 2}}.
+ADMISSION_CONTROL_ENABLED = os.environ.get('ADMISSION_CONTROL_ENABLED', 'true').lower() == 'true'
+ADMISSION_LIMITS = {
+    'receive_webhook_data': {'concurrency': 8, 'rate': 50, 'burst': 100, 'lease': 120},
+    'call_webhook': {'concurrency': 4, 'rate': 5, 'burst': 20, 'lease': 120},
+    'submit_photography': {'concurrency': 2, 'rate': 1, 'burst': 5, 'lease': 900},
+    'bulk_import_urls': {'concurrency': 2, 'rate': 1, 'burst': 5, 'lease': 120},
+    # Not a view: the n8n budget shared by every running bulk import
+    'bulk_import_dispatch': {'concurrency': 4, 'rate': 2, 'burst': 4, 'lease': 120},
+    # n8n calls per second for live bid refreshes (`manage.py run_bid_refresh_scheduler`)
+    'bid_refresh': {'rate': 1, 'burst': 10},
+}
+for _name, _limits in json.loads(os.environ.get('ADMISSION_LIMITS', '{}')).items():
+    ADMISSION_LIMITS[_name] = {**ADMISSION_LIMITS.get(_name, {}), **_limits}
+
+# Request metrics exposed at /api/metrics/ in Prometheus text format.
+# With REDIS_URL set, counters are aggregated across all workers.
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'true').lower() == 'true'
+METRICS_BACKEND = os.environ.get('METRICS_BACKEND', 'redis')  # 'redis' or 'local'
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+
+# On-demand request profiling. Send a signed `X-Profile-Request` header
+# (`python manage.py profile_token`) or sample a fraction of all requests;
+# profiles are downloadable by staff users from /api/profiles/. They are
+# stored in PROFILING_DIR, which all workers of a deployment must share.
+PROFILING_ENABLED = os.environ.get('PROFILING_ENABLED', 'true').lower() == 'true'
+PROFILING_SAMPLE_RATE = float(os.environ.get('PROFILING_SAMPLE_RATE', '0'))
+PROFILING_BUFFER_SIZE = int(os.environ.get('PROFILING_BUFFER_SIZE', '20'))
+PROFILING_DIR = os.environ.get('PROFILING_DIR', os.path.join(BASE_DIR, 'var', 'profiles'))
+PROFILING_TOKEN_MAX_AGE = int(os.environ.get('PROFILING_TOKEN_MAX_AGE', '3600'))
+
 # CORS settings
 # CORS_ALLOWED_ORIGINS = [
 #     "http://localhost:3000",
@@ -26,6 +26,41 @@ DATABASES = {
     }
 }
 
+# Connection reuse. With DB_POOL_ENABLED each process keeps a psycopg pool
+# (health-checked on checkout); the per-worker size splits the DB_MAX_CONNECTIONS
+# budget between the gunicorn workers (WEB_CONCURRENCY, also read by gunicorn).
+# Without it, connections persist for CONN_MAX_AGE seconds and are checked
+# before reuse. Pooling and CONN_MAX_AGE are mutually exclusive in Django.
+WEB_CONCURRENCY = int(os.environ.get('WEB_CONCURRENCY', '2'))
+DB_MAX_CONNECTIONS = int(os.environ.get('DB_MAX_CONNECTIONS', '80'))
+DB_POOL_ENABLED = os.environ.get('DB_POOL_ENABLED', 'true').lower() == 'true'
+if DB_POOL_ENABLED:
+    from psycopg_pool import ConnectionPool
+
+    DATABASES['default']['OPTIONS'] = {
+        'pool': {
+            'min_size': int(os.environ.get('DB_POOL_MIN_SIZE', '1')),
+            'max_size': int(os.environ.get('DB_POOL_MAX_SIZE', str(max(2, DB_MAX_CONNECTIONS // WEB_CONCURRENCY)))),
+            'timeout': float(os.environ.get('DB_POOL_TIMEOUT', '10')),
+            'max_idle': float(os.environ.get('DB_POOL_MAX_IDLE', '300')),
+            'max_lifetime': float(os.environ.get('DB_POOL_MAX_LIFETIME', '3600')),
+            'check': ConnectionPool.check_connection,
+        },
+    }
+else:
+    DATABASES['default']['CONN_MAX_AGE'] = int(os.environ.get('CONN_MAX_AGE', '60'))
+    DATABASES['default']['CONN_HEALTH_CHECKS'] = True
+
+# Read replicas (streaming standbys of the primary), e.g. POSTGRES_REPLICA_HOSTS=db-replica
+for _index, _host in enumerate(filter(None, os.environ.get('POSTGRES_REPLICA_HOSTS', '').split(',')), start=1):
+    _host, _, _port = _host.strip().partition(':')
+    DATABASES[f'replica{_index}'] = {
+        **DATABASES['default'],
+        'HOST': _host,
+        'PORT': _port or DATABASES['default']['PORT'],
+        'TEST': {'MIRROR': 'default'},
+    }
+
 # Security settings
 SECURE_BROWSER_XSS_FILTER = True
 SECURE_CONTENT_TYPE_NOSNIFF = True
@@ -0,0 +1,44 @@
+"""
+Gunicorn settings (Dockerfile.prod runs `gunicorn -c gunicorn.conf.py`).
+
+With preload_app the master imports the app once and warms it (api.warmup)
+before forking, so a new or recycled worker serves its first request without
+importing the views, DRF, Pillow or NumPy itself, and the workers share that
+memory copy-on-write. Code changes then need a restart of the master, not
+just a HUP. Set GUNICORN_PRELOAD=false to have every worker load the app.
+"""
+
+import os
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+# settings_prod sizes each worker's DB pool from WEB_CONCURRENCY too
+workers = int(os.environ.get('WEB_CONCURRENCY', '2'))
+worker_class = 'sync'
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', '120'))
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', '2'))
+# Recycle workers after this many requests (0 = never), jittered so they don't restart together
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', '0'))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', str(max_requests // 10)))
+preload_app = os.environ.get('GUNICORN_PRELOAD', 'true').lower() == 'true'
+
+
+def when_ready(server):
+    if server.cfg.preload_app:
+        from api import warmup
+
+        warmup.warm()
+
+
+def pre_fork(server, worker):
+    # Workers must not inherit the master's sockets or pool threads
+    if server.cfg.preload_app:
+        from api import warmup
+
+        warmup.release_connections()
+
+
+def post_fork(server, worker):
+    if server.cfg.preload_app:
+        from api import warmup
+
+        warmup.release_connections()
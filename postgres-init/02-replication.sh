@@ -0,0 +1,10 @@
+#!/bin/sh
+# Creates the streaming-replication role used by docker-compose.replica.yml.
+# Runs once, on the primary's first start (docker-entrypoint-initdb.d).
+set -e
+
+psql -v ON_ERROR_STOP=1 --username "$POSTGRES_USER" --dbname "$POSTGRES_DB" <<-SQL
+    CREATE ROLE ${REPLICATION_USER:-replicator} WITH REPLICATION LOGIN PASSWORD '${REPLICATION_PASSWORD:-replicatorpass}';
+SQL
+
+echo "host replication ${REPLICATION_USER:-replicator} all scram-sha-256" >> "$PGDATA/pg_hba.conf"
@@ -0,0 +1,18 @@
+#!/bin/sh
+# Hot-standby entrypoint: clone the primary with pg_basebackup on first start
+# (-R writes standby.signal and primary_conninfo), then run postgres.
+set -e
+
+if [ ! -s "$PGDATA/PG_VERSION" ]; then
+    until pg_isready -h "$PRIMARY_HOST" -p "${PRIMARY_PORT:-5432}"; do
+        echo "Waiting for primary $PRIMARY_HOST..."
+        sleep 2
+    done
+    rm -rf "$PGDATA"/*
+    PGPASSWORD="$REPLICATION_PASSWORD" pg_basebackup \
+        -h "$PRIMARY_HOST" -p "${PRIMARY_PORT:-5432}" -U "$REPLICATION_USER" \
+        -D "$PGDATA" -Fp -Xs -P -R
+    chmod 0700 "$PGDATA"
+fi
+
+exec postgres -c hot_standby=on